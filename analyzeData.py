@@ -5,188 +5,224 @@
 # that have "considerable" West Coast traffic based on entry+exit ports.
 
 # companies + ports + summary of esg goals
+#
+# Ports and regions come from port_gazetteer.json (see port_gazetteer.py);
+# --regions west_coast,east_coast,gulf builds every report from one pass
+# (port_aggregation.PortAggregate) and writes <region>_companies.jsonl with
+# top_<region>_ports for each.
+
+from port_gazetteer import PortGazetteer, DEFAULT_GAZETTEER
+from port_aggregation import PortAggregate
+from jsonl_reader import JSONLStats, iter_jsonl
+from name_normalize import name_key
+
 
 def main():
-    import json, re, sys, os
+    import argparse, os, sys
     from pathlib import Path
-    from tempfile import NamedTemporaryFile
-
-    # ---- File locations ----
-    SRC = Path("bco_ports_80.jsonl")              # read ONLY from here
-    DST = Path("west_coast_companies.jsonl")      # update/overwrite this file
-
-    # ---- West Coast scope (major gateways; extend if needed) ----
-    WEST_COAST = ("Los Angeles", "Long Beach", "Oakland", "Seattle", "Tacoma", "Portland")
-
-    # ---- Regex for single-port labels (do NOT include combined labels here) ----
-    PORT_PATTERNS = {
-        "Los Angeles": re.compile(r"\bport\s+of\s+los\s+angeles\b|\blos\s+angeles\b", re.I),
-        "Long Beach":  re.compile(r"\bport\s+of\s+long\s+beach\b|\blong\s+beach\b", re.I),
-        "Oakland":     re.compile(r"\bport\s+of\s+oakland\b|\boakland\b", re.I),
-        "Seattle":     re.compile(r"\bport\s+of\s+seattle\b|\bseattle\b", re.I),
-        "Tacoma":      re.compile(r"\bport\s+of\s+tacoma\b|\btacoma\b", re.I),
-        "Portland":    re.compile(r"\bport\s+of\s+portland\b|\bportland(,\s*or)?\b", re.I),
-    }
-
-    # ---- Explicit combined labels -> split across multiple ports ----
-    COMBINED_PATTERNS = [
-        # San Pedro Bay complex
-        (re.compile(r"\b(?:la\s*/\s*lb|los\s+angeles\s*/\s*long\s+beach|los\s+angeles\s*-\s*long\s+beach|san\s+pedro\s+bay)\b", re.I),
-         ["Los Angeles", "Long Beach"]),
-        # Northwest Seaport Alliance
-        (re.compile(r"\b(?:seattle\s*/\s*tacoma|seattle\s*-\s*tacoma|nwsa|northwest\s+seaport\s+alliance)\b", re.I),
-         ["Seattle", "Tacoma"]),
-    ]
-
-    WORD_TO_NUM = {"one":1,"two":2,"three":3,"four":4,"five":5,"six":6,"seven":7,"eight":8,"nine":9,"ten":10}
-
-    def canonical_ports(name: str):
-        """Return list of canonical WC ports from a label; handles combined forms."""
-        if not name:
-            return []
-        s = str(name).strip().lower()
-
-        # 1) Combined labels first
-        for pat, ports in COMBINED_PATTERNS:
-            if pat.search(s):
-                return ports[:]  # copy
-
-        # 2) Single-port hits (could be more than one in odd cases)
-        hits = []
-        for canon, pat in PORT_PATTERNS.items():
-            if pat.search(s):
-                hits.append(canon)
-        # dedupe but preserve order
-        return list(dict.fromkeys(hits))
-
-    def parse_shipments_from_notes(notes):
-        if not notes:
-            return None
-        s = str(notes).strip().lower()
-        m = re.search(r"\b(\d+)\s+(?:shipment|shipments|record|records|import\s+records)\b", s)
-        if m:
-            try:
-                return int(m.group(1))
-            except ValueError:
-                pass
-        m = re.search(r"\b(one|two|three|four|five|six|seven|eight|nine|ten)\s+(?:shipment|shipments|record|records|import\s+records)\b", s)
-        if m:
-            return WORD_TO_NUM.get(m.group(1))
-        return None
-
-    def extract_shipments(item: dict) -> int:
-        # prefer explicit integer
-        val = item.get("shipments")
-        if isinstance(val, int):
-            return val
-        # infer from notes if possible
-        n = parse_shipments_from_notes(item.get("notes"))
-        return int(n) if n is not None else 0
-
-    def collect_counts(list_of_ports):
-        """Sum shipments across matched WC ports for a list like top_entry_ports or top_exit_ports."""
-        counts = {k: 0 for k in WEST_COAST}
-        if not isinstance(list_of_ports, list):
-            return counts
-        for obj in list_of_ports:
-            ports = canonical_ports(obj.get("port", ""))
-            if not ports:
-                continue  # ignore non-WC or unlabeled ports
-            qty = extract_shipments(obj)
-            if qty <= 0:
-                continue
-            if len(ports) == 1:
-                counts[ports[0]] += qty
-            else:
-                # even split with remainder distributed to first ports
-                base, rem = divmod(qty, len(ports))
-                for i, p in enumerate(ports):
-                    counts[p] += base + (1 if i < rem else 0)
-        return counts
 
+    ap = argparse.ArgumentParser(description="Aggregate per-company port traffic by region from bco_ports JSONL.")
+    ap.add_argument("--src", default="bco_ports_80.jsonl",
+                    help="source JSONL, or a columnar_export.py directory (read only)")
+    ap.add_argument("--gazetteer", default=str(DEFAULT_GAZETTEER), help="port gazetteer JSON")
+    ap.add_argument("--regions", default="west_coast",
+                    help="comma-separated region tags from the gazetteer (e.g. west_coast,east_coast,gulf,asia)")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="parse/aggregate the source in N processes (0 = all cores); output is identical")
+    ap.add_argument("--incremental", action="store_true",
+                    help="re-aggregate only companies whose source records changed since the last run (see --state)")
+    ap.add_argument("--state", default=".cache/analyze_state.json",
+                    help="per-company fingerprint file used by --incremental")
+    ap.add_argument("--delta", action="store_true",
+                    help="also write the records changed by this run to <region>_companies.delta.jsonl")
+    ap.add_argument("--store", default=None,
+                    help="also upsert the source into this port_store.py SQLite file (incremental)")
     # ---- Thresholds for "considerable" ----
-    MIN_SINGLE = 10   # at least this many at any one WC port
-    MIN_TOTAL  = 25   # or at least this many combined across WC ports
+    ap.add_argument("--min-single", type=int, default=10, help="at least this many at any one port in the region")
+    ap.add_argument("--min-total", type=int, default=25, help="or at least this many combined across the region's ports")
+    args = ap.parse_args()
+
+    # ---- File locations ----
+    SRC = Path(args.src)                          # read ONLY from here
+
+    # ---- Regions: ports, aliases and combined complexes from the gazetteer ----
+    gazetteer = PortGazetteer.load(args.gazetteer)
+    REGIONS = [r.strip() for r in args.regions.split(",") if r.strip()]
+    unknown = [r for r in REGIONS if not gazetteer.region_ports(r)]
+    if unknown:
+        print(f"ERROR: unknown region(s) {unknown}; gazetteer has {gazetteer.regions()}", file=sys.stderr)
+        sys.exit(1)
 
-    # ---- Build results from SRC only ----
+    # ---- Build the aggregate from SRC only (one pass; every report derives from it) ----
     if not SRC.exists():
         print(f"ERROR: source file not found: {SRC}", file=sys.stderr)
         sys.exit(1)
 
-    merged_counts = {}   # company -> {port: shipments}
-    lines_read = 0
-
-    with SRC.open("r", encoding="utf-8") as fh:
-        for line in fh:
-            s = line.strip()
-            if not s:
-                continue
-            lines_read += 1
-            try:
-                obj = json.loads(s)
-            except json.JSONDecodeError:
-                continue
-
-            company = obj.get("company") or obj.get("name") or ""
-            if not company:
-                continue
-
-            entry_counts = collect_counts(obj.get("top_entry_ports"))
-            exit_counts  = collect_counts(obj.get("top_exit_ports"))
-            combined = {k: entry_counts[k] + exit_counts[k] for k in WEST_COAST}
-
-            if company not in merged_counts:
-                merged_counts[company] = {k: 0 for k in WEST_COAST}
-            for k in WEST_COAST:
-                merged_counts[company][k] += combined[k]
-
-    # ---- Filter results by thresholds; also emit to stdout for inspection ----
+    if args.incremental:
+        if SRC.is_dir():
+            print("ERROR: --incremental needs a JSONL source", file=sys.stderr)
+            sys.exit(1)
+        run_incremental(SRC, gazetteer, REGIONS, args)
+        return
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if SRC.is_dir():
+        agg = PortAggregate.from_columnar(SRC, gazetteer)
+    else:
+        agg = PortAggregate.from_jsonl(SRC, gazetteer, workers=workers)
+    report_malformed(SRC, agg.stats)
+
+    for region in REGIONS:
+        report = agg.report(region, args.min_single, args.min_total)
+        write_region(region, report, f"{agg.lines_read} lines from {SRC.name}", delta=args.delta)
+
+    # ---- Keep the query store in step with the source (unchanged companies are skipped) ----
+    if args.store:
+        if SRC.is_dir():
+            print("[store] skipped: --store loads JSONL sources only", file=sys.stderr)
+        else:
+            from port_store import PortStore
+            store = PortStore(args.store, gazetteer)
+            counts = store.upsert_jsonl(SRC)
+            print(f"[store] {args.store}: " + ", ".join(f"{k} {v}" for k, v in counts.items()), file=sys.stderr)
+
+def run_incremental(SRC, gazetteer, REGIONS, args):
+    """
+    Update <region>_companies.jsonl from only the companies whose records in
+    SRC changed since the last run. Output files end up exactly as a full
+    run would leave them; files with nothing to change are not rewritten.
+    """
+    import os, sys
+    from pathlib import Path
+    from analyze_state import AnalyzeState, file_stamp, settings_digest, scan_companies, read_records
+
+    state = AnalyzeState.load(args.state)
+    settings = settings_digest(gazetteer, REGIONS, args.min_single, args.min_total)
+    if not state.matches(SRC, settings):
+        state.reset(SRC, settings)
+
+    # ---- Nothing to do if neither the source nor our outputs moved ----
+    src_stamp = file_stamp(SRC)
+    dsts = {region: Path(f"{region}_companies.jsonl") for region in REGIONS}
+    if state.src_stamp == src_stamp and all(state.outputs.get(r) == file_stamp(d) for r, d in dsts.items()):
+        for region in REGIONS:
+            print(f"[{region}] {SRC.name} unchanged since last run; {dsts[region].name} left as is.", file=sys.stderr)
+        return
+
+    # ---- Fingerprint every company, aggregate only the changed ones ----
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    agg = None
+    stats = JSONLStats()  # malformed lines met while scanning or re-reading changed companies
+    if not state.companies and workers <= 1:
+        # first run (or new settings): every company is new, so aggregate in the scanning pass
+        agg = PortAggregate(gazetteer)
+        companies, lines = scan_companies(SRC, on_record=agg.add_record, stats=stats)
+    else:
+        companies, lines = scan_companies(SRC, stats=stats)
+    changed = [c for c, (fp, _) in companies.items() if state.companies.get(c) != fp]
+    removed = [c for c in state.companies if c not in companies]
+    if agg is None and len(changed) == len(companies):
+        # nothing reusable: stream the whole file instead of seeking line by line
+        agg = PortAggregate.from_jsonl(SRC, gazetteer, workers=workers)
+        stats = agg.stats
+    elif agg is None:
+        agg = PortAggregate(gazetteer)
+        for obj in read_records(SRC, [span for c in changed for span in companies[c][1]], stats):
+            if isinstance(obj, dict):
+                agg.add_record(obj)
+    report_malformed(SRC, stats)
+    source_desc = (f"{lines} lines from {SRC.name} "
+                   f"({len(changed)} changed, {len(removed)} removed of {len(companies)} companies)")
+
+    for region in REGIONS:
+        report = agg.report(region, args.min_single, args.min_total)
+        kept = state.reports.setdefault(region, {})  # by display name; changed/removed are name_keys
+        stale = set(changed) | set(removed)
+        for c in [c for c in kept if name_key(c) in stale]:
+            del kept[c]
+        for company, top_ports in report:
+            kept[company] = [[p, v] for p, v in top_ports]
+
+        dst = dsts[region]
+        if state.outputs.get(region) != file_stamp(dst):
+            # output missing or edited since our last write: re-emit every kept company
+            report = [(c, [tuple(pv) for pv in top]) for c, top in kept.items()]
+        if report:
+            write_region(region, report, source_desc, delta=args.delta)
+        else:
+            print(f"[{region}] Processed {source_desc}; no changes for {dst.name}.", file=sys.stderr)
+        state.outputs[region] = file_stamp(dst)
+
+    state.companies = {c: fp for c, (fp, _) in companies.items()}
+    state.src_stamp = src_stamp
+    state.save()
+
+
+def report_malformed(path, stats):
+    """Warn on stderr about lines of `path` that were skipped as malformed JSON."""
+    import sys
+    if not stats.malformed:
+        return
+    print(f"WARNING: skipped {stats.malformed} malformed line(s) of {stats.lines} in {path}", file=sys.stderr)
+    for where, err in stats.malformed_examples:
+        print(f"  {where}: {err}", file=sys.stderr)
+
+
+def write_region(region, report, source_desc, delta=False):
+    """
+    Merge one region's report (see PortAggregate.report) into <region>_companies.jsonl;
+    with delta=True the report's records also go to <region>_companies.delta.jsonl.
+    """
+    import json, sys, os
+    from pathlib import Path
+    from tempfile import NamedTemporaryFile
+
+    DST = Path(f"{region}_companies.jsonl")      # update/overwrite this file
+    ports_key = f"top_{region}_ports"
+
+    # ---- Records for companies over the thresholds; also emit to stdout for inspection ----
     new_records = {}  # company -> record dict to write into DST
-    for company, counts in merged_counts.items():
-        total_wc = sum(counts.values())
-        has_single = any(v >= MIN_SINGLE for v in counts.values())
-        if total_wc >= MIN_TOTAL or has_single:
-            top_ports = [
-                {"port": k, "shipments": v}
-                for k, v in sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
-                if v > 0
-            ]
-            rec = {"company": company, "top_west_coast_ports": top_ports}
-            new_records[company] = rec
-            print(json.dumps(rec, ensure_ascii=False))
-
-    # ---- Merge into west_coast_companies.jsonl (in place overwrite) ----
-    # Load existing records (if any) into a map
+    for company, top_ports in report:
+        rec = {"company": company, ports_key: [{"port": p, "shipments": v} for p, v in top_ports]}
+        new_records[company] = rec
+        print(json.dumps(rec, ensure_ascii=False))
+
+    # ---- Merge into <region>_companies.jsonl (in place overwrite) ----
+    # Load existing records (if any) into a map keyed by normalized name, so
+    # "Acme, Inc." from an earlier run is replaced by "ACME Inc" from this one
     existing = {}
     if DST.exists():
-        with DST.open("r", encoding="utf-8") as f:
-            for line in f:
-                s = line.strip()
-                if not s:
-                    continue
-                try:
-                    obj = json.loads(s)
-                except json.JSONDecodeError:
-                    continue
-                c = obj.get("company")
-                if c:
-                    existing[c] = obj
+        stats = JSONLStats()
+        for obj in iter_jsonl(DST, stats=stats):
+            c = obj.get("company") if isinstance(obj, dict) else None
+            if c:
+                existing[name_key(c)] = obj
+        report_malformed(DST, stats)
 
     # Overwrite/insert with new records
-    existing.update(new_records)
+    for company, rec in new_records.items():
+        existing[name_key(company)] = rec
 
     # Write atomically
     with NamedTemporaryFile("w", delete=False, dir=str(DST.parent), encoding="utf-8") as tmp:
         tmp_path = Path(tmp.name)
         # optional: keep output deterministically ordered by company
-        for company in sorted(existing.keys(), key=lambda x: x.lower()):
-            tmp.write(json.dumps(existing[company], ensure_ascii=False) + "\n")
+        for rec in sorted(existing.values(), key=lambda r: r["company"].lower()):
+            tmp.write(json.dumps(rec, ensure_ascii=False) + "\n")
 
     # Replace destination
     os.replace(tmp_path, DST)
 
+    # Records written by this run only, for downstream consumers that apply changes
+    if delta:
+        DELTA = Path(f"{region}_companies.delta.jsonl")
+        with NamedTemporaryFile("w", delete=False, dir=str(DELTA.parent), encoding="utf-8") as tmp:
+            for rec in new_records.values():
+                tmp.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp.name, DELTA)
+
     print(
-        f"Processed {lines_read} lines from {SRC.name}; "
+        f"[{region}] Processed {source_desc}; "
         f"kept {len(new_records)} companies; "
         f"wrote {len(existing)} total records to {DST.name}.",
         file=sys.stderr
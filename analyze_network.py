@@ -7,14 +7,23 @@ import os
 import sys
 import json
 import time
-from pathlib import Path
 
-# Import the main script functions
-from web_ports_extractor import (
-    init_driver_attach, resolve_company_candidates, 
-    fetch_company_page_and_ports, score_candidate,
-    slugify_company, NetworkCapture
-)
+from capture_archive import DEFAULT_ARCHIVE, CaptureArchive
+
+DATA_KEY_TERMS = ['data', 'ports', 'lanes', 'trade', 'shipping', 'import', 'export', 'company', 'supplier']
+
+def summarize_json_payload(obj):
+    """What step 9 reports for a JSON payload: type, keys, data-related keys, list size / first item keys."""
+    summary = {"type": type(obj).__name__, "keys": [], "data_keys": [], "items": None, "first_item_keys": []}
+    if isinstance(obj, dict):
+        summary["keys"] = list(obj.keys())
+        # Look for any data-related keys
+        summary["data_keys"] = [k for k in obj.keys() if any(term in str(k).lower() for term in DATA_KEY_TERMS)]
+    elif isinstance(obj, list) and obj:
+        summary["items"] = len(obj)
+        if isinstance(obj[0], dict):
+            summary["first_item_keys"] = list(obj[0].keys())
+    return summary
 
 def analyze_network_requests(company_name: str = "Kimberly-Clark"):
     """Analyze all network requests to find data endpoints."""
@@ -22,6 +31,9 @@ def analyze_network_requests(company_name: str = "Kimberly-Clark"):
     print(f"Analyzing network requests for: {company_name}")
     print("=" * 60)
     
+    # Import the main script functions (live-browser only; summarize_json_payload works offline)
+    from web_ports_extractor import init_driver_attach, resolve_company_candidates, NetworkCapture
+    
     # Initialize driver
     driver = init_driver_attach()
     
@@ -118,33 +130,22 @@ def analyze_network_requests(company_name: str = "Kimberly-Clark"):
         
         for i, (url, obj) in enumerate(json_hits, 1):
             print(f"   JSON {i}: {url}")
+            info = summarize_json_payload(obj)
             if isinstance(obj, dict):
-                print(f"      Keys: {list(obj.keys())}")
-                # Look for any data-related keys
-                data_keys = [k for k in obj.keys() if any(term in k.lower() for term in ['data', 'ports', 'lanes', 'trade', 'shipping', 'import', 'export', 'company', 'supplier'])]
-                if data_keys:
-                    print(f"      Data-related keys: {data_keys}")
-            elif isinstance(obj, list) and obj:
-                print(f"      List with {len(obj)} items")
-                if isinstance(obj[0], dict):
-                    print(f"      First item keys: {list(obj[0].keys())}")
-        
-        # Save detailed analysis
-        analysis_file = f"network_analysis_{slugify_company(company_name)}.json"
-        analysis_data = {
-            "company": company_name,
-            "url": best_url,
-            "total_requests": summary['total_requests'],
-            "api_calls": summary['api_calls'],
-            "json_payloads": len(json_hits),
-            "all_requests": cap.all_requests,
-            "json_payloads_detail": [(url, type(obj).__name__, list(obj.keys()) if isinstance(obj, dict) else len(obj) if isinstance(obj, list) else "other") for url, obj in json_hits]
-        }
-        
-        with open(analysis_file, "w", encoding="utf-8") as f:
-            json.dump(analysis_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"\n10. Analysis saved to: {analysis_file}")
+                print(f"      Keys: {info['keys']}")
+                if info["data_keys"]:
+                    print(f"      Data-related keys: {info['data_keys']}")
+            elif info["items"]:
+                print(f"      List with {info['items']} items")
+                if info["first_item_keys"]:
+                    print(f"      First item keys: {info['first_item_keys']}")
+        
+        # Record the capture in the archive (bodies deduplicated, indexed by url/type/status/company)
+        archive = CaptureArchive(os.getenv("CAPTURE_ARCHIVE", DEFAULT_ARCHIVE))
+        capture_id = archive.record(company_name, cap.all_requests, url=best_url, payloads=json_hits)
+        
+        print(f"\n10. Capture {capture_id} saved to: {archive.path}")
+        print(f"    Query with: python3 capture_archive.py query --company {json.dumps(company_name)} --json-only")
         
     finally:
         driver.quit()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# analyze_state.py
+# Per-company source fingerprints for analyzeData.py --incremental.
+#
+# The state file remembers, for one source file and one set of settings
+# (gazetteer, regions, thresholds): the source's size/mtime, a content hash of
+# each company's records (spellings with one name_key together), each region's kept companies with their top ports,
+# and the size/mtime of every <region>_companies.jsonl it last wrote.
+# A run then re-aggregates only companies whose hash changed and rewrites an
+# output file only when its content would change.
+
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from jsonl_reader import DecodeError, JSONLStats, iter_lines, loads
+from name_normalize import name_key
+
+STATE_VERSION = 2
+DEFAULT_STATE = ".cache/analyze_state.json"
+
+
+def file_stamp(path):
+    """[size, mtime_ns] of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def settings_digest(gazetteer, regions, min_single, min_total):
+    doc = json.dumps([gazetteer.digest(), sorted(regions), min_single, min_total])
+    return hashlib.sha1(doc.encode("utf-8")).hexdigest()
+
+
+# "company" as the object's first key with a plain string value (no escapes):
+# the name is read from the raw bytes without decoding the line
+_LEADING_COMPANY = re.compile(rb'\s*\{\s*"company"\s*:\s*"([^"\\]+)"')
+
+
+def _leading_company(line):
+    m = _LEADING_COMPANY.match(line)
+    if m:
+        try:
+            return m.group(1).decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+    return None
+
+
+def _record_company(obj):
+    company = (obj.get("company") or obj.get("name") or "") if isinstance(obj, dict) else ""
+    return company if isinstance(company, str) else str(company)
+
+
+def _count_malformed(stats, where, err):
+    stats.malformed += 1
+    if len(stats.malformed_examples) < stats.MAX_EXAMPLES:
+        stats.malformed_examples.append((where, str(err)[:120]))
+
+
+def scan_companies(path, on_record=None, stats=None):
+    """
+    One pass over the raw source lines. Returns ({name_key: (fingerprint,
+    [(offset, length, line number), ...])}, non-blank line count); the fingerprint hashes
+    the raw lines of every spelling of the company, in file order, as
+    PortAggregate sums them. Lines that lead with a "company" string are not
+    decoded; with on_record every line is decoded and its object passed to
+    on_record, so a first run can aggregate in the same pass. Lines, blank
+    lines and lines that fail to decode here are counted in stats (a
+    JSONLStats); a malformed line that still leads with a company keeps its
+    span, and read_records counts it when it is read.
+    """
+    stats = stats if stats is not None else JSONLStats()
+    hashes, spans, line_no = {}, {}, 0
+    for offset, line in iter_lines(path):
+        line_no += 1
+        if not line or line.isspace():  # not strip(): that copies every line
+            stats.blank += 1
+            continue
+        stats.lines += 1
+        company = None if on_record else _leading_company(line)
+        if company is None:
+            try:
+                obj = loads(line)
+            except DecodeError as e:
+                _count_malformed(stats, f"line {line_no}", e)
+                obj = None
+                company = _leading_company(line) if on_record else None
+            if isinstance(obj, dict):
+                if on_record:
+                    stats.records += 1
+                    on_record(obj)
+                company = _record_company(obj)
+        if not company:
+            continue
+        company = name_key(company)
+        h = hashes.get(company)
+        if h is None:
+            h = hashes[company] = hashlib.blake2b(digest_size=16)
+            spans[company] = []
+        h.update(line)
+        h.update(b"\n")
+        spans[company].append((offset, len(line), line_no))
+    return {c: (h.hexdigest(), spans[c]) for c, h in hashes.items()}, stats.lines
+
+
+def read_records(path, spans, stats=None):
+    """
+    Decode the lines at (offset, length, line number) spans, in file order.
+    Lines that fail to decode are skipped and counted in stats, as iter_jsonl
+    does.
+    """
+    stats = stats if stats is not None else JSONLStats()
+    with open(path, "rb") as fh:
+        for offset, length, line_no in sorted(spans):
+            fh.seek(offset)
+            try:
+                obj = loads(fh.read(length))
+            except DecodeError as e:
+                _count_malformed(stats, f"line {line_no}", e)
+                continue
+            stats.records += 1
+            yield obj
+
+
+class AnalyzeState:
+    """Fingerprints, kept-company reports and output stamps from the last run."""
+
+    def __init__(self, path, data=None):
+        self.path = Path(path)
+        data = data or {}
+        self.src = data.get("src")
+        self.settings = data.get("settings")
+        self.src_stamp = data.get("src_stamp")
+        self.companies = data.get("companies", {})  # name_key -> fingerprint
+        self.reports = data.get("reports", {})      # region -> {company: [[port, shipments], ...]}
+        self.outputs = data.get("outputs", {})      # region -> stamp of <region>_companies.jsonl
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE):
+        """Previous state, or an empty one if missing, unreadable or from another version."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            return cls(path)
+        return cls(path, data)
+
+    def matches(self, src, settings):
+        return self.src == str(Path(src).resolve()) and self.settings == settings
+
+    def reset(self, src, settings):
+        """Forget everything (other source or settings): the next run recomputes every company."""
+        self.__init__(self.path, {"src": str(Path(src).resolve()), "settings": settings})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": STATE_VERSION,
+            "src": self.src,
+            "settings": self.settings,
+            "src_stamp": self.src_stamp,
+            "companies": self.companies,
+            "reports": self.reports,
+            "outputs": self.outputs,
+        }
+        with NamedTemporaryFile("w", delete=False, dir=str(self.path.parent), encoding="utf-8") as tmp:
+            # dumps, not dump: json.dump streams through the pure-Python encoder
+            tmp.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp.name, self.path)
@@ -5,11 +5,29 @@ Flask backend for Forum Mobility ESG Port Analytics
 
 import os
 import json
+import atexit
+import gzip
 import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from config import Config
+from cache_store import make_cache
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from name_normalize import name_key
+from port_records import CompanyResult
+from port_store import PortStore
+
 # Import the scraper functions
 from web_ports_extractor import (
     init_driver_attach, resolve_company_candidates, 
@@ -20,84 +38,324 @@ from web_ports_extractor import (
 app = Flask(__name__)
 CORS(app)
 
-# Configuration
-DEBUGGER_ADDR = os.getenv("CHROME_DEBUGGER", "127.0.0.1:9222")
-COMPANY_TXT = "consumerBCO.txt"
+# Configuration (environment variables, see config.py)
+config = Config()
+
+# Cache for company data: entries are fresh for config.cache_timeout, then
+# served stale (while refreshed in the background) up to config.cache_max_age.
+company_cache = make_cache(config)
+
+# Cache keys with a background refresh in flight
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+# Browser sessions: bounded per process, tracked so shutdown can close them
+_browser_slots = threading.BoundedSemaphore(config.max_browsers)
+_active_drivers = set()
+_drivers_lock = threading.Lock()
+_started = False
+
+# Metrics (served at /metrics, per process)
+metrics = Registry()
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"))
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Time to produce a response (streams: until first byte).",
+    ("route", "method"))
+CACHE_LOOKUPS = metrics.counter(
+    "company_cache_lookups_total", "Company cache lookups by result (hit, stale, miss).",
+    ("result",))
+CACHE_HIT_RATIO = metrics.gauge(
+    "company_cache_hit_ratio", "Share of cache lookups answered from cache (fresh or stale).")
+CACHE_ENTRIES = metrics.gauge("company_cache_entries", "Entries in the company cache.")
+SCRAPES = metrics.counter(
+    "scrapes_total", "Company scrapes by outcome (success, no_data or the exception type).",
+    ("outcome",))
+SCRAPE_SECONDS = metrics.histogram(
+    "scrape_duration_seconds", "Duration of company scrapes.", ("result",),
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300))
+SCRAPES_IN_PROGRESS = metrics.gauge(
+    "scrapes_in_progress", "Scrapes running or waiting for a browser session.")
+REFRESHES_IN_PROGRESS = metrics.gauge(
+    "cache_refreshes_in_progress", "Background stale-while-revalidate refreshes in flight.")
+BROWSER_ACTIVE = metrics.gauge("browser_sessions_active", "Open browser driver sessions.")
+BROWSER_CAPACITY = metrics.gauge("browser_sessions_capacity", "Maximum browser sessions (MAX_BROWSERS).")
+BROWSER_UTILISATION = metrics.gauge(
+    "browser_sessions_utilisation", "Open browser sessions as a share of capacity.")
+
+def _cache_hit_ratio():
+    hits = CACHE_LOOKUPS.value(result="hit") + CACHE_LOOKUPS.value(result="stale")
+    total = hits + CACHE_LOOKUPS.value(result="miss")
+    return hits / total if total else 0.0
+
+CACHE_HIT_RATIO.set_function(_cache_hit_ratio)
+CACHE_ENTRIES.set_function(lambda: len(company_cache))
+REFRESHES_IN_PROGRESS.set_function(lambda: len(_refreshing))
+BROWSER_ACTIVE.set_function(lambda: len(_active_drivers))
+BROWSER_CAPACITY.set_function(lambda: config.max_browsers)
+BROWSER_UTILISATION.set_function(lambda: len(_active_drivers) / config.max_browsers)
+
+# Company list, reloaded only when the file's mtime/size changes
+_company_list = {"stamp": None, "companies": []}
+_company_list_lock = threading.Lock()
+
+# Port query store (port_store.py), opened on first use once it exists
+_port_store = None
+_port_store_lock = threading.Lock()
+
+class _LRU:
+    """Small thread-safe LRU map for serialized and compressed bodies."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
 
-# Cache for company data
-company_cache = {}
-cache_timeout = 3600  # 1 hour
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+# version key -> (json bytes, digest); (digest, encoding) -> compressed bytes
+_response_bodies = _LRU(512)
+_compressed_bodies = _LRU(512)
 
 def get_company_list():
-    """Get list of companies from the text file."""
+    """
+    (stamp, companies) from the text file, re-reading it only when it changes.
+    Both are read under the lock, so the stamp always describes that list;
+    a missing file gives (None, []).
+    """
     try:
-        with open(COMPANY_TXT, encoding="utf-8") as f:
-            companies = [line.strip() for line in f if line.strip()]
-        return companies
+        st = os.stat(config.company_txt)
     except FileNotFoundError:
-        return []
+        return None, []
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _company_list_lock:
+        if _company_list["stamp"] != stamp:
+            with open(config.company_txt, encoding="utf-8") as f:
+                _company_list["companies"] = [line.strip() for line in f if line.strip()]
+            _company_list["stamp"] = stamp
+        return _company_list["stamp"], _company_list["companies"]
+
+def _compress(body, digest, encoding):
+    """Compress a body once per (digest, encoding) and reuse it afterwards."""
+    key = (digest, encoding)
+    out = _compressed_bodies.get(key)
+    if out is None:
+        if encoding == "br":
+            out = brotli.compress(body, quality=5)
+        else:
+            out = gzip.compress(body, compresslevel=6)
+        _compressed_bodies.put(key, out)
+    return out
+
+def json_response(payload, status=200, max_age=0, version=None):
+    """
+    Build a JSON response with a strong ETag, Cache-Control and gzip/brotli.
+
+    `version` identifies the payload content (e.g. cache key + cache time) so
+    the serialized body can be reused instead of re-encoding it each request.
+    Conditional requests whose If-None-Match matches get a bodiless 304.
+    """
+    cached = _response_bodies.get(version) if version is not None else None
+    if cached is None:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        cached = (body, hashlib.sha256(body).hexdigest()[:32])
+        if version is not None:
+            _response_bodies.put(version, cached)
+    body, digest = cached
+
+    if status != 200:
+        resp = Response(body, status=status, mimetype="application/json")
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
+    encoding = None
+    if len(body) >= config.compress_min_bytes:
+        if brotli is not None and request.accept_encodings["br"]:
+            encoding = "br"
+        elif request.accept_encodings["gzip"]:
+            encoding = "gzip"
+    # Each encoding is its own representation, so it gets its own strong tag
+    etag = f"{digest}-{encoding}" if encoding else digest
+
+    if request.method in ("GET", "HEAD") and request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        if encoding:
+            body = _compress(body, digest, encoding)
+        resp = Response(body, mimetype="application/json")
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    resp.headers["Vary"] = "Accept-Encoding"
+    if max_age > 0:
+        resp.headers["Cache-Control"] = f"public, max-age={int(max_age)}"
+    else:
+        resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 def format_port_data(topinfo):
     """Format port data for frontend consumption."""
-    export_ports = []
-    import_ports = []
-    trade_lanes = []
-    
+    # validate once; shipments are normalized ints (see port_records)
+    rec = CompanyResult.from_dict(topinfo)
+
     # Format export ports (ports shipped from)
-    for port in topinfo.get("exit_ports", []):
-        export_ports.append({
-            "port": port.get("port", "Unknown"),
-            "shipments": port.get("shipments", 0)
-        })
-    
+    export_ports = [{"port": p.port or "Unknown", "shipments": p.shipments} for p in rec.exit_ports]
+
     # Format import ports (ports shipped to)
-    for port in topinfo.get("entry_ports", []):
-        import_ports.append({
-            "port": port.get("port", "Unknown"),
-            "shipments": port.get("shipments", 0)
-        })
-    
+    import_ports = [{"port": p.port or "Unknown", "shipments": p.shipments} for p in rec.entry_ports]
+
     # Format trade lanes
-    for lane in topinfo.get("lanes", []):
-        trade_lanes.append({
-            "exit_port": lane.get("exit_port", "Unknown"),
-            "entry_port": lane.get("entry_port", "Unknown"),
-            "shipments": lane.get("shipments", 0)
-        })
-    
+    trade_lanes = [
+        {
+            "exit_port": lane.exit_port or "Unknown",
+            "entry_port": lane.entry_port or "Unknown",
+            "shipments": lane.shipments,
+        }
+        for lane in rec.lanes
+    ]
+
     return {
         "export_ports": export_ports,
         "import_ports": import_ports,
         "trade_lanes": trade_lanes
     }
 
+def _close_driver(driver):
+    """Quit a driver session and stop tracking it."""
+    with _drivers_lock:
+        _active_drivers.discard(driver)
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Error closing browser session: {e}")
+
+def _scrape_with_browser(company_name):
+    """Attach a browser session and scrape one company (raises on failure)."""
+    driver = None
+    with _browser_slots:
+        try:
+            # Initialize driver
+            driver = init_driver_attach(config.debugger_addr)
+            with _drivers_lock:
+                _active_drivers.add(driver)
+            
+            # Find company candidates
+            cands = resolve_company_candidates(driver, company_name)
+            if not cands:
+                return None
+            
+            # Use the best candidate
+            best_url = cands[0]
+            slug_hint = slugify_company(company_name)
+            
+            # Fetch data
+            html, topinfo, cap = fetch_company_page_and_ports(driver, best_url, slug_hint=slug_hint)
+            
+            # Format data for frontend
+            return format_port_data(topinfo)
+            
+        finally:
+            if driver is not None:
+                _close_driver(driver)
+
 def scrape_company_data(company_name):
     """Scrape port data for a specific company."""
+    started = time.perf_counter()
+    SCRAPES_IN_PROGRESS.inc()
     try:
-        # Initialize driver
-        driver = init_driver_attach(DEBUGGER_ADDR)
-        
-        # Find company candidates
-        cands = resolve_company_candidates(driver, company_name)
-        if not cands:
-            return None
-        
-        # Use the best candidate
-        best_url = cands[0]
-        slug_hint = slugify_company(company_name)
-        
-        # Fetch data
-        html, topinfo, cap = fetch_company_page_and_ports(driver, best_url, slug_hint=slug_hint)
-        
-        # Format data for frontend
-        formatted_data = format_port_data(topinfo)
-        
-        driver.quit()
-        return formatted_data
-        
+        data = _scrape_with_browser(company_name)
+        outcome = "success" if data else "no_data"
     except Exception as e:
         print(f"Error scraping {company_name}: {e}")
-        return None
+        data, outcome = None, type(e).__name__
+    finally:
+        SCRAPES_IN_PROGRESS.dec()
+    SCRAPE_SECONDS.observe(time.perf_counter() - started, result="success" if data else "failure")
+    SCRAPES.inc(outcome=outcome)
+    return data
+
+def refresh_company_async(company_name, cache_key):
+    """Re-scrape a company in a background thread (one refresh per key at a time)."""
+    with _refresh_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def worker():
+        try:
+            print(f"Refreshing stale data for: {company_name}")
+            data = scrape_company_data(company_name)
+            if data:
+                company_cache[cache_key] = (data, time.time())
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(cache_key)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+def lookup_cached(company_name, cache_key, current_time):
+    """
+    Return (data, cache_time, stale) if the cache can answer, else None.
+    Stale hits schedule a background refresh.
+    """
+    entry = company_cache.get(cache_key)
+    if entry is not None:
+        cached_data, cache_time = entry
+        age = current_time - cache_time
+        if age < config.cache_timeout:
+            CACHE_LOOKUPS.inc(result="hit")
+            return cached_data, cache_time, False
+        if age < config.cache_max_age:
+            CACHE_LOOKUPS.inc(result="stale")
+            refresh_company_async(company_name, cache_key)
+            return cached_data, cache_time, True
+    CACHE_LOOKUPS.inc(result="miss")
+    return None
+
+def fetch_company_result(company_name):
+    """Scrape one company for a batch request, cache it and return its result entry."""
+    print(f"Scraping data for: {company_name}")
+    data = scrape_company_data(company_name)
+    if not data:
+        return {
+            "company": company_name,
+            "success": False,
+            "error": "No data available for this company"
+        }
+    company_cache[name_key(company_name)] = (data, time.time())
+    return {
+        "company": company_name,
+        "success": True,
+        "data": data,
+        "cached": False,
+        "stale": False
+    }
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
@@ -107,27 +365,38 @@ def index():
 @app.route('/api/companies')
 def get_companies():
     """Get list of available companies."""
-    companies = get_company_list()
-    return jsonify({
+    stamp, companies = get_company_list()
+    return json_response({
         "companies": companies,
         "total": len(companies)
-    })
+    }, max_age=config.company_list_max_age, version=("companies", stamp) if stamp is not None else None)
 
 @app.route('/api/company/<company_name>')
 def get_company_data(company_name):
     """Get port data for a specific company."""
     # Check cache first
-    cache_key = company_name.lower()
+    cache_key = name_key(company_name)
     current_time = time.time()
     
-    if cache_key in company_cache:
-        cached_data, cache_time = company_cache[cache_key]
-        if current_time - cache_time < cache_timeout:
-            return jsonify({
+    hit = lookup_cached(company_name, cache_key, current_time)
+    if hit:
+        cached_data, cache_time, stale = hit
+        age = current_time - cache_time
+        if not stale:
+            return json_response({
                 "success": True,
                 "data": cached_data,
-                "cached": True
-            })
+                "cached": True,
+                "stale": False
+            }, max_age=config.cache_timeout - age, version=("company", cache_key, cache_time, True))
+        # Serve the expired entry now; lookup_cached started the refresh
+        return json_response({
+            "success": True,
+            "data": cached_data,
+            "cached": True,
+            "stale": True,
+            "age": int(age)
+        })
     
     # Scrape fresh data
     print(f"Scraping data for: {company_name}")
@@ -137,16 +406,147 @@ def get_company_data(company_name):
         # Cache the result
         company_cache[cache_key] = (data, current_time)
         
-        return jsonify({
+        return json_response({
             "success": True,
             "data": data,
-            "cached": False
-        })
+            "cached": False,
+            "stale": False
+        }, max_age=config.cache_timeout, version=("company", cache_key, current_time, False))
     else:
-        return jsonify({
+        return json_response({
             "success": False,
             "error": "No data available for this company"
-        }), 404
+        }, status=404)
+
+@app.route('/api/companies/batch', methods=['POST'])
+def get_companies_batch():
+    """
+    Get port data for many companies in one request.
+
+    Body: {"companies": ["Name", ...]}. Cache hits are answered immediately and
+    misses are scraped concurrently; each result carries its own success/error.
+    With ?stream=1 (or Accept: application/x-ndjson) results are sent as NDJSON,
+    one line per company as soon as it is ready.
+    """
+    body = request.get_json(silent=True) or {}
+    names = body.get("companies")
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return json_response({
+            "success": False,
+            "error": "Expected a JSON body like {\"companies\": [\"name\", ...]}"
+        }, status=400)
+
+    # Drop blanks and duplicates (by cache key), keep request order
+    unique = {}
+    for name in names:
+        name = name.strip()
+        if name:
+            unique.setdefault(name_key(name), name)
+    if len(unique) > config.batch_max_companies:
+        return json_response({
+            "success": False,
+            "error": f"At most {config.batch_max_companies} companies per batch"
+        }, status=400)
+
+    current_time = time.time()
+    results = {}
+    misses = []
+    for cache_key, name in unique.items():
+        hit = lookup_cached(name, cache_key, current_time)
+        if hit:
+            cached_data, _, stale = hit
+            results[cache_key] = {
+                "company": name,
+                "success": True,
+                "data": cached_data,
+                "cached": True,
+                "stale": stale
+            }
+        else:
+            misses.append(name)
+
+    stream = (request.args.get("stream", "").lower() in ("1", "true")
+              or "application/x-ndjson" in request.headers.get("Accept", ""))
+
+    if stream:
+        def generate():
+            for result in results.values():
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            if not misses:
+                return
+            pool = ThreadPoolExecutor(max_workers=min(config.batch_workers, len(misses)))
+            try:
+                futures = [pool.submit(fetch_company_result, name) for name in misses]
+                for fut in as_completed(futures):
+                    yield json.dumps(fut.result(), ensure_ascii=False) + "\n"
+            finally:
+                # Client went away: don't start scrapes nobody will read
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(config.batch_workers, len(misses))) as pool:
+            for result in pool.map(fetch_company_result, misses):
+                results[name_key(result["company"])] = result
+
+    ordered = [results[key] for key in unique]
+    succeeded = sum(1 for r in ordered if r["success"])
+    return json_response({
+        "success": succeeded > 0,
+        "results": ordered,
+        "total": len(ordered),
+        "succeeded": succeeded,
+        "failed": len(ordered) - succeeded
+    })
+
+def get_port_store():
+    """Open the port query store on first use; None until it has been built."""
+    global _port_store
+    if _port_store is None:
+        with _port_store_lock:
+            if _port_store is None and os.path.exists(config.store_path):
+                _port_store = PortStore(config.store_path)
+    return _port_store
+
+def _store_unavailable():
+    return json_response({
+        "success": False,
+        "error": "Port store not built (python3 port_store.py load bco_ports.jsonl)"
+    }, status=503)
+
+@app.route('/api/ports/<port>/companies')
+def get_port_companies(port):
+    """Companies shipping through a port: ?direction=entry|exit&min=N&limit=N."""
+    store = get_port_store()
+    if store is None:
+        return _store_unavailable()
+    direction = request.args.get("direction") or None
+    if direction not in (None, "entry", "exit"):
+        return json_response({"success": False, "error": "direction must be 'entry' or 'exit'"}, status=400)
+    rows = store.companies_through(port, direction,
+                                   request.args.get("min", 1, type=int),
+                                   request.args.get("limit", 100, type=int))
+    return json_response({
+        "success": True,
+        "port": store.resolve_port(port),
+        "direction": direction,
+        "companies": [{"company": c, "shipments": n} for c, n in rows]
+    }, max_age=config.store_max_age)
+
+@app.route('/api/lanes')
+def get_lanes():
+    """Companies on exit -> entry lanes: ?from=PORT&to=PORT&min=N&limit=N (either end optional)."""
+    store = get_port_store()
+    if store is None:
+        return _store_unavailable()
+    rows = store.lane_companies(request.args.get("from"), request.args.get("to"),
+                                request.args.get("min", 1, type=int),
+                                request.args.get("limit", 100, type=int))
+    return json_response({
+        "success": True,
+        "lanes": [{"company": c, "exit_port": x, "entry_port": n, "shipments": t} for c, x, n, t in rows]
+    }, max_age=config.store_max_age)
 
 @app.route('/api/health')
 def health_check():
@@ -157,6 +557,11 @@ def health_check():
         "cache_size": len(company_cache)
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics for this process."""
+    return Response(metrics.render(), mimetype=METRICS_CONTENT_TYPE)
+
 @app.route('/api/cache/clear')
 def clear_cache():
     """Clear the company data cache."""
@@ -178,14 +583,41 @@ def setup_templates():
         import shutil
         shutil.move("index.html", "templates/index.html")
 
-if __name__ == '__main__':
+def startup():
+    """One-time process startup: templates, cache housekeeping, config log."""
+    global _started
+    if _started:
+        return
+    _started = True
     setup_templates()
+    pruned = company_cache.prune(config.cache_max_age)
+    print(f"[startup] pid={os.getpid()} {config.summary()} (pruned {pruned} expired cache entries)")
+
+def shutdown():
+    """Close any browser sessions still open (worker exit / interpreter exit)."""
+    with _drivers_lock:
+        drivers = list(_active_drivers)
+    for driver in drivers:
+        _close_driver(driver)
+    if drivers:
+        print(f"[shutdown] pid={os.getpid()} closed {len(drivers)} browser session(s)")
+    close = getattr(company_cache, "close", None)
+    if close:
+        close()
+    if _port_store is not None:
+        _port_store.close()
+
+atexit.register(shutdown)
+
+if __name__ == '__main__':
+    startup()
     
     print("Forum Mobility ESG Port Analytics")
     print("=" * 40)
     print("Starting Flask server...")
     print("Make sure Chrome is running with remote debugging enabled:")
     print("open -na 'Google Chrome' --args --remote-debugging-port=9222 --user-data-dir='$HOME/ChromeScrapeProfile'")
-    print("\nAccess the application at: http://localhost:8081")
+    print(f"\nAccess the application at: http://localhost:{config.port}")
+    print("For production use: gunicorn -c gunicorn.conf.py wsgi:application")
     
-    app.run(debug=True, host='0.0.0.0', port=8081)
+    app.run(debug=config.debug, host=config.host, port=config.port)
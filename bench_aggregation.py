@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial vs sharded aggregation of bco_ports JSONL.
+
+Builds a synthetic corpus by repeating the source records under distinct
+company names, then times PortAggregate.from_jsonl for each worker count and
+checks every parallel result against the serial one.
+
+    python3 bench_aggregation.py --src bco_ports_80.jsonl --copies 500 --workers 1,2,4,8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from port_gazetteer import PortGazetteer
+from port_aggregation import PortAggregate
+from jsonl_reader import read_jsonl
+
+
+def build_corpus(src, copies, out_path):
+    records = read_jsonl(src)
+    with open(out_path, "w", encoding="utf-8") as w:
+        for i in range(copies):
+            for rec in records:
+                rec = dict(rec, company=f"{rec.get('company', '')} #{i}")
+                w.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return len(records) * copies
+
+
+def same(a, b):
+    ca, cb = a._columns(), b._columns()
+    return (a.companies == b.companies and a.labels == b.labels
+            and all(np.array_equal(ca[k], cb[k]) for k in ca))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default="bco_ports_80.jsonl")
+    ap.add_argument("--copies", type=int, default=500, help="times to repeat the source records")
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    args = ap.parse_args()
+
+    gazetteer = PortGazetteer.load()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.jsonl")
+        n = build_corpus(args.src, args.copies, path)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"corpus: {n:,} lines, {size_mb:.1f} MB, {os.cpu_count()} CPU(s)")
+
+        baseline = None
+        for w in [int(x) for x in args.workers.split(",")]:
+            t0 = time.perf_counter()
+            agg = PortAggregate.from_jsonl(path, gazetteer, workers=w)
+            agg.report("west_coast", 10, 25)
+            dt = time.perf_counter() - t0
+            if baseline is None:
+                baseline, base_dt = agg, dt
+            ok = "identical" if same(agg, baseline) else "MISMATCH"
+            print(f"workers={w:<3} {dt:7.2f}s  {size_mb / dt:6.1f} MB/s  "
+                  f"speedup x{base_dt / dt:4.2f}  {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark entity_resolution.EntityResolver on synthetic company names:
+--queries names (default 100k) resolved against --targets names (10k).
+Queries are perturbed copies of targets (case, punctuation, legal suffix,
+dropped "The", initials) mixed with unrelated names. Also times the
+unblocked all-pairs scorer on a --sample of the queries and extrapolates.
+
+    python3 bench_entity_resolution.py --queries 100000 --targets 10000
+"""
+
+import time
+import random
+import argparse
+
+from entity_resolution import EntityResolver, _Query
+from name_normalize import normalize
+
+WORDS = """
+    global pacific atlantic united american china north south east west general
+    national international consumer foods beverage apparel motors energy steel
+    chemical pharma health retail home brands logistics shipping marine paper
+    electric power solar digital systems textiles furniture toys sports outdoor
+    coffee dairy farms fresh organic star eagle lion bear river mountain ocean
+    valley summit pioneer liberty heritage crown royal golden silver blue green
+""".split()
+SUFFIXES = ["Inc", "Inc.", "Corp", "Corporation", "Co", "Company", "Ltd", "LLC", "AG", "S.A.", "GmbH", "plc", "Holdings", ""]
+
+
+def make_name(rng):
+    stem = [rng.choice(WORDS) for _ in range(rng.randint(1, 3))]
+    stem.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 8))))
+    rng.shuffle(stem)
+    return " ".join(w.title() for w in stem) + (" " + rng.choice(SUFFIXES)).rstrip()
+
+
+def perturb(name, rng):
+    words = name.split()
+    r = rng.random()
+    if r < 0.25:
+        return name.upper()
+    if r < 0.5:
+        return " ".join(words[:-1] or words) + " " + rng.choice(SUFFIXES)
+    if r < 0.7:
+        return "-".join(words)
+    if r < 0.85:
+        return "The " + name
+    return name.replace("a", "e", 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=100_000)
+    ap.add_argument("--targets", type=int, default=10_000)
+    ap.add_argument("--sample", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    targets = [make_name(rng) for _ in range(args.targets)]
+    queries = [perturb(rng.choice(targets), rng) if rng.random() < 0.6 else make_name(rng)
+               for _ in range(args.queries)]
+    print(f"{len(queries):,} queries x {len(targets):,} targets")
+
+    t0 = time.perf_counter()
+    resolver = EntityResolver(targets)
+    t1 = time.perf_counter()
+    found = resolver.resolve(queries)
+    t2 = time.perf_counter()
+    methods = {}
+    for m in found.values():
+        key = m.method if m else "none"
+        methods[key] = methods.get(key, 0) + 1
+    print(f"  index {len(resolver):,} targets   {(t1 - t0) * 1000:8.1f} ms")
+    print(f"  resolve (blocked)       {(t2 - t1) * 1000:8.1f} ms  {methods}")
+
+    # unblocked reference: score every target for a sample of the queries
+    sample = queries[:args.sample]
+    t0 = time.perf_counter()
+    agree = 0
+    for name in sample:
+        q = _Query(name, normalize(name))
+        best = None
+        for t in resolver.targets:
+            score, method = resolver.score(q, t)
+            key = (-score, len(t.name), t.name)
+            if score >= resolver.threshold and (best is None or key < best):
+                best = key
+        m = found[name]
+        agree += (best is None) == (m is None) and (best is None or round(-best[0], 3) == m.score)
+    dt = time.perf_counter() - t0
+    print(f"  all pairs, {len(sample)} queries  {dt * 1000:8.1f} ms  "
+          f"(~{dt / len(sample) * len(queries):,.0f} s for all; blocked agrees on {agree}/{len(sample)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark EnhancedImportYetiScraper.extract_data_from_apis on large nested
+API payloads: the previous per-key search (a fresh recursive find_nested
+walk for each of the ~30 json_keys, first truthy hit only) against the
+single-walk key index (every occurrence).
+
+Each synthetic payload holds --records shipment records (a few dozen nested
+fields each) with the port/lane keys the extractor looks for placed once
+near the top and, with --repeat > 1, again inside per-year breakdowns.
+
+    python3 bench_extraction.py --records 20000 --repeat 3
+"""
+
+import io
+import time
+import random
+import argparse
+import contextlib
+
+from improved_scraper import EnhancedImportYetiScraper
+
+
+def previous_extract(scraper, api_results):
+    """extract_data_from_apis before the key index, for comparison."""
+    def find_nested(obj, target_key):
+        if isinstance(obj, dict):
+            if target_key in obj:
+                return obj[target_key]
+            for v in obj.values():
+                result = find_nested(v, target_key)
+                if result:
+                    return result
+        elif isinstance(obj, list):
+            for item in obj:
+                result = find_nested(item, target_key)
+                if result:
+                    return result
+        return None
+
+    extracted = {"exit_ports": [], "entry_ports": [], "lanes": []}
+    for result in api_results:
+        data = result.get("data", {})
+        for group in ["ports", "lanes", "map_data"]:
+            for key in scraper.extraction_patterns["json_keys"][group]:
+                found = find_nested(data, key)
+                if not found:
+                    continue
+                if "exit" in key or "from" in key or "origin" in key:
+                    extracted["exit_ports"].extend(scraper._normalize_ports(found))
+                elif "entry" in key or "to" in key or "destination" in key:
+                    extracted["entry_ports"].extend(scraper._normalize_ports(found))
+                elif "lane" in key or "route" in key:
+                    extracted["lanes"].extend(scraper._normalize_lanes(found))
+    return extracted
+
+
+def make_payload(rng, records, repeat):
+    def ports(n):
+        return [{"port": f"Port {rng.randint(1, 400)}", "shipments": rng.randint(1, 5000)} for _ in range(n)]
+
+    shipments = [{
+        "id": i,
+        "bill": {"number": f"BL{i:08d}", "carrier": {"name": "Carrier", "scac": "ABCD"}},
+        "consignee": {"name": "Co", "address": {"line": "1 Main", "city": "Long Beach", "country": "US"}},
+        "items": [{"hs": "9403", "desc": "furniture", "weight": rng.random() * 1000} for _ in range(3)],
+        "dates": {"arrival": "2024-01-01", "departure": "2023-12-01"},
+    } for i in range(records)]
+    company = {
+        "name": "Example Co",
+        "exit_ports": ports(8),
+        "entry_ports": ports(8),
+        "lane_permutations": [{"exit_port": "Yantian", "entry_port": "Long Beach", "shipments": 10}],
+        "map_table": {"rows": ports(20)},
+    }
+    years = [{"year": 2020 + y, "exit_ports": ports(5), "entry_ports": ports(5),
+              "trade_lanes": [{"exit_port": "Ningbo", "entry_port": "Oakland", "shipments": y + 1}]}
+             for y in range(repeat - 1)]
+    return {"data": {"company": company, "shipments": shipments, "by_year": years}}
+
+
+def count_nodes(obj):
+    n, stack = 0, [obj]
+    while stack:
+        node = stack.pop()
+        n += 1
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=20_000)
+    ap.add_argument("--repeat", type=int, default=3, help="occurrences of each port/lane key")
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    scraper = EnhancedImportYetiScraper()
+    payload = make_payload(random.Random(0), args.records, args.repeat)
+    api_results = [{"success": True, "data": payload, "url": "bench"}]
+    print(f"payload: {count_nodes(payload):,} JSON nodes, {len(scraper.target_keys)} target keys")
+
+    single = make_payload(random.Random(0), args.records, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        same = previous_extract(scraper, [{"data": single}]) == scraper.extract_data_from_apis([{"data": single}])
+    print(f"  one occurrence per key: results {'same' if same else 'DIFFERENT'}")
+
+    base = None
+    for name, fn in (("per-key walks", lambda: previous_extract(scraper, api_results)),
+                     ("one-walk index", lambda: scraper.extract_data_from_apis(api_results))):
+        best = float("inf")
+        for _ in range(args.rounds):
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                out = fn()
+                best = min(best, time.perf_counter() - t0)
+        base = base or best
+        rows = ", ".join(f"{len(v)} {k}" for k, v in out.items())
+        print(f"  {name:<16} {best * 1000:8.1f} ms  x{base / best:5.1f}  ({rows})")
+
+
+if __name__ == "__main__":
+    main()
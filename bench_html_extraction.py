@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark HTML extraction on saved company pages: the previous
+enhanced_html_extraction (BeautifulSoup html.parser, a select() pass per
+html_selectors entry and a text scan of every table, extracting nothing)
+against html_tables.extract_tables with each installed parser backend.
+
+Pages come from --pages (a directory of saved .html files); without it a
+synthetic page is generated: --filler navigation/card blocks around port
+tables and lists of --rows rows.
+
+    python3 bench_html_extraction.py --pages saved_pages/
+    python3 bench_html_extraction.py --rows 50 --filler 3000
+"""
+
+import time
+import random
+import argparse
+from pathlib import Path
+
+from bypass_cloudflare import get_enhanced_extraction_patterns
+from html_tables import BACKENDS, extract_tables
+
+
+def previous_extraction(html, selectors):
+    """enhanced_html_extraction before html_tables, for comparison (finds tables, extracts no rows)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    for selector in selectors:
+        try:
+            soup.select(selector)
+        except Exception:
+            continue
+    relevant = 0
+    for table in soup.find_all('table'):
+        table_text = table.get_text().lower()
+        if any(keyword in table_text for keyword in ['port', 'lane', 'shipping', 'trade']):
+            relevant += 1
+    return relevant
+
+
+def synthetic_page(rng, rows, filler):
+    def table(title, headers, make_row):
+        body = "".join("<tr>" + "".join(f"<td>{c}</td>" for c in make_row(i)) + "</tr>" for i in range(rows))
+        head = "".join(f"<th>{h}</th>" for h in headers)
+        return f'<section class="card"><h2>{title}</h2><table class="table"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table></section>'
+
+    cards = [
+        f'<div class="card item-{i}"><a href="/c/{i}">Company {i}</a><span class="muted">{rng.randint(1, 99)} suppliers</span>'
+        f'<ul class="tags"><li>tag {i}</li><li>apparel</li></ul></div>' for i in range(filler)]
+    scripts = "<script>window.__DATA__ = {" + ",".join(f'"k{i}": {i}' for i in range(filler)) + "};</script>"
+    return ("<html><head><title>Example Co</title>" + scripts + "</head><body><nav><ul><li>Home</li><li>Search</li></ul></nav>"
+            + "".join(cards[:filler // 2])
+            + table("Top Exit Ports", ["Port", "Country", "Shipments"],
+                    lambda i: (f"Port {i}", "China", f"{rng.randint(1, 9999):,}"))
+            + table("Top US Entry Ports", ["Port", "Shipments"], lambda i: (f"US Port {i}", rng.randint(1, 999)))
+            + table("Trade Lanes", ["Lane", "Shipments"], lambda i: (f"Port {i} → US Port {i}", rng.randint(1, 99)))
+            + '<div class="export-ports"><h3>Exit ports</h3><ul>'
+            + "".join(f"<li>Port {i} — {rng.randint(1, 500)} shipments</li>" for i in range(rows)) + "</ul></div>"
+            + "".join(cards[filler // 2:]) + "</body></html>")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", help="directory of saved .html pages")
+    ap.add_argument("--rows", type=int, default=25)
+    ap.add_argument("--filler", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.pages:
+        pages = [p.read_text(encoding="utf-8", errors="replace") for p in sorted(Path(args.pages).rglob("*.htm*"))]
+    else:
+        pages = [synthetic_page(random.Random(0), args.rows, args.filler)]
+    if not pages:
+        raise SystemExit(f"no .html pages under {args.pages}")
+    print(f"{len(pages)} page(s), {sum(map(len, pages)) / 1e6:.2f} MB; backends: {', '.join(BACKENDS)}")
+
+    selectors = get_enhanced_extraction_patterns()["html_selectors"]
+    cases = []
+    if "html.parser" in BACKENDS:
+        cases.append(("previous (html.parser)", lambda html: (previous_extraction(html, selectors), 0)))
+    for name in BACKENDS:
+        def run(html, name=name):
+            r = extract_tables(html, name)
+            return r.mapped, len(r.exit_ports) + len(r.entry_ports) + len(r.lanes)
+        cases.append((f"html_tables ({name})", run))
+
+    base = None
+    for label, fn in cases:
+        best = float("inf")
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            found = [fn(html) for html in pages]
+            best = min(best, time.perf_counter() - t0)
+        base = base or best
+        blocks, rows = sum(f[0] for f in found), sum(f[1] for f in found)
+        print(f"  {label:<26} {best / len(pages) * 1000:8.1f} ms/page  x{base / best:5.1f}  "
+              f"({blocks} tables/lists, {rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSONL ingestion: the old per-line text loop (open() + json.loads)
+against jsonl_reader with the stdlib decoder and with the fast backend.
+
+Runs on the source file and on a synthetic file built by repeating the
+source lines up to --size-mb (1 GB by default; use less on small machines).
+
+    python3 bench_jsonl.py --src bco_ports_80.jsonl --size-mb 1024
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import jsonl_reader
+from jsonl_reader import JSONLStats, iter_jsonl
+
+
+def text_loop(path):
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                json.loads(s)
+            except json.JSONDecodeError:
+                continue
+            n += 1
+    return n
+
+
+def reader(decode):
+    def run(path):
+        stats = JSONLStats()
+        for _ in iter_jsonl(path, stats=stats, decode=decode):
+            pass
+        return stats.records
+    return run
+
+
+def build_synthetic(src, size_mb, out_path):
+    with open(src, "rb") as f:
+        chunk = b"".join(l if l.endswith(b"\n") else l + b"\n" for l in f if l.strip())
+    target = int(size_mb * 1e6)
+    with open(out_path, "wb") as w:
+        written = 0
+        while written < target:
+            w.write(chunk)
+            written += len(chunk)
+
+
+def bench(path, runs):
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"{os.path.basename(path)}: {size_mb:,.1f} MB")
+    cases = [("text loop + json", text_loop), ("reader + json", reader(json.loads))]
+    if jsonl_reader.BACKEND != "json":
+        cases.append((f"reader + {jsonl_reader.BACKEND}", reader(jsonl_reader.loads)))
+    base = None
+    for name, fn in cases:
+        best = float("inf")
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            n = fn(path)
+            best = min(best, time.perf_counter() - t0)
+        base = base or best
+        print(f"  {name:<22} {best:8.3f}s  {size_mb / best:7.1f} MB/s  x{base / best:4.2f}  ({n:,} records)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default="bco_ports_80.jsonl")
+    ap.add_argument("--size-mb", type=float, default=1024, help="synthetic file size (0 = skip)")
+    ap.add_argument("--runs", type=int, default=5, help="best of N on the source file")
+    args = ap.parse_args()
+
+    bench(args.src, args.runs)
+    if args.size_mb > 0:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.jsonl")
+            build_synthetic(args.src, args.size_mb, path)
+            bench(path, 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark company-name normalization over a name column: the previous
+row-by-row normalize (strip_accents + two re.sub per value), the memoized
+name_normalize.normalize, and the vectorized normalize_series over the
+distinct values. Names come from --names, repeated --copies times in
+shuffled order (a column where names repeat, as in the ZeroTracker CSV).
+
+    python3 bench_normalize.py --names globalBCO.txt --copies 200
+"""
+
+import re
+import time
+import argparse
+import unicodedata
+
+import pandas as pd
+
+from name_normalize import normalize, normalize_series
+
+
+def previous(s):
+    if s is None:
+        return ""
+    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    s = s.lower().replace("&", " and ")
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--names", default="globalBCO.txt")
+    ap.add_argument("--copies", type=int, default=200)
+    args = ap.parse_args()
+
+    with open(args.names, "r", encoding="utf-8") as f:
+        names = [line.strip() for line in f if line.strip()]
+    column = pd.Series(names * args.copies)
+    column = column.sample(frac=1, random_state=0).reset_index(drop=True)
+    print(f"{len(column):,} values, {column.nunique():,} distinct")
+
+    def vectorized():
+        uniq = pd.Series(column.unique())
+        return column.map(dict(zip(uniq, normalize_series(uniq))))
+
+    cases = [
+        ("row by row", lambda: column.map(previous)),
+        ("memoized", lambda: column.map(normalize)),
+        ("vectorized distinct", vectorized),
+    ]
+    base = expected = None
+    for name, fn in cases:
+        normalize.cache_clear()
+        t0 = time.perf_counter()
+        out = fn().tolist()
+        dt = time.perf_counter() - t0
+        base = base or dt
+        expected = expected or out
+        same = "same" if out == expected else "DIFFERENT"
+        print(f"  {name:<20} {dt * 1000:8.1f} ms  x{base / dt:5.1f}  ({same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark shipment inference from notes: the previous per-call re.search
+version against the cached compiled scanner (parse_shipments_from_notes),
+over every note in the source repeated --copies times.
+
+    python3 bench_notes.py --src bco_ports_80.jsonl --copies 200
+"""
+
+import re
+import time
+import argparse
+
+from jsonl_reader import read_jsonl
+from port_records import WORD_TO_NUM, parse_shipments_from_notes
+
+
+def previous(notes):
+    if not notes:
+        return None
+    s = str(notes).strip().lower()
+    m = re.search(r"\b(\d+)\s+(?:shipment|shipments|record|records|import\s+records)\b", s)
+    if m:
+        return int(m.group(1))
+    m = re.search(r"\b(one|two|three|four|five|six|seven|eight|nine|ten)\s+(?:shipment|shipments|record|records|import\s+records)\b", s)
+    return WORD_TO_NUM.get(m.group(1)) if m else None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default="bco_ports_80.jsonl")
+    ap.add_argument("--copies", type=int, default=200)
+    args = ap.parse_args()
+
+    notes = [it.get("notes") for r in read_jsonl(args.src)
+             for k in ("top_entry_ports", "top_exit_ports", "top_lanes")
+             for it in (r.get(k) or []) if isinstance(it, dict)] * args.copies
+    print(f"{len(notes):,} notes, {len(set(notes)):,} distinct")
+
+    cases = [
+        ("re.search per call", lambda: [previous(n) for n in notes]),
+        ("cached scanner", lambda: [parse_shipments_from_notes(n) for n in notes]),
+    ]
+    base = None
+    for name, fn in cases:
+        parse_shipments_from_notes.cache_clear()
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        base = base or dt
+        print(f"  {name:<20} {dt * 1000:8.1f} ms  x{base / dt:5.1f}  ({sum(v is not None for v in out):,} counts)")
+
+
+if __name__ == "__main__":
+    main()
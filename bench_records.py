@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Memory and time of holding bco_ports results as loose dicts vs port_records.
+
+Loads the source --copies times (distinct company names, as a larger crawl
+would produce) both ways and reports traced allocation per record.
+
+    python3 bench_records.py --src bco_ports_80.jsonl --copies 200
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from jsonl_reader import read_jsonl, loads
+from port_records import CompanyResult
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    held = build()
+    dt = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size, dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default="bco_ports_80.jsonl")
+    ap.add_argument("--copies", type=int, default=200)
+    args = ap.parse_args()
+
+    with open(args.src, "rb") as f:
+        lines = [l for l in f if l.strip()]
+
+    def as_dicts():
+        return [dict(loads(l), company=f"{i}") for i in range(args.copies) for l in lines]
+
+    def as_records():
+        out = []
+        for i in range(args.copies):
+            for l in lines:
+                rec = CompanyResult.from_dict(loads(l))
+                rec.company = f"{i}"
+                out.append(rec)
+        return out
+
+    dicts, dict_bytes, dict_dt = measure(as_dicts)
+    n = len(dicts)
+    del dicts
+    records, rec_bytes, rec_dt = measure(as_records)
+    assert len(records) == n and len(read_jsonl(args.src)) == len(lines)
+
+    print(f"{n:,} company results ({args.copies} x {args.src})")
+    print(f"  nested dicts    {dict_bytes / 1e6:8.1f} MB  {dict_bytes / n:7.0f} B/record  {dict_dt:6.2f}s")
+    print(f"  port_records    {rec_bytes / 1e6:8.1f} MB  {rec_bytes / n:7.0f} B/record  {rec_dt:6.2f}s"
+          f"  ({rec_bytes / dict_bytes:.0%} of dicts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,15 @@
 import time
 import random
 import json
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
+
+try:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.action_chains import ActionChains
+except ImportError:
+    # get_enhanced_extraction_patterns() is also used offline (replay_extraction.py)
+    By = WebDriverWait = EC = ActionChains = None
 
 def setup_stealth_driver(driver):
     """Enhanced stealth configuration for bypassing Cloudflare"""
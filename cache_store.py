@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Cache backends for company port data.
+
+Both backends map cache_key -> (data, cache_time) with the small dict-like
+surface app.py uses (get / [] / in / len / clear). MemoryCache lives in one
+process; SQLiteCache is a file shared by every worker of a multi-process server.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import weakref
+import threading
+from pathlib import Path
+
+
+class MemoryCache(dict):
+    """In-process cache (dev server, single worker)."""
+
+    def prune(self, max_age):
+        """Drop entries older than max_age seconds; return how many were removed."""
+        cutoff = time.time() - max_age
+        old = [k for k, (_, t) in list(self.items()) if t < cutoff]
+        for k in old:
+            self.pop(k, None)
+        return len(old)
+
+
+class _ConnHolder:
+    """A thread's connection, held in thread-local storage; freed when the thread exits."""
+
+    __slots__ = ("conn", "pid", "generation", "__weakref__")
+
+
+def _release(conns, lock, key, pid, conn):
+    with lock:
+        conns.pop(key, None)
+    if os.getpid() == pid:  # a connection inherited across a fork belongs to the parent
+        conn.close()
+
+
+class ThreadConnections:
+    """
+    One SQLite connection per thread and process, opened with connect() on
+    first use and never shared across a fork. A thread's connection is closed
+    when the thread exits (its thread-local holder is freed), so short-lived
+    threads don't leak connections; close_all() closes every connection this
+    process still has open, from any thread (worker shutdown). connect() must
+    pass check_same_thread=False, since a connection may be closed by another
+    thread than the one using it.
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._local = threading.local()
+        self._open = {}  # id(holder) -> (pid, connection), for close_all()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by close_all(); older holders are stale
+
+    def get(self):
+        holder = getattr(self._local, "holder", None)
+        pid = os.getpid()
+        if holder is None or holder.pid != pid or holder.generation != self._generation:
+            holder = _ConnHolder()
+            holder.conn = conn = self._connect()
+            holder.pid = pid
+            holder.generation = self._generation
+            with self._lock:
+                self._open[id(holder)] = (pid, conn)
+            weakref.finalize(holder, _release, self._open, self._lock, id(holder), pid, conn)
+            self._local.holder = holder
+        return holder.conn
+
+    def __len__(self):
+        """Connections of this process still open."""
+        pid = os.getpid()
+        with self._lock:
+            return sum(p == pid for p, _ in self._open.values())
+
+    def close_all(self):
+        """Close every connection this process opened, from any thread."""
+        pid = os.getpid()
+        with self._lock:
+            mine = [c for p, c in self._open.values() if p == pid]
+            # connections inherited across a fork belong to the parent: drop, don't close
+            self._open.clear()
+            self._generation += 1
+        for conn in mine:
+            conn.close()
+        self._local.holder = None
+
+
+class SQLiteCache:
+    """
+    Cache stored in a SQLite file so all workers see the same entries.
+
+    Uses WAL mode (readers don't block the writer) and one connection per
+    thread and process (ThreadConnections): a thread's connection is closed
+    when the thread exits, and close() (worker shutdown) closes those of all
+    threads still running, not only the caller's.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conns = ThreadConnections(self._connect)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS company_cache ("
+            " key TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " cache_time REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        # check_same_thread=False only so it can be closed from another thread;
+        # each connection is still used by the thread that opened it
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        return self._conns.get()
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT data, cache_time FROM company_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0]), row[1]
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        data, cache_time = value
+        self._conn().execute(
+            "INSERT OR REPLACE INTO company_cache (key, data, cache_time) VALUES (?, ?, ?)",
+            (key, json.dumps(data, ensure_ascii=False), cache_time),
+        )
+
+    def __delitem__(self, key):
+        self._conn().execute("DELETE FROM company_cache WHERE key = ?", (key,))
+
+    def __contains__(self, key):
+        return self._conn().execute(
+            "SELECT 1 FROM company_cache WHERE key = ?", (key,)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM company_cache").fetchone()[0]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM company_cache")
+
+    def prune(self, max_age):
+        """Drop entries older than max_age seconds; return how many were removed."""
+        cur = self._conn().execute(
+            "DELETE FROM company_cache WHERE cache_time < ?", (time.time() - max_age,)
+        )
+        return cur.rowcount
+
+    def close(self):
+        """Close every connection this process opened, from any thread."""
+        self._conns.close_all()
+
+
+def make_cache(config):
+    """Build the cache backend selected by config.cache_backend."""
+    if config.cache_backend == "sqlite":
+        return SQLiteCache(config.cache_path)
+    if config.cache_backend == "memory":
+        return MemoryCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {config.cache_backend!r} (expected 'memory' or 'sqlite')")
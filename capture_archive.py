@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+On-disk archive of network captures (analyze_network.py runs), queryable
+across companies without loading whole captures.
+
+Layout of an archive directory:
+
+    index.sqlite3     captures, requests, bodies and json_keys tables
+    NNNNN.seg         append-only segment files of compressed response bodies
+
+Bodies are deduplicated by SHA-256 (a script or payload served to a hundred
+companies is stored once) and compressed with zstd when the zstandard
+package is installed, zlib otherwise; the codec is kept per body, so an
+archive written with one reads with the other installed. Segments roll over
+at SEGMENT_BYTES. For JSON bodies every object key, at any depth, goes into
+json_keys, so "all JSON payloads with a ports key" is one indexed lookup.
+
+Tables:
+    captures   one row per run (company, page url, started)
+    requests   capture x url, method, status, content_type, body hash, is_json
+    bodies     hash -> segment, offset, length, size, codec
+    json_keys  body hash x object key
+
+Indexes cover url, content_type, status, company and json key.
+
+    python3 capture_archive.py import network_analysis_*.json
+    python3 capture_archive.py query --json-key ports --company Kimberly-Clark
+    python3 capture_archive.py body <hash>
+    python3 capture_archive.py stats
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+from collections import namedtuple
+from pathlib import Path
+
+from cache_store import ThreadConnections
+
+try:
+    import zstandard
+    CODEC = "zstd"
+except ImportError:
+    zstandard = None
+    CODEC = "zlib"
+
+DEFAULT_ARCHIVE = "captures/archive"
+SEGMENT_BYTES = 64 << 20  # roll to a new segment file past 64 MiB
+MAX_KEYS = 1000  # json_keys rows per body
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id          INTEGER PRIMARY KEY,
+    company     TEXT NOT NULL,
+    url         TEXT,
+    started     REAL NOT NULL,
+    requests    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_company ON captures (company);
+CREATE TABLE IF NOT EXISTS requests (
+    id           INTEGER PRIMARY KEY,
+    capture_id   INTEGER NOT NULL,
+    url          TEXT NOT NULL,
+    method       TEXT,
+    status       INTEGER,
+    content_type TEXT,                  -- media type only, lowercased
+    body_hash    TEXT,                  -- NULL when no body was captured
+    is_json      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS requests_url ON requests (url);
+CREATE INDEX IF NOT EXISTS requests_content_type ON requests (content_type);
+CREATE INDEX IF NOT EXISTS requests_status ON requests (status);
+CREATE INDEX IF NOT EXISTS requests_capture ON requests (capture_id);
+CREATE INDEX IF NOT EXISTS requests_body ON requests (body_hash);
+CREATE TABLE IF NOT EXISTS bodies (
+    hash        TEXT PRIMARY KEY,
+    segment     INTEGER NOT NULL,
+    offset      INTEGER NOT NULL,
+    length      INTEGER NOT NULL,       -- compressed bytes in the segment
+    size        INTEGER NOT NULL,       -- original bytes
+    codec       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS json_keys (
+    body_hash   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    PRIMARY KEY (key, body_hash)
+) WITHOUT ROWID;
+"""
+
+CapturedRequest = namedtuple(
+    "CapturedRequest", "id capture_id company url method status content_type body_hash is_json")
+
+
+def _compress(data):
+    if CODEC == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("body stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _media_type(req):
+    """'application/json' from a request dict's content_type / mimeType / headers, lowercased."""
+    ct = req.get("content_type") or req.get("mimeType") or req.get("mime_type")
+    if not ct:
+        headers = req.get("headers") or req.get("response_headers") or {}
+        if isinstance(headers, dict):
+            ct = next((v for k, v in headers.items() if str(k).lower() == "content-type"), None)
+    return str(ct).split(";", 1)[0].strip().lower() if ct else None
+
+
+def _status(req):
+    status = req.get("status")
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _body_bytes(req):
+    """(bytes, parsed JSON or None) of a request dict's body / json, or (None, None)."""
+    if "json" in req and req["json"] is not None:
+        obj = req["json"]
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), obj
+    body = req.get("body")
+    if body is None:
+        return None, None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    elif not isinstance(body, bytes):
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), body
+    return body, None
+
+
+def json_keys(obj, limit=MAX_KEYS):
+    """Distinct object keys anywhere in a decoded JSON value (at most limit)."""
+    keys, stack = set(), [obj]
+    while stack and len(keys) < limit:
+        node = stack.pop()
+        if isinstance(node, dict):
+            keys.update(str(k) for k in node)
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(v for v in node if isinstance(v, (dict, list)))
+    return keys
+
+
+class CaptureArchive:
+    """
+    Append-only capture archive with an SQLite index (see module docstring).
+
+    Connections are per thread and process (WAL mode), as in port_store.PortStore;
+    close() closes those of every thread.
+    Writers are serialized by the index transaction, which also covers the
+    segment append; a rolled-back record() leaves unreferenced bytes behind
+    in the segment, never a dangling index row.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._conns = ThreadConnections(self._connect)
+        self._conn().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.path / "index.sqlite3"), timeout=30, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        return self._conns.get()
+
+    def close(self):
+        self._conns.close_all()
+
+    def _segment_path(self, n):
+        return self.path / f"{n:05d}.seg"
+
+    # ---- writing ----
+    def _open_segment(self, conn):
+        """(number, file) of the segment to append to, rolling over when full."""
+        n = conn.execute("SELECT COALESCE(MAX(segment), 0) FROM bodies").fetchone()[0]
+        path = self._segment_path(n)
+        if path.exists() and path.stat().st_size >= SEGMENT_BYTES:
+            n += 1
+            path = self._segment_path(n)
+        return n, open(path, "ab")
+
+    def record(self, company, requests, url=None, payloads=(), started=None):
+        """
+        Store one capture: request dicts as analyze_network collects them
+        (url, method, status, content_type / mimeType / headers, and body
+        or json when captured) plus (url, decoded JSON) payloads, attached to
+        the request with that url or added as requests of their own.
+        Returns the capture id.
+        """
+        requests = [dict(r) for r in requests if isinstance(r, dict) and r.get("url")]
+        by_url = {}
+        for r in requests:
+            by_url.setdefault(r["url"], r)
+        for purl, obj in payloads:
+            r = by_url.get(purl)
+            if r is None:
+                r = {"url": purl, "content_type": "application/json"}
+                requests.append(r)
+                by_url[purl] = r
+            r["json"] = obj
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        segment = None
+        try:
+            cid = conn.execute(
+                "INSERT INTO captures (company, url, started, requests) VALUES (?, ?, ?, ?)",
+                (company, url, started or time.time(), len(requests))).lastrowid
+            rows = []
+            for r in requests:
+                data, obj = _body_bytes(r)
+                digest, is_json = None, False
+                ctype = _media_type(r)
+                if data is not None:
+                    if obj is None and (ctype and "json" in ctype or data[:1] in (b"{", b"[")):
+                        try:
+                            obj = json.loads(data)
+                        except ValueError:
+                            obj = None
+                    is_json = obj is not None and isinstance(obj, (dict, list))
+                    digest = hashlib.sha256(data).hexdigest()
+                    if conn.execute("SELECT 1 FROM bodies WHERE hash = ?", (digest,)).fetchone() is None:
+                        if segment is None:
+                            n, segment = self._open_segment(conn)
+                        blob = _compress(data)
+                        offset = segment.tell()
+                        segment.write(blob)
+                        conn.execute(
+                            "INSERT INTO bodies (hash, segment, offset, length, size, codec) VALUES (?, ?, ?, ?, ?, ?)",
+                            (digest, n, offset, len(blob), len(data), CODEC))
+                        if is_json:
+                            conn.executemany("INSERT OR IGNORE INTO json_keys (body_hash, key) VALUES (?, ?)",
+                                             ((digest, k) for k in json_keys(obj)))
+                rows.append((cid, r["url"], r.get("method"), _status(r), ctype, digest, int(is_json)))
+            conn.executemany(
+                "INSERT INTO requests (capture_id, url, method, status, content_type, body_hash, is_json)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            if segment is not None:
+                segment.flush()
+                os.fsync(segment.fileno())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            if segment is not None:
+                segment.close()
+        return cid
+
+    def import_analysis(self, path):
+        """Load a network_analysis_<slug>.json written by older analyze_network.py runs."""
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        return self.record(doc.get("company") or Path(path).stem, doc.get("all_requests") or [],
+                           url=doc.get("url"), started=os.path.getmtime(path))
+
+    # ---- reading ----
+    def body(self, digest):
+        """Original bytes of a stored body, or None."""
+        row = self._conn().execute(
+            "SELECT segment, offset, length, codec FROM bodies WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, codec = row
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return _decompress(f.read(length), codec)
+
+    def query(self, company=None, url_like=None, content_type=None, status=None,
+              json_key=None, json_only=False, limit=None):
+        """
+        [CapturedRequest] matching every given filter: company, url_like
+        (SQL LIKE pattern, e.g. '%/api/%'), content_type (media type prefix,
+        e.g. 'application/json'), status, json_key (a key anywhere in the
+        JSON body), json_only. Oldest capture first.
+        """
+        sql = ["SELECT r.id, r.capture_id, c.company, r.url, r.method, r.status, r.content_type,",
+               "r.body_hash, r.is_json FROM requests r JOIN captures c ON c.id = r.capture_id"]
+        if json_key is not None:
+            sql.append("JOIN json_keys k ON k.body_hash = r.body_hash AND k.key = ?")
+        params = [json_key] if json_key is not None else []
+        sql.append("WHERE 1 = 1")
+        for clause, value in (("c.company = ?", company), ("r.url LIKE ?", url_like),
+                              ("r.content_type LIKE ?", content_type and content_type.lower() + "%"),
+                              ("r.status = ?", status)):
+            if value is not None:
+                sql.append("AND " + clause)
+                params.append(value)
+        if json_only:
+            sql.append("AND r.is_json = 1")
+        sql.append("ORDER BY r.capture_id, r.id")
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+        return [CapturedRequest(*row) for row in self._conn().execute(" ".join(sql), params)]
+
+    def iter_json(self, **filters):
+        """(CapturedRequest, decoded JSON) for JSON bodies matching query(**filters); each body decoded once."""
+        cache = {}
+        for req in self.query(json_only=True, **filters):
+            if req.body_hash not in cache:
+                cache[req.body_hash] = json.loads(self.body(req.body_hash))
+            yield req, cache[req.body_hash]
+
+    def counts(self):
+        """Row counts per table, plus stored (compressed) and original body bytes."""
+        conn = self._conn()
+        out = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+               for t in ("captures", "requests", "bodies", "json_keys")}
+        stored, size = conn.execute("SELECT COALESCE(SUM(length), 0), COALESCE(SUM(size), 0) FROM bodies").fetchone()
+        referenced = conn.execute(
+            "SELECT COALESCE(SUM(b.size), 0) FROM requests r JOIN bodies b ON b.hash = r.body_hash").fetchone()[0]
+        out.update(stored_bytes=stored, body_bytes=size, referenced_bytes=referenced)
+        return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import and query the network capture archive.")
+    ap.add_argument("--archive", default=os.getenv("CAPTURE_ARCHIVE", DEFAULT_ARCHIVE))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("import", help="import network_analysis_<slug>.json files")
+    p.add_argument("src", nargs="+")
+    p = sub.add_parser("query", help="requests matching filters, one JSON line each")
+    p.add_argument("--company")
+    p.add_argument("--url", dest="url_like", help="SQL LIKE pattern, e.g. '%%/api/%%'")
+    p.add_argument("--content-type")
+    p.add_argument("--status", type=int)
+    p.add_argument("--json-key", help="key anywhere in the JSON body")
+    p.add_argument("--json-only", action="store_true")
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("body", help="write a stored body to stdout")
+    p.add_argument("hash")
+    sub.add_parser("stats", help="table counts and compression")
+    args = ap.parse_args()
+
+    archive = CaptureArchive(args.archive)
+    t0 = time.perf_counter()
+    if args.cmd == "import":
+        for src in args.src:
+            try:
+                cid = archive.import_analysis(src)
+            except (OSError, ValueError) as e:
+                print(f"[archive] {src}: skipped ({e})", file=sys.stderr)
+                continue
+            print(f"[archive] {src}: capture {cid}", file=sys.stderr)
+    elif args.cmd == "query":
+        for req in archive.query(args.company, args.url_like, args.content_type, args.status,
+                                 args.json_key, args.json_only, args.limit):
+            print(json.dumps(req._asdict(), ensure_ascii=False))
+    elif args.cmd == "body":
+        data = archive.body(args.hash)
+        if data is None:
+            sys.exit(f"[archive] no body {args.hash}")
+        sys.stdout.buffer.write(data)
+    else:
+        counts = archive.counts()
+        ratio = counts["body_bytes"] / counts["stored_bytes"] if counts["stored_bytes"] else 0.0
+        print(f"[archive] {args.archive}: " + ", ".join(
+            f"{counts[t]} {t}" for t in ("captures", "requests", "bodies", "json_keys")), file=sys.stderr)
+        print(f"[archive] bodies {counts['referenced_bytes']:,} B referenced, {counts['body_bytes']:,} B "
+              f"distinct, {counts['stored_bytes']:,} B stored ({CODEC}, x{ratio:.1f})", file=sys.stderr)
+    print(f"[archive] {args.cmd} took {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
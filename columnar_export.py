@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+columnar_export.py
+Normalized columnar export of company port results (Parquet or Arrow/Feather).
+
+Instead of the wide entry_1_port ... lane_5_shipments CSV, results are
+written as three tables joined on company_id:
+
+    companies          company_id, company, status, confidence, error, sources
+    port_observations  company_id, direction (entry/exit), rank, port, country, shipments, notes
+    lanes              company_id, rank, exit_port, exit_country, exit_region,
+                       entry_port, entry_region, shipments, teu, confidence
+
+The tables hold the same rows as the JSONL: up to --top per list, as
+web_ports_extractor merges them, but without the CSV's fixed --top column
+slots, so a later run with a larger --top needs no new schema. Shipments are
+the normalized counts from port_records, and port / country / region /
+status / source URL columns are dictionary-encoded. Readers can load just
+the columns they need (read_table(dir, "port_observations", columns=[...])).
+
+pyarrow is optional; it is only imported when exporting or reading.
+
+Convert an existing JSONL file:
+
+    python3 columnar_export.py bco_ports_80.jsonl bco_ports_columnar --format parquet
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+from jsonl_reader import JSONLStats, iter_jsonl
+from port_records import CompanyResult
+
+FORMATS = {"parquet": ".parquet", "feather": ".arrow"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("columnar export needs pyarrow (pip install pyarrow)") from None
+
+
+def build_columns(results):
+    """{table: {column: list}} from CompanyResult records (or loose dicts)."""
+    companies = {k: [] for k in ("company_id", "company", "status", "confidence", "error", "sources")}
+    obs = {k: [] for k in ("company_id", "direction", "rank", "port", "country", "shipments", "notes")}
+    lanes = {k: [] for k in ("company_id", "rank", "exit_port", "exit_country", "exit_region",
+                             "entry_port", "entry_region", "shipments", "teu", "confidence")}
+    for cid, rec in enumerate(results):
+        if not isinstance(rec, CompanyResult):
+            rec = CompanyResult.from_dict(rec)
+        companies["company_id"].append(cid)
+        companies["company"].append(rec.company)
+        companies["status"].append(rec.status)
+        companies["confidence"].append(rec.confidence)
+        companies["error"].append(rec.error)
+        companies["sources"].append(rec.sources)
+        for direction, entries in (("entry", rec.entry_ports), ("exit", rec.exit_ports)):
+            for rank, p in enumerate(entries, 1):
+                obs["company_id"].append(cid)
+                obs["direction"].append(direction)
+                obs["rank"].append(rank)
+                obs["port"].append(p.port)
+                obs["country"].append(p.country)
+                obs["shipments"].append(p.shipments)
+                obs["notes"].append(p.notes)
+        for rank, l in enumerate(rec.lanes, 1):
+            lanes["company_id"].append(cid)
+            lanes["rank"].append(rank)
+            lanes["exit_port"].append(l.exit_port)
+            lanes["exit_country"].append(l.exit_country)
+            lanes["exit_region"].append(l.exit_region)
+            lanes["entry_port"].append(l.entry_port)
+            lanes["entry_region"].append(l.entry_region)
+            lanes["shipments"].append(l.shipments)
+            lanes["teu"].append(l.teu)
+            lanes["confidence"].append(l.confidence)
+    return {"companies": companies, "port_observations": obs, "lanes": lanes}
+
+
+def build_tables(results):
+    """{table: pyarrow.Table} with explicit types and dictionary-encoded string columns."""
+    pa = _pyarrow()
+    cols = build_columns(results)
+    dict_str = pa.dictionary(pa.int32(), pa.string())
+    schemas = {
+        "companies": pa.schema([
+            ("company_id", pa.int32()), ("company", pa.string()), ("status", dict_str),
+            ("confidence", pa.float64()), ("error", pa.string()), ("sources", pa.list_(dict_str)),
+        ]),
+        "port_observations": pa.schema([
+            ("company_id", pa.int32()), ("direction", dict_str), ("rank", pa.int16()),
+            ("port", dict_str), ("country", dict_str), ("shipments", pa.int64()), ("notes", pa.string()),
+        ]),
+        "lanes": pa.schema([
+            ("company_id", pa.int32()), ("rank", pa.int16()),
+            ("exit_port", dict_str), ("exit_country", dict_str), ("exit_region", dict_str),
+            ("entry_port", dict_str), ("entry_region", dict_str),
+            ("shipments", pa.int64()), ("teu", pa.int64()), ("confidence", pa.float64()),
+        ]),
+    }
+    tables = {}
+    for name, schema in schemas.items():
+        arrays = []
+        for field in schema:
+            values = cols[name][field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            elif pa.types.is_list(field.type):
+                flat = pa.array([u for row in values for u in row], pa.string()).dictionary_encode()
+                offsets = [0]
+                for row in values:
+                    offsets.append(offsets[-1] + len(row))
+                arrays.append(pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), flat))
+            else:
+                arrays.append(pa.array(values, field.type))
+        tables[name] = pa.Table.from_arrays(arrays, schema=schema)
+    return tables
+
+
+def write_tables(results, out_dir, fmt="parquet"):
+    """Write companies / port_observations / lanes into out_dir; returns {table: path}."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown columnar format {fmt!r} (expected one of {sorted(FORMATS)})")
+    tables = build_tables(results)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, table in tables.items():
+        path = out_dir / f"{name}{FORMATS[fmt]}"
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp, compression="zstd", use_dictionary=True)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        paths[name] = path
+    return paths
+
+
+def read_table(out_dir, name, columns=None):
+    """Load one exported table (only `columns` if given) as a pyarrow.Table."""
+    _pyarrow()
+    out_dir = Path(out_dir)
+    if (out_dir / f"{name}.parquet").exists():
+        import pyarrow.parquet as pq
+        return pq.read_table(out_dir / f"{name}.parquet", columns=columns)
+    import pyarrow.feather as feather
+    return feather.read_table(out_dir / f"{name}.arrow", columns=columns)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export bco_ports JSONL as normalized columnar tables.")
+    ap.add_argument("src", help="source JSONL (web_ports_extractor output)")
+    ap.add_argument("out_dir", help="directory for companies / port_observations / lanes")
+    ap.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    args = ap.parse_args()
+
+    stats = JSONLStats()
+    try:
+        records = (o for o in iter_jsonl(args.src, stats=stats) if isinstance(o, dict))
+        paths = write_tables(records, args.out_dir, args.format)
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    src_size = os.path.getsize(args.src)
+    total = sum(os.path.getsize(p) for p in paths.values())
+    print(f"Read {stats.summary()} from {args.src} ({src_size:,} bytes)")
+    for name, path in paths.items():
+        print(f"  {path}  {os.path.getsize(path):,} bytes")
+    print(f"Wrote {total:,} bytes ({total / max(src_size, 1):.0%} of the JSONL)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Runtime configuration for the Flask backend (dev server and production WSGI).
+
+Every setting is read once from the environment; see Config for the names.
+"""
+
+import os
+
+
+def _env_bool(value, default):
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Config:
+    """Settings for app.py, read from environment variables."""
+
+    def __init__(self, env=None):
+        env = os.environ if env is None else env
+
+        # Server (used by `python app.py`; gunicorn reads gunicorn.conf.py)
+        self.host = env.get("HOST", "0.0.0.0")
+        self.port = int(env.get("PORT", 8081))
+        self.debug = _env_bool(env.get("FLASK_DEBUG"), True)
+
+        # Scraping
+        self.debugger_addr = env.get("CHROME_DEBUGGER", "127.0.0.1:9222")
+        self.company_txt = env.get("COMPANY_TXT", "consumerBCO.txt")
+        self.max_browsers = int(env.get("MAX_BROWSERS", 4))  # concurrent driver sessions per process
+
+        # Company data cache: "memory" (per process) or "sqlite" (shared by workers)
+        self.cache_backend = env.get("CACHE_BACKEND", "memory").lower()
+        self.cache_path = env.get("CACHE_PATH", ".cache/company_cache.sqlite3")
+        self.cache_timeout = int(env.get("CACHE_TIMEOUT", 3600))      # fresh for 1 hour
+        self.cache_max_age = int(env.get("CACHE_MAX_AGE", 24 * 3600))  # served stale up to 24 hours
+
+        # Batch endpoint
+        self.batch_max_companies = int(env.get("BATCH_MAX_COMPANIES", 100))
+        self.batch_workers = int(env.get("BATCH_WORKERS", 4))
+
+        # Port query store (port_store.py; built with `python3 port_store.py load ...`)
+        self.store_path = env.get("STORE_PATH", ".cache/port_store.sqlite3")
+        self.store_max_age = int(env.get("STORE_MAX_AGE", 60))  # Cache-Control for query responses
+
+        # HTTP responses
+        self.company_list_max_age = int(env.get("COMPANY_LIST_MAX_AGE", 300))
+        self.compress_min_bytes = int(env.get("COMPRESS_MIN_BYTES", 1024))
+
+    def summary(self):
+        """Short one-line description for startup logs."""
+        return (f"cache={self.cache_backend}"
+                f"{':' + self.cache_path if self.cache_backend == 'sqlite' else ''} "
+                f"ttl={self.cache_timeout}s max_age={self.cache_max_age}s "
+                f"browsers={self.max_browsers} batch_workers={self.batch_workers}")
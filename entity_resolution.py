@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+entity_resolution.py
+
+Ranked company-name resolution between two lists (e.g. the companies in
+west_coast_companies.jsonl against ZeroTracker's Name column): for each
+query name, the best target, a score in [0, 1] and how it matched.
+
+Names are normalized (name_normalize.normalize) and reduced to a core form
+without legal suffixes ("Apple Inc." -> "apple", "The Kraft Heinz Co" ->
+"kraft heinz"). Only targets sharing a blocking key with the query are
+scored:
+
+    core form            without spaces, so "Wal-Mart" meets "Walmart"
+    each core word       "disney" for "The Walt Disney Company" / "Disney"
+    initials             "ibm" for "International Business Machines" and
+                         for the one-token name "IBM"
+
+Token blocks larger than max_block (a common word such as "china") are
+skipped; when all of a query's token blocks are that large, only targets
+sharing all of those words are candidates. Candidates are scored as
+
+    exact     normalized names equal                           1.0
+    core      cores equal ("Apple" / "Apple Inc")               0.97
+    fuzzy     Dice coefficient of the cores' character trigrams  up to 0.96
+    initials  one core is the other's initials                 0.85
+    tokens    one core's words are a subset of the other's     0.6 - 0.9
+              by the share of the longer core the shorter one
+              covers: "Reckitt Benckiser" / "Reckitt Benckiser
+              Health" 0.81, "Apple" / "Apple Hospitality REIT"
+              0.67, so a short name meeting a longer one with
+              the same first word does not clear the default
+              threshold
+
+and the best one at or above the threshold wins (ties: higher method, then
+shorter target, then alphabetical). Dice is only computed for candidates
+whose trigram counts make the threshold reachable.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from name_normalize import normalize
+
+LEGAL_SUFFIXES = frozenset("""
+    inc incorporated corp corporation co company cos companies ltd limited llc llp lp
+    plc ag sa se nv bv spa sas sarl srl gmbh kg kgaa oy ab as asa aps kk bhd pte pty
+    holding holdings group the and
+""".split())
+
+METHOD_RANK = {"exact": 4, "core": 3, "fuzzy": 2, "initials": 1, "tokens": 0}
+CORE_SCORE = 0.97
+FUZZY_MAX = 0.96
+INITIALS_SCORE = 0.85
+TOKENS_BASE, TOKENS_SPAN = 0.6, 0.3  # reaches 0.8 at two-thirds coverage
+DEFAULT_THRESHOLD = 0.8
+MAX_BLOCK = 100
+
+Match = namedtuple("Match", "query matched score method")
+
+
+@lru_cache(maxsize=1 << 16)
+def core_tokens(nv: str) -> tuple:
+    """
+    Tokens of a normalized name without leading/trailing legal suffixes (all
+    of them if nothing else is left); runs of single letters are joined first,
+    so "s a" (from "S.A.") is the suffix "sa".
+    """
+    tokens = []
+    for t in nv.split():
+        if len(t) == 1 and tokens and len(tokens[-1]) == 1 and tokens[-1].isalpha() and t.isalpha():
+            tokens[-1] += t
+        else:
+            tokens.append(t)
+    lo, hi = 0, len(tokens)
+    while hi > lo and tokens[hi - 1] in LEGAL_SUFFIXES:
+        hi -= 1
+    while lo < hi and tokens[lo] in LEGAL_SUFFIXES:
+        lo += 1
+    return tuple(tokens[lo:hi]) if hi > lo else tuple(tokens)
+
+
+def _initials(tokens):
+    return "".join(t[0] for t in tokens) if len(tokens) >= 2 else None
+
+
+def trigrams(core: str) -> frozenset:
+    padded = f" {core} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _Query:
+    __slots__ = ("name", "nv", "tokens", "tokset", "core", "squashed", "grams", "initials")
+
+    def __init__(self, name, nv):
+        self.name = name
+        self.nv = nv
+        self.tokens = core_tokens(nv)
+        self.tokset = frozenset(self.tokens)
+        self.core = " ".join(self.tokens)
+        self.squashed = "".join(self.tokens)
+        self.grams = trigrams(self.core)
+        self.initials = _initials(self.tokens)
+
+
+def _tokens_score(a_len, b_len):
+    return TOKENS_BASE + TOKENS_SPAN * (a_len / b_len if a_len < b_len else b_len / a_len)
+
+
+class EntityResolver:
+    """
+    Index of target names; resolver.match(name) -> Match or None,
+    resolver.resolve(names) -> {name: Match or None}.
+    """
+
+    def __init__(self, targets: Iterable[str], threshold: float = DEFAULT_THRESHOLD, max_block: int = MAX_BLOCK):
+        self.threshold = threshold
+        self.max_block = max_block
+        self.targets: List[_Query] = []
+        # parallel to targets, for the scoring loop
+        self._toksets: List[frozenset] = []
+        self._grams: List[frozenset] = []
+        self._core_lens: List[int] = []
+        self._by_squashed: Dict[str, List[int]] = {}
+        self._by_initials: Dict[str, List[int]] = {}
+        self._by_token: Dict[str, List[int]] = {}
+        seen = set()
+        for name in targets:
+            if not isinstance(name, str):
+                continue
+            nv = normalize(name)
+            if not nv or nv in seen:
+                continue
+            seen.add(nv)
+            t = _Query(name, nv)
+            idx = len(self.targets)
+            self.targets.append(t)
+            self._toksets.append(t.tokset)
+            self._grams.append(t.grams)
+            self._core_lens.append(len(t.core))
+            self._by_squashed.setdefault(t.squashed, []).append(idx)
+            if t.initials:
+                self._by_initials.setdefault(t.initials, []).append(idx)
+            for token in t.tokset:
+                self._by_token.setdefault(token, []).append(idx)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def candidates(self, q: _Query) -> Iterable[int]:
+        """Target indexes sharing a blocking key with the query (oversized token blocks skipped)."""
+        found = set()
+        for index, key in ((self._by_squashed, q.squashed),
+                           (self._by_squashed, q.initials),
+                           (self._by_initials, q.core if len(q.tokens) == 1 else None)):
+            found.update(index.get(key, ()))
+        blocks = [self._by_token[t] for t in q.tokset if t in self._by_token]
+        small = [b for b in blocks if len(b) <= self.max_block]
+        if small:
+            found.update(*small)
+        elif len(blocks) > 1:
+            # only common words: targets sharing all of them
+            found.update(set(blocks[0]).intersection(*blocks[1:]))
+        return found
+
+    def score(self, q: _Query, t: _Query):
+        """(score, method) of one query/target pair; match() computes the same, faster."""
+        if q.nv == t.nv:
+            return 1.0, "exact"
+        if q.squashed == t.squashed:
+            return CORE_SCORE, "core"
+        best = (0.0, "tokens")
+        if q.tokset <= t.tokset or t.tokset <= q.tokset:
+            best = (_tokens_score(len(q.core), len(t.core)), "tokens")
+        if (q.initials and t.core == q.initials) or (t.initials and q.core == t.initials):
+            best = max(best, (INITIALS_SCORE, "initials"))
+        common = len(q.grams & t.grams)
+        dice = min(2.0 * common / (len(q.grams) + len(t.grams)), FUZZY_MAX)
+        return max(best, (dice, "fuzzy"))
+
+    def match(self, name) -> Optional[Match]:
+        nv = normalize(name) if isinstance(name, str) else ""
+        if not nv:
+            return None
+        return self._match_normalized(name, nv)
+
+    def _match_normalized(self, name, nv) -> Optional[Match]:
+        q = _Query(name, nv)
+        targets = self.targets
+        # exact / core matches outrank everything else: no need to score the blocks
+        same = self._by_squashed.get(q.squashed)
+        if same:
+            t = min((targets[i] for i in same), key=lambda t: (t.nv != nv, len(t.name), t.name))
+            return Match(name, t.name, 1.0 if t.nv == nv else CORE_SCORE, "exact" if t.nv == nv else "core")
+        threshold = self.threshold
+        toksets, grams, core_lens = self._toksets, self._grams, self._core_lens
+        qtok, qg, qlen = q.tokset, q.grams, len(q.core)
+        qn = len(qg)
+        # Dice >= threshold needs the trigram counts within this window
+        lo, hi = qn * threshold / (2.0 - threshold), qn * (2.0 - threshold) / threshold
+        q_initials = q.initials
+        q_single = q.core if len(q.tokens) == 1 else None
+        best, best_key = None, None
+        for idx in self.candidates(q):
+            ttok = toksets[idx]
+            if qtok <= ttok or ttok <= qtok:
+                score, method = _tokens_score(qlen, core_lens[idx]), "tokens"
+            else:
+                score, method = 0.0, "tokens"
+            if q_initials or q_single:
+                t = targets[idx]
+                if (q_initials and t.core == q_initials) or (q_single and t.initials == q_single):
+                    if INITIALS_SCORE >= score:
+                        score, method = INITIALS_SCORE, "initials"
+            tg = grams[idx]
+            tn = len(tg)
+            if lo <= tn <= hi:
+                dice = 2.0 * len(qg & tg) / (qn + tn)
+                if dice > FUZZY_MAX:
+                    dice = FUZZY_MAX
+                if dice >= score:
+                    score, method = dice, "fuzzy"
+            if score < threshold:
+                continue
+            t = targets[idx]
+            key = (-score, -METHOD_RANK[method], len(t.name), t.name)
+            if best_key is None or key < best_key:
+                best, best_key = (t.name, score, method), key
+        if best is None:
+            return None
+        return Match(name, best[0], round(best[1], 3), best[2])
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, Optional[Match]]:
+        """Best match per distinct name (names normalizing alike are scored once)."""
+        out: Dict[str, Optional[Match]] = {}
+        by_norm: Dict[str, Optional[Match]] = {}
+        for name in names:
+            if name in out:
+                continue
+            nv = normalize(name) if isinstance(name, str) else ""
+            if nv not in by_norm:
+                by_norm[nv] = self._match_normalized(name, nv) if nv else None
+            m = by_norm[nv]
+            out[name] = m._replace(query=name) if m is not None else None
+        return out
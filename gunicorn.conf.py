@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+# Multi-worker production server settings for wsgi:application.
+# Override with env vars: HOST, PORT, WEB_CONCURRENCY, WEB_THREADS, WEB_TIMEOUT.
+
+import os
+import sys
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8081')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Threads keep slow scrapes and NDJSON batch streams from pinning a whole worker
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 8))
+
+# A cold scrape can take minutes; give workers time before they are killed
+timeout = int(os.getenv("WEB_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    server.log.info("Forum Mobility ESG Port Analytics: starting %d worker(s)", workers)
+
+
+def worker_exit(server, worker):
+    # Close any browser sessions the worker still holds (if the app ever loaded)
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.shutdown()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# html_tables.py
+# Port / lane tables and lists from a company page, for
+# EnhancedImportYetiScraper.enhanced_html_extraction.
+#
+# The page is parsed once with the fastest parser installed (selectolax,
+# then lxml, then BeautifulSoup's html.parser); everything after that works
+# on the <table>, <ul> and <ol> subtrees only. Header cells are mapped to
+# fields:
+#
+#     "Lane" / "Route"                          lane ("Yantian -> Long Beach")
+#     "Exit Port" / "Origin" / "Port of Lading"  exit_port
+#     "Entry Port" / "Destination" / "US Port"   entry_port
+#     "Port"                                     port (direction from context)
+#     "Shipments" / "Count" / "Bills"            shipments (a "Shipments" column
+#                                                wins over other count columns)
+#     "TEU"                                      teu (lanes only)
+#     "Country"                                  country
+#
+# A table with exit and entry columns (or a lane column) gives lanes; one
+# with a port column gives exit or entry ports, the direction taken from the
+# table's caption, id/class/aria-label and the heading just before it, else
+# from the same on its parents (the nearest one naming a direction wins).
+# Only a table's own rows are read, not those of tables nested in its cells.
+# List items are read as "<port or lane> <count>" ("Yantian, China - 1,234
+# shipments"; a stated "<n> shipments" wins over other numbers, else the
+# last number counts) when the list's context names ports or lanes. Pages
+# without any port/lane/shipment wording are not parsed.
+
+import re
+from collections import namedtuple
+
+from port_records import parse_shipments_from_notes, stated_shipments
+
+BACKENDS = {}
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser  # selectolax < 0.3.18
+    except ImportError:
+        _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+try:
+    from bs4 import BeautifulSoup as _BeautifulSoup, NavigableString as _NavigableString
+except ImportError:
+    _BeautifulSoup = _NavigableString = None
+
+TableExtraction = namedtuple("TableExtraction", "exit_ports entry_ports lanes blocks mapped backend")
+
+PAGE_KEYWORDS = ("port", "lane", "shipment", "route")
+HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+CONTEXT_ATTRS = ("id", "class", "aria-label", "data-testid", "title")
+
+_LANE_HEADER = re.compile(r"\b(?:lanes?|routes?)\b")
+_COUNT_HEADER = re.compile(r"\b(?:shipments?|count|bills?|records|volume|containers)\b|#")
+_TEU_HEADER = re.compile(r"\bteus?\b")
+_EXIT_HEADER = re.compile(r"\b(?:exit|origin|from|foreign|lading|loading|departure|export)\b")
+_ENTRY_HEADER = re.compile(r"\b(?:entry|destination|to|arrival|us|u\.s\.|unlading|discharge|import)\b")
+_EXIT_CONTEXT = re.compile(r"exit|origin|export|foreign|lading|supplier|departure")
+_ENTRY_CONTEXT = re.compile(r"entry|destination|import|arrival|unlading|\bus\b|u\.s\.")
+_PORTISH_CONTEXT = re.compile(r"port|lane|route|shipping|trade")
+_LANE_SPLIT = re.compile(r"\s*(?:→|->|=>|–|—|\bto\b|\s-\s)\s*")
+# last count in a list item without a stated "<n> shipments": "1,234", "1.2k", "15k", "987"
+_ITEM_COUNT = re.compile(r"(\d{1,3}(?:,\d{3})+(?!\d)|\d+(?:\.\d+)?k\b|\d+)(?!.*\d)", re.I)
+
+
+def _clean(text):
+    return " ".join(text.split()) if text else ""
+
+
+def parse_count(text):
+    """Shipment count in a table cell ("1,234", "1.2k", "12 shipments"), or None."""
+    s = _clean(text).lower().replace(",", "")
+    if not s:
+        return None
+    if s.isdigit():
+        return int(s)
+    if s.endswith("k"):
+        try:
+            return int(round(float(s[:-1]) * 1000))
+        except ValueError:
+            pass
+    return parse_shipments_from_notes(s)
+
+
+def column_field(header):
+    """Field a header cell maps to (see the module comment), or None."""
+    h = _clean(header).lower()
+    if not h:
+        return None
+    if _LANE_HEADER.search(h):
+        return "lane"
+    has_port = "port" in h
+    if not has_port and "shipment" not in h and _TEU_HEADER.search(h):
+        return "teu"
+    if _COUNT_HEADER.search(h) and not has_port:
+        return "shipments"
+    if "country" in h and not has_port:
+        return "country"
+    if _EXIT_HEADER.search(h):
+        return "exit_port"
+    if _ENTRY_HEADER.search(h):
+        return "entry_port"
+    if has_port:
+        return "port"
+    return None
+
+
+def split_lane(text):
+    """(exit, entry) from "Yantian -> Long Beach" / "Yantian to Long Beach", or None."""
+    parts = [p for p in _LANE_SPLIT.split(_clean(text), maxsplit=1) if p]
+    return (parts[0], parts[1]) if len(parts) == 2 else None
+
+
+def context_direction(context):
+    """'exit_ports' / 'entry_ports' from a block's context text, or None when it names neither (or both)."""
+    c = context.lower()
+    exit_, entry = bool(_EXIT_CONTEXT.search(c)), bool(_ENTRY_CONTEXT.search(c))
+    if exit_ != entry:
+        return "exit_ports" if exit_ else "entry_ports"
+    return None
+
+
+# ---- parser backends: parse once, then walk table/list subtrees ----
+
+def _own_rows(table, children, tag):
+    """A table's <tr> elements in order: direct ones and those of its thead/tbody/tfoot, not nested tables'."""
+    for child in children(table):
+        t = tag(child)
+        if t == "tr":
+            yield child
+        elif t in ("thead", "tbody", "tfoot"):
+            for tr in children(child):
+                if tag(tr) == "tr":
+                    yield tr
+
+
+class _SelectolaxBackend:
+    name = "selectolax"
+
+    parse = staticmethod(lambda html: _SelectolaxParser(html))
+
+    @staticmethod
+    def blocks(root):
+        return root.css("table, ul, ol")
+
+    tag = staticmethod(lambda n: n.tag)
+    text = staticmethod(lambda n: n.text(deep=True, separator=" "))
+    parent = staticmethod(lambda n: n.parent)
+
+    @staticmethod
+    def attr(n, key):
+        return n.attributes.get(key) or ""
+
+    @staticmethod
+    def prev(n):
+        n = n.prev
+        while n is not None and n.tag.startswith(("-", "_", "!")):  # text / comment nodes
+            n = n.prev
+        return n
+
+    @staticmethod
+    def caption(n):
+        cap = n.css_first("caption")
+        return cap.text(deep=True, separator=" ") if cap is not None else ""
+
+    @staticmethod
+    def cell_text(n):
+        """Text of a cell without that of tables nested in it."""
+        if n.css_first("table") is None:
+            return n.text(deep=True, separator=" ")
+        return " ".join(_SelectolaxBackend.cell_text(c) for c in n.iter(include_text=True) if c.tag != "table")
+
+    @staticmethod
+    def rows(table):
+        return [[(c.tag == "th", _SelectolaxBackend.cell_text(c)) for c in tr.iter() if c.tag in ("th", "td")]
+                for tr in _own_rows(table, lambda n: n.iter(), lambda n: n.tag)]
+
+    @staticmethod
+    def items(lst):
+        return [c.text(deep=True, separator=" ") for c in lst.iter() if c.tag == "li"]
+
+
+class _LxmlBackend:
+    name = "lxml"
+
+    parse = staticmethod(lambda html: _lxml_html.document_fromstring(html))
+
+    @staticmethod
+    def blocks(root):
+        return list(root.iter("table", "ul", "ol"))
+
+    tag = staticmethod(lambda n: n.tag if isinstance(n.tag, str) else "")
+    text = staticmethod(lambda n: " ".join(n.itertext()))
+    parent = staticmethod(lambda n: n.getparent())
+    attr = staticmethod(lambda n, key: n.get(key) or "")
+
+    @staticmethod
+    def prev(n):
+        n = n.getprevious()
+        while n is not None and not isinstance(n.tag, str):
+            n = n.getprevious()
+        return n
+
+    @staticmethod
+    def caption(n):
+        cap = n.find("caption")
+        return " ".join(cap.itertext()) if cap is not None else ""
+
+    @staticmethod
+    def cell_text(n):
+        """Text of a cell without that of tables nested in it."""
+        if n.find(".//table") is None:
+            return " ".join(n.itertext())
+        parts = [n.text or ""]
+        for c in n:
+            if c.tag != "table" and isinstance(c.tag, str):
+                parts.append(_LxmlBackend.cell_text(c))
+            parts.append(c.tail or "")
+        return " ".join(parts)
+
+    @staticmethod
+    def rows(table):
+        return [[(c.tag == "th", _LxmlBackend.cell_text(c)) for c in tr if c.tag in ("th", "td")]
+                for tr in _own_rows(table, iter, _LxmlBackend.tag)]
+
+    @staticmethod
+    def items(lst):
+        return [" ".join(c.itertext()) for c in lst if c.tag == "li"]
+
+
+class _SoupBackend:
+    name = "html.parser"
+
+    parse = staticmethod(lambda html: _BeautifulSoup(html, "html.parser"))
+
+    @staticmethod
+    def blocks(root):
+        return root.find_all(["table", "ul", "ol"])
+
+    tag = staticmethod(lambda n: n.name or "")
+    text = staticmethod(lambda n: n.get_text(" "))
+    parent = staticmethod(lambda n: n.parent)
+    prev = staticmethod(lambda n: n.find_previous_sibling())
+
+    @staticmethod
+    def attr(n, key):
+        v = n.get(key) if hasattr(n, "get") else None
+        return " ".join(v) if isinstance(v, list) else (v or "")
+
+    @staticmethod
+    def caption(n):
+        cap = n.find("caption")
+        return cap.get_text(" ") if cap is not None else ""
+
+    @staticmethod
+    def cell_text(n):
+        """Text of a cell without that of tables nested in it."""
+        if n.find("table") is None:
+            return n.get_text(" ")
+        return " ".join(_SoupBackend.cell_text(c) if c.name else (c if type(c) is _NavigableString else "")
+                        for c in n.children if c.name != "table")
+
+    @staticmethod
+    def rows(table):
+        return [[(c.name == "th", _SoupBackend.cell_text(c)) for c in tr.find_all(["th", "td"], recursive=False)]
+                for tr in _own_rows(table, lambda n: n.find_all(True, recursive=False), lambda n: n.name)]
+
+    @staticmethod
+    def items(lst):
+        return [li.get_text(" ") for li in lst.find_all("li", recursive=False)]
+
+
+if _SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _SelectolaxBackend
+if _lxml_html is not None:
+    BACKENDS["lxml"] = _LxmlBackend
+if _BeautifulSoup is not None:
+    BACKENDS["html.parser"] = _SoupBackend
+BACKEND = next(iter(BACKENDS), None)
+
+
+def _context(be, node, depth=3):
+    """
+    Context text per level, nearest first: the node's caption, naming
+    attributes and the heading right before it, then the same for its parents.
+    """
+    levels = []
+    n = node
+    for _ in range(depth):
+        if n is None or be.tag(n) in ("body", "html", ""):
+            break
+        parts = [be.caption(n)] if be.tag(n) == "table" else []
+        parts.extend(be.attr(n, k) for k in CONTEXT_ATTRS)
+        p, steps = be.prev(n), 0
+        while p is not None and steps < 3:
+            if be.tag(p) in HEADINGS:
+                parts.append(be.text(p))
+                break
+            p, steps = be.prev(p), steps + 1
+        levels.append(_clean(" ".join(parts)))
+        n = be.parent(n)
+    return levels
+
+
+def _direction(levels):
+    """Direction named by the nearest context level that names exactly one."""
+    for text in levels:
+        direction = context_direction(text)
+        if direction:
+            return direction
+    return None
+
+
+def _table_rows(be, table, levels, out):
+    """Map one table's rows into out; True if its header mapped to port or lane fields."""
+    rows = [[(th, _clean(t)) for th, t in r] for r in be.rows(table)]
+    rows = [r for r in rows if r]
+    if len(rows) < 2:
+        return False
+    # header: the first row with <th> cells, else the first row
+    h = next((i for i, r in enumerate(rows) if any(th for th, _ in r)), 0)
+    fields = {}
+    for i, (_, text) in enumerate(rows[h]):
+        field = column_field(text)
+        if field == "shipments" and "shipment" in text.lower():
+            fields[field] = i  # an explicit shipments column beats "Count" / "Volume" / ...
+        elif field and field not in fields:
+            fields[field] = i
+    if "shipments" not in fields:
+        return False
+
+    def cell(r, field):
+        i = fields.get(field)
+        return r[i][1] if i is not None and i < len(r) else ""
+
+    body = rows[h + 1:]
+    if "lane" in fields or ("exit_port" in fields and "entry_port" in fields):
+        for r in body:
+            ends = split_lane(cell(r, "lane")) if "lane" in fields else (cell(r, "exit_port"), cell(r, "entry_port"))
+            qty = parse_count(cell(r, "shipments"))
+            if ends and ends[0] and ends[1] and qty is not None:
+                lane = {"exit_port": ends[0], "entry_port": ends[1], "shipments": qty}
+                teu = parse_count(cell(r, "teu"))
+                if teu is not None:
+                    lane["teu"] = teu
+                out["lanes"].append(lane)
+        return True
+    port_field = next((f for f in ("exit_port", "entry_port", "port") if f in fields), None)
+    if port_field is None:
+        return False
+    direction = {"exit_port": "exit_ports", "entry_port": "entry_ports"}.get(port_field) or _direction(levels)
+    if direction is None:
+        return False
+    for r in body:
+        name, qty = cell(r, port_field), parse_count(cell(r, "shipments"))
+        if name and qty is not None:
+            rec = {"port": name, "shipments": qty}
+            if cell(r, "country"):
+                rec["country"] = cell(r, "country")
+            out[direction].append(rec)
+    return True
+
+
+def _list_items(be, lst, levels, out):
+    """Map one list's "<name> <count>" items into out; True if any did."""
+    context = " ".join(levels).lower()
+    if not _PORTISH_CONTEXT.search(context):
+        return False
+    is_lanes = bool(_LANE_HEADER.search(context))
+    direction = None if is_lanes else _direction(levels)
+    if not is_lanes and direction is None:
+        return False
+    found = False
+    for text in be.items(lst):
+        text = _clean(text)
+        stated = stated_shipments(text)
+        if stated:
+            qty, start = stated[0], stated[1].start()
+        else:
+            m = _ITEM_COUNT.search(text)
+            if not m:
+                continue
+            qty, start = parse_count(m.group(1)), m.start()
+        name = text[:start].rstrip(" :-–—(|·").strip()
+        if not name or qty is None:
+            continue
+        if is_lanes:
+            ends = split_lane(name)
+            if ends:
+                out["lanes"].append({"exit_port": ends[0], "entry_port": ends[1], "shipments": qty})
+                found = True
+        else:
+            out[direction].append({"port": name, "shipments": qty})
+            found = True
+    return found
+
+
+def extract_tables(html, backend=None):
+    """
+    Port and lane rows from a page's tables and lists, in page order
+    (TableExtraction: exit_ports, entry_ports, lanes as loose dicts for
+    PortEntry.from_dict / Lane.from_dict; blocks seen, blocks mapped; backend).
+    """
+    be = BACKENDS[backend or BACKEND] if (backend or BACKEND) else None
+    if be is None:
+        raise ImportError("no HTML parser installed (selectolax, lxml or beautifulsoup4)")
+    out = {"exit_ports": [], "entry_ports": [], "lanes": []}
+    lowered = html.lower() if html else ""
+    if not any(k in lowered for k in PAGE_KEYWORDS) or ("<table" not in lowered and "<li" not in lowered):
+        return TableExtraction(out["exit_ports"], out["entry_ports"], out["lanes"], 0, 0, be.name)
+    root = be.parse(html)
+    blocks = be.blocks(root)
+    mapped = 0
+    for node in blocks:
+        levels = _context(be, node)
+        if be.tag(node) == "table":
+            mapped += _table_rows(be, node, levels, out)
+        else:
+            mapped += _list_items(be, node, levels, out)
+    return TableExtraction(out["exit_ports"], out["entry_ports"], out["lanes"], len(blocks), mapped, be.name)
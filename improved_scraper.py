@@ -15,23 +15,64 @@ from bypass_cloudflare import (
     wait_for_cloudflare_bypass, human_like_behavior, 
     get_enhanced_extraction_patterns
 )
+from html_tables import extract_tables
+from port_records import PortEntry, Lane, shipment_count
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+API_DOMAINS = ["https://data.importyeti.com", "https://www.importyeti.com"]
+PROBE_TIMEOUT_MS = 10000  # per endpoint probe; below the driver's 30 s async script timeout
+
+# All probes in one round trip: fetched concurrently in the page (session
+# cookies included), each aborted after its own timeout; results in input order.
+PROBE_SCRIPT = """
+    const urls = arguments[0];
+    const timeoutMs = arguments[1];
+    const callback = arguments[arguments.length - 1];
+    
+    Promise.allSettled(urls.map(apiUrl => {
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), timeoutMs);
+        return fetch(apiUrl, {
+            method: 'GET',
+            credentials: 'include',
+            signal: controller.signal,
+            headers: {
+                'Accept': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.text())
+        .finally(() => clearTimeout(timer));
+    })).then(settled => callback(settled.map((s, i) => {
+        if (s.status !== 'fulfilled') {
+            return {success: false, error: String(s.reason), url: urls[i]};
+        }
+        try {
+            return {success: true, data: JSON.parse(s.value), url: urls[i]};
+        } catch(e) {
+            return {success: false, error: 'Parse error', url: urls[i]};
+        }
+    })));
+"""
 
 class EnhancedImportYetiScraper:
     def __init__(self, debugger_addr="127.0.0.1:9222"):
         self.debugger_addr = debugger_addr
         self.driver = None
+        # (endpoint pattern, domain) pairs that returned data, probed first for later companies
+        self.working_endpoints = {}
         self.extraction_patterns = get_enhanced_extraction_patterns()
+        # every json_keys target, so one walk of a payload finds all of them
+        self.target_keys = frozenset(
+            key for keys in self.extraction_patterns["json_keys"].values() for key in keys)
         
     def init_driver(self):
         """Initialize driver with enhanced stealth and bypass capabilities"""
+        # imported here so the extraction methods work without a browser stack (replay_extraction.py)
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
         opts = ChromeOptions()
         
         # Attach to existing Chrome with debugging
@@ -64,49 +105,39 @@ class EnhancedImportYetiScraper:
             return False
     
     def enhanced_api_fetch(self, company_slug):
-        """Try multiple API endpoints with different approaches"""
-        api_results = []
+        """Probe the API endpoints concurrently; endpoints that worked before are tried alone first"""
+        probes = [(pattern, domain)
+                  for pattern in self.extraction_patterns["api_endpoints"]
+                  for domain in API_DOMAINS]
+        known = [p for p in sorted(self.working_endpoints, key=self.working_endpoints.get, reverse=True)
+                 if p in probes]
+        rounds = [known, [p for p in probes if p not in self.working_endpoints]] if known else [probes]
         
-        for endpoint_pattern in self.extraction_patterns["api_endpoints"]:
-            for domain in ["https://data.importyeti.com", "https://www.importyeti.com"]:
-                api_url = f"{domain}{endpoint_pattern}{company_slug}"
-                
-                try:
-                    # Use browser's fetch to maintain session
-                    result = self.driver.execute_async_script("""
-                        const apiUrl = arguments[0];
-                        const callback = arguments[arguments.length - 1];
-                        
-                        fetch(apiUrl, {
-                            method: 'GET',
-                            credentials: 'include',
-                            headers: {
-                                'Accept': 'application/json',
-                                'X-Requested-With': 'XMLHttpRequest'
-                            }
-                        })
-                        .then(response => response.text())
-                        .then(text => {
-                            try {
-                                const data = JSON.parse(text);
-                                callback({success: true, data: data, url: apiUrl});
-                            } catch(e) {
-                                callback({success: false, error: 'Parse error', url: apiUrl});
-                            }
-                        })
-                        .catch(error => {
-                            callback({success: false, error: error.toString(), url: apiUrl});
-                        });
-                    """, api_url)
-                    
-                    if result.get("success") and result.get("data"):
-                        api_results.append(result)
-                        print(f"[api] ✅ Success: {api_url}")
-                    
-                except Exception as e:
-                    print(f"[api] ❌ Failed {api_url}: {e}")
-                    continue
+        for batch in rounds:
+            api_results = self._probe_endpoints(batch, company_slug)
+            if api_results:
+                return api_results
+        return []
+    
+    def _probe_endpoints(self, probes, company_slug):
+        """Fetch every (pattern, domain) probe in one in-page script; returns the successful results"""
+        urls = [f"{domain}{pattern}{company_slug}" for pattern, domain in probes]
+        t0 = time.perf_counter()
+        try:
+            # Use browser's fetch to maintain session
+            results = self.driver.execute_async_script(PROBE_SCRIPT, urls, PROBE_TIMEOUT_MS)
+        except Exception as e:
+            print(f"[api] ❌ Probe of {len(urls)} endpoints failed: {e}")
+            return []
         
+        api_results = []
+        for probe, result in zip(probes, results or []):
+            if result.get("success") and result.get("data"):
+                api_results.append(result)
+                self.working_endpoints[probe] = self.working_endpoints.get(probe, 0) + 1
+                print(f"[api] ✅ Success: {result['url']}")
+        print(f"[api] {len(api_results)}/{len(urls)} endpoints returned data "
+              f"({(time.perf_counter() - t0) * 1000:.0f} ms, one round trip)")
         return api_results
     
     def extract_data_from_apis(self, api_results):
@@ -115,34 +146,45 @@ class EnhancedImportYetiScraper:
         
         for result in api_results:
             data = result.get("data", {})
+            index = self.index_keys(data)  # one walk per payload for all keys
             
             # Try various data extraction patterns
             for key_group in ["ports", "lanes", "map_data"]:
                 for key in self.extraction_patterns["json_keys"][key_group]:
-                    if self._extract_by_key(data, key, extracted_data):
+                    if self._extract_by_key(data, key, extracted_data, index):
                         print(f"[extract] ✅ Found data via key: {key}")
         
         return extracted_data
     
-    def _extract_by_key(self, data, key, extracted_data):
-        """Helper to extract data by specific key"""
-        def find_nested(obj, target_key):
+    def index_keys(self, data):
+        """
+        {key: [values]} for every occurrence of a target json key, in one walk.
+        Per key, values are in the order the old per-key search would have met
+        them: a dict's own keys before anything nested in its values.
+        """
+        targets = self.target_keys
+        index = {}
+        stack = [data]
+        while stack:
+            obj = stack.pop()
             if isinstance(obj, dict):
-                if target_key in obj:
-                    return obj[target_key]
-                for v in obj.values():
-                    result = find_nested(v, target_key)
-                    if result:
-                        return result
+                for k, v in obj.items():
+                    if k in targets:
+                        index.setdefault(k, []).append(v)
+                stack.extend(v for v in reversed(obj.values()) if isinstance(v, (dict, list)))
             elif isinstance(obj, list):
-                for item in obj:
-                    result = find_nested(item, target_key)
-                    if result:
-                        return result
-            return None
-        
-        found_data = find_nested(data, key)
-        if found_data:
+                stack.extend(v for v in reversed(obj) if isinstance(v, (dict, list)))
+        return index
+    
+    def _extract_by_key(self, data, key, extracted_data, index=None):
+        """Helper to extract data by specific key (every non-empty occurrence)"""
+        if index is None:
+            index = self.index_keys(data)
+        found = False
+        for found_data in index.get(key, ()):
+            if not found_data:
+                continue
+            found = True
             # Process based on key type
             if "exit" in key or "from" in key or "origin" in key:
                 extracted_data["exit_ports"].extend(self._normalize_ports(found_data))
@@ -150,8 +192,7 @@ class EnhancedImportYetiScraper:
                 extracted_data["entry_ports"].extend(self._normalize_ports(found_data))
             elif "lane" in key or "route" in key:
                 extracted_data["lanes"].extend(self._normalize_lanes(found_data))
-            return True
-        return False
+        return found
     
     def _normalize_ports(self, data):
         """Normalize port data to standard format"""
@@ -159,62 +200,38 @@ class EnhancedImportYetiScraper:
         if isinstance(data, dict):
             for name, info in data.items():
                 if isinstance(info, dict):
-                    ports.append({
-                        "port": name,
-                        "shipments": info.get("shipments", 0),
-                        "lat": info.get("lat"),
-                        "lon": info.get("lon")
-                    })
+                    ports.append(PortEntry.from_dict(dict(info, port=name)))
                 elif isinstance(info, (int, float)):
-                    ports.append({"port": name, "shipments": int(info)})
+                    ports.append(PortEntry(name, shipment_count(info)))
         elif isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    ports.append({
-                        "port": item.get("port", item.get("name", "Unknown")),
-                        "shipments": item.get("shipments", item.get("count", 0)),
-                        "lat": item.get("lat"),
-                        "lon": item.get("lon")
-                    })
-        return ports[:5]  # Top 5
-    
+            ports = [p for p in map(PortEntry.from_dict, data) if p is not None]
+        # validated records, emitted in the scraper's own output shape
+        return [{"port": p.port or "Unknown", "shipments": p.shipments, "lat": p.lat, "lon": p.lon}
+                for p in ports[:5]]  # Top 5
+
     def _normalize_lanes(self, data):
         """Normalize lane data to standard format"""
         lanes = []
         if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    lanes.append({
-                        "exit_port": item.get("exit_port", item.get("from", "Unknown")),
-                        "entry_port": item.get("entry_port", item.get("to", "Unknown")), 
-                        "shipments": item.get("shipments", item.get("count", 0))
-                    })
-        return lanes[:5]  # Top 5
+            for l in [l for l in map(Lane.from_dict, data) if l is not None][:5]:  # Top 5
+                lane = {"exit_port": l.exit_port or "Unknown", "entry_port": l.entry_port or "Unknown",
+                        "shipments": l.shipments}
+                if l.teu is not None:  # stated by a lane table (html_tables)
+                    lane["teu"] = l.teu
+                lanes.append(lane)
+        return lanes
     
     def enhanced_html_extraction(self, html):
-        """Enhanced HTML extraction using multiple selectors"""
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        extracted_data = {"exit_ports": [], "entry_ports": [], "lanes": []}
-        
-        # Try CSS selectors
-        for selector in self.extraction_patterns["html_selectors"]:
-            try:
-                elements = soup.select(selector)
-                if elements:
-                    print(f"[html] Found elements with selector: {selector}")
-                    # Process elements...
-            except Exception as e:
-                continue
+        """Port/lane data from the page's tables and lists (html_tables, parsed once)"""
+        tables = extract_tables(html)
         
-        # Look for tables with port/lane data
-        tables = soup.find_all('table')
-        for table in tables:
-            table_text = table.get_text().lower()
-            if any(keyword in table_text for keyword in ['port', 'lane', 'shipping', 'trade']):
-                print(f"[html] Found relevant table")
-                # Extract table data...
+        extracted_data = {
+            "exit_ports": self._normalize_ports(tables.exit_ports),
+            "entry_ports": self._normalize_ports(tables.entry_ports),
+            "lanes": self._normalize_lanes(tables.lanes),
+        }
+        if tables.mapped:
+            print(f"[html] Mapped {tables.mapped} of {tables.blocks} tables/lists ({tables.backend})")
         
         return extracted_data
     
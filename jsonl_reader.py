@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# jsonl_reader.py
+# Shared JSONL ingestion: reads files in large binary blocks, skips blank
+# lines, counts (and remembers the first few) malformed lines, and decodes
+# with the fastest JSON backend installed: orjson, then msgspec, then stdlib.
+
+import json
+
+try:
+    import orjson
+    loads = orjson.loads
+    BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        loads = msgspec.json.Decoder().decode
+        BACKEND = "msgspec"
+    except ImportError:
+        loads = json.loads
+        BACKEND = "json"
+
+BLOCK_SIZE = 1 << 20  # 1 MiB reads
+
+# orjson.JSONDecodeError, msgspec.DecodeError, json.JSONDecodeError and
+# UnicodeDecodeError are all ValueError subclasses
+DecodeError = ValueError
+
+
+class JSONLStats:
+    """Counters filled in while reading: lines (non-blank), records, blank, malformed."""
+
+    MAX_EXAMPLES = 10
+
+    def __init__(self):
+        self.lines = 0
+        self.records = 0
+        self.blank = 0
+        self.malformed = 0
+        self.malformed_examples = []  # (line number or byte offset, error) for the first few
+
+    def merge(self, other):
+        self.lines += other.lines
+        self.records += other.records
+        self.blank += other.blank
+        self.malformed += other.malformed
+        room = self.MAX_EXAMPLES - len(self.malformed_examples)
+        self.malformed_examples.extend(other.malformed_examples[:max(room, 0)])
+        return self
+
+    def summary(self):
+        s = f"{self.lines} lines, {self.records} records"
+        if self.malformed:
+            s += f", {self.malformed} malformed"
+        return s
+
+
+def iter_lines(path, start=0, end=None, block_size=BLOCK_SIZE):
+    """
+    Yield (offset, raw line bytes without the newline) for every line that
+    starts in the byte range [start, end). `start` must be a line start.
+    """
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        pos = start
+        tail = b""
+        while True:
+            block = fh.read(block_size)
+            if not block:
+                break
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                if end is not None and pos >= end:
+                    return
+                yield pos, line
+                pos += len(line) + 1
+        if tail and (end is None or pos < end):
+            yield pos, tail
+
+
+def iter_jsonl(path, start=0, end=None, stats=None, decode=None, block_size=BLOCK_SIZE):
+    """
+    Yield decoded records from a JSONL file (or one byte range of it).
+
+    Blank lines are skipped; lines that fail to decode are counted in `stats`
+    (a JSONLStats) and skipped. Malformed examples are keyed by line number
+    when reading from the start of the file, else by byte offset.
+    """
+    decode = decode or loads
+    stats = stats if stats is not None else JSONLStats()
+    line_no = 0
+    for offset, line in iter_lines(path, start, end, block_size):
+        line_no += 1
+        if not line.strip():
+            stats.blank += 1
+            continue
+        stats.lines += 1
+        try:
+            obj = decode(line)
+        except DecodeError as e:
+            stats.malformed += 1
+            if len(stats.malformed_examples) < stats.MAX_EXAMPLES:
+                where = f"line {line_no}" if start == 0 else f"byte {offset}"
+                stats.malformed_examples.append((where, str(e)[:120]))
+            continue
+        stats.records += 1
+        yield obj
+
+
+def read_jsonl(path, stats=None, decode=None):
+    """All records of a JSONL file as a list (see iter_jsonl)."""
+    return list(iter_jsonl(path, stats=stats, decode=decode))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Small HTTP load generator for the Flask backend.
+
+Runs N client processes, each looping keep-alive GET requests against one URL
+for a fixed duration, and reports throughput and latency percentiles. Run it
+against servers started with different worker counts to compare scaling:
+
+    WEB_CONCURRENCY=1 gunicorn -c gunicorn.conf.py wsgi:application &
+    python3 loadtest.py --url http://127.0.0.1:8081/api/companies --clients 16 --duration 10
+"""
+
+import argparse
+import http.client
+import time
+from multiprocessing import Pool
+from urllib.parse import urlparse
+
+
+def _client(args):
+    url, duration, headers = args
+    u = urlparse(url)
+    path = u.path + (f"?{u.query}" if u.query else "")
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    conn.close()
+    return latencies, errors
+
+
+def pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8081/api/companies")
+    ap.add_argument("--clients", type=int, default=16, help="concurrent client processes")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per client")
+    ap.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip")
+    args = ap.parse_args()
+
+    headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+    with Pool(args.clients) as pool:
+        results = pool.map(_client, [(args.url, args.duration, headers)] * args.clients)
+
+    lat = sorted(x for l, _ in results for x in l)
+    errors = sum(e for _, e in results)
+    print(f"URL:        {args.url}")
+    print(f"Clients:    {args.clients}  Duration: {args.duration:.0f}s")
+    print(f"Requests:   {len(lat):,}  Errors: {errors:,}")
+    print(f"Throughput: {len(lat) / args.duration:,.0f} req/s")
+    print(f"Latency:    p50 {pct(lat, 0.50) * 1000:.1f} ms  "
+          f"p95 {pct(lat, 0.95) * 1000:.1f} ms  p99 {pct(lat, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
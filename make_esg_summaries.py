@@ -150,7 +150,7 @@ def row_to_payload(row: pd.Series) -> Dict[str, Any]:
     except Exception:
         ports_list = []
 
-    skip_cols = {"ports_flat", "top_west_coast_ports", "match_method", "matched_name_in_esg"}
+    skip_cols = {"ports_flat", "top_west_coast_ports", "match_method", "matched_name_in_esg", "match_score"}
 
     esg_fields: Dict[str, Any] = {}
     for col, val in row.items():
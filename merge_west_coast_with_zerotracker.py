@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+merge_west_coast_with_zerotracker.py
+
+Joins the companies analyzeData.py kept for a region (west_coast_companies.jsonl)
+with their ZeroTracker rows, matching names with entity_resolution (blocking +
+similarity score instead of normalizeData's keep/drop), and writes the CSV
+make_esg_summaries.py reads:
+
+    company, top_west_coast_ports (JSON), ports_flat,
+    match_method, matched_name_in_esg, match_score, <ZeroTracker columns>
+
+match_method is exact / core / fuzzy / initials / tokens (see
+entity_resolution), or none for unmatched companies (only written with
+--keep-unmatched). Raise --threshold to keep only closer matches.
+
+Usage:
+  python3 merge_west_coast_with_zerotracker.py \
+    --companies west_coast_companies.jsonl \
+    --esg-csv "ZEROTRACKERFULL(Sheet1).csv" \
+    --out-csv west_coast_company_and_esg.csv \
+    --debug
+"""
+
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+import pandas as pd
+
+from entity_resolution import DEFAULT_THRESHOLD, EntityResolver
+from jsonl_reader import JSONLStats, iter_jsonl
+from normalizeData import load_table_with_name_column
+
+
+def ports_key_of(records):
+    """The top_<region>_ports key of analyzeData records."""
+    for rec in records:
+        for k in rec:
+            if k.startswith("top_") and k.endswith("_ports"):
+                return k
+    return "top_west_coast_ports"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Join region companies with ZeroTracker rows by resolved name.")
+    ap.add_argument("--companies", default="west_coast_companies.jsonl", help="analyzeData.py output (JSONL)")
+    ap.add_argument("--esg-csv", required=True, help="ZeroTracker CSV (two-row header or single header)")
+    ap.add_argument("--out-csv", default="west_coast_company_and_esg.csv")
+    ap.add_argument("--encoding", help="ZeroTracker CSV encoding hint (utf-8, cp1252, etc.)")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="minimum match score (0-1)")
+    ap.add_argument("--keep-unmatched", action="store_true", help="also write companies with no ZeroTracker match")
+    ap.add_argument("--debug", action="store_true")
+    args = ap.parse_args()
+
+    stats = JSONLStats()
+    records = [r for r in iter_jsonl(args.companies, stats=stats) if isinstance(r, dict) and r.get("company")]
+    if stats.malformed:
+        print(f"[warn] {args.companies}: {stats.summary()}", file=sys.stderr)
+    ports_key = ports_key_of(records)
+
+    esg, name_col = load_table_with_name_column(args.esg_csv, args.encoding, debug=args.debug)
+    # first ZeroTracker row per name
+    esg = esg[esg[name_col].notna()].drop_duplicates(subset=[name_col], keep="first")
+    rows_by_name = esg.set_index(name_col, drop=False)
+
+    t0 = time.perf_counter()
+    resolver = EntityResolver(esg[name_col].tolist(), threshold=args.threshold)
+    matches = resolver.resolve([r["company"] for r in records])
+    elapsed = time.perf_counter() - t0
+
+    out = []
+    for rec in records:
+        ports = rec.get(ports_key) or []
+        m = matches.get(rec["company"])
+        if m is None and not args.keep_unmatched:
+            continue
+        row = rows_by_name.loc[m.matched].to_dict() if m is not None else {}
+        row.update({
+            "company": rec["company"],
+            ports_key: json.dumps(ports, ensure_ascii=False),
+            "ports_flat": " | ".join(f"{p.get('port')}: {p.get('shipments')}" for p in ports if isinstance(p, dict)),
+            "match_method": m.method if m is not None else "none",
+            "matched_name_in_esg": m.matched if m is not None else "",
+            "match_score": m.score if m is not None else "",
+        })
+        if args.debug:
+            print(f"[debug] {rec['company']!r} -> {row['matched_name_in_esg']!r} ({row['match_method']})")
+        out.append(row)
+
+    fixed = ["company", ports_key, "ports_flat", "match_method", "matched_name_in_esg", "match_score"]
+    columns = fixed + [c for c in esg.columns if c not in fixed]
+    pd.DataFrame(out, columns=columns).to_csv(args.out_csv, index=False)
+
+    methods = Counter(m.method if m else "none" for m in (matches.get(r["company"]) for r in records))
+    print(f"Companies:  {len(records):,} ({args.companies})")
+    print(f"ESG names:  {len(resolver):,} ({name_col})")
+    print(f"Matched:    {len(records) - methods.get('none', 0):,} "
+          f"({', '.join(f'{k} {v}' for k, v in methods.most_common())}) in {elapsed * 1000:.1f} ms")
+    print(f"Wrote:      {len(out):,} rows to {args.out_csv}")
+
+
+if __name__ == "__main__":
+    main()
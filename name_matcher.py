@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+name_matcher.py
+
+Indexed company-name matcher for normalizeData.py.
+
+Targets and values are normalized names (see name_normalize.normalize). A value
+matches when it equals a target (strict mode), or in fuzzy mode when it equals
+a target, contains one as a substring, or is contained in one -- the same rule
+as testing `t in nv or nv in t` against every target, without the scan:
+
+  * target inside value: an Aho-Corasick automaton over all targets finds
+    every target occurring in the value in one pass over its characters
+    (uses the pyahocorasick C extension when installed);
+  * value inside target: an n-gram inverted index over the targets narrows
+    the candidates to those sharing all of the value's trigrams, which are
+    then checked with `in`.
+
+which(value) reports the matched target: the exact one, else the longest
+target found inside the value, else the shortest target containing it
+(ties broken alphabetically).
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError:  # pure-Python automaton below
+    ahocorasick = None
+
+GRAM = 3
+_EMPTY: Set[str] = frozenset()
+
+
+def _shortest_key(t):
+    return len(t), t
+
+
+class AhoCorasick:
+    """Multi-pattern substring search: every pattern occurring in a text, in one pass."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted(set(p for p in patterns if p))
+        if ahocorasick is not None:
+            self._auto = ahocorasick.Automaton()
+            for p in self.patterns:
+                self._auto.add_word(p, p)
+            if self.patterns:
+                self._auto.make_automaton()
+            return
+        self._auto = None
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[str, ...]] = [()]
+        for p in self.patterns:
+            s = 0
+            for ch in p:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                s = nxt
+            out[s] = out[s] + (p,)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            for ch, nxt in goto[s].items():
+                queue.append(nxt)
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def find_all(self, text: str) -> Set[str]:
+        """Set of patterns occurring in text."""
+        if not self.patterns or not text:
+            return set()
+        if self._auto is not None:
+            return {p for _, p in self._auto.iter(text)}
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        s = 0
+        for ch in text:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                found.update(out[s])
+        return found
+
+
+class NgramIndex:
+    """Which targets contain a query as a substring, via an inverted index of character n-grams."""
+
+    def __init__(self, targets: Iterable[str], n: int = GRAM):
+        self.n = n
+        self.targets = sorted(set(t for t in targets if t))
+        self._postings: Dict[str, Set[str]] = {}
+        for t in self.targets:
+            # every gram of length 1..n, so short queries are answered exactly by one lookup
+            for k in range(1, n + 1):
+                for i in range(len(t) - k + 1):
+                    self._postings.setdefault(t[i:i + k], set()).add(t)
+        # shortest (then alphabetically first) target per gram, for short queries
+        self._shortest = {g: min(ts, key=_shortest_key) for g, ts in self._postings.items()}
+
+    def containing(self, query: str) -> Set[str]:
+        """Targets t with query in t (do not modify the returned set)."""
+        if not query:
+            return _EMPTY
+        if len(query) <= self.n:
+            return self._postings.get(query, _EMPTY)
+        grams = {query[i:i + self.n] for i in range(len(query) - self.n + 1)}
+        lists = sorted((self._postings.get(g, _EMPTY) for g in grams), key=len)
+        cands = lists[0].intersection(*lists[1:])
+        return {t for t in cands if query in t}
+
+    def shortest_containing(self, query: str) -> Optional[str]:
+        """Shortest target containing query (ties alphabetically), or None."""
+        if len(query) <= self.n:
+            return self._shortest.get(query)
+        found = self.containing(query)
+        return min(found, key=_shortest_key) if found else None
+
+
+class NameMatcher:
+    """
+    Callable matcher over normalized target names: matcher(value) -> bool,
+    matcher.which(value) -> matched target (normalized) or None.
+    """
+
+    def __init__(self, targets: Set[str], strict: bool, normalize):
+        self.targets = set(targets)
+        self.strict = strict
+        self.normalize = normalize
+        if not strict:
+            self._inside = AhoCorasick(self.targets)
+            self._around = NgramIndex(self.targets)
+
+    def which_normalized(self, nv: str) -> Optional[str]:
+        if not nv:
+            return None
+        if nv in self.targets:
+            return nv
+        if self.strict:
+            return None
+        inside = self._inside.find_all(nv)
+        if inside:
+            return min(inside, key=lambda t: (-len(t), t))
+        return self._around.shortest_containing(nv)
+
+    def which(self, val) -> Optional[str]:
+        return self.which_normalized(self.normalize(val))
+
+    def __call__(self, val) -> bool:
+        return self.which(val) is not None
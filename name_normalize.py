@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+name_normalize.py
+
+Company-name normalization shared by normalizeData.py, analyzeData.py,
+web_ports_extractor.py and the app's cache keys, so a name looks the same
+wherever it is compared:
+
+    strip accents (NFKD, drop combining marks), lowercase, '&' -> ' and ',
+    every run of non [a-z0-9] characters -> one space, strip.
+
+name_key(s) is the identity key for caches and merges: normalize(s),
+unless that would drop letters or digits outside a-z0-9 (non-Latin names
+would collapse together), then the casefolded name with whitespace collapsed.
+
+normalize(s) is the scalar form, memoized (names repeat a lot) and with an
+ASCII fast path that skips the Unicode decomposition. normalize_series(s)
+does the same over a whole pandas column with vectorized string methods
+and one translation table (built on first use; the scalar form drops
+combining marks per character instead); both give identical results.
+"""
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_AMP = {ord("&"): " and "}
+_TABLE = None
+
+
+def _translation_table():
+    """'&' -> ' and ' plus every combining mark -> deleted (built once, on first use)."""
+    global _TABLE
+    if _TABLE is None:
+        table = dict(_AMP)
+        for cp in range(sys.maxunicode + 1):
+            if unicodedata.combining(chr(cp)):
+                table[cp] = None
+        _TABLE = table
+    return _TABLE
+
+
+def strip_accents(s: str) -> str:
+    if s is None:
+        return ""
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", s)
+        if not unicodedata.combining(c)
+    )
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize(s: str) -> str:
+    """Lowercase, strip accents, replace & with 'and', remove non-alnum, collapse spaces."""
+    if s is None:
+        return ""
+    if s.isascii():
+        s = s.lower().translate(_AMP)
+    else:
+        # per-character drop of combining marks: the full table (normalize_series)
+        # costs most of a second to build, far more than a name needs
+        s = strip_accents(s).translate(_AMP).lower()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+@lru_cache(maxsize=1 << 16)
+def name_key(s: str) -> str:
+    """Key under which two spellings of one name ("Acme, Inc." / "ACME Inc") agree."""
+    if s is None:
+        return ""
+    nv = normalize(s)
+    if s.isascii():
+        lossy = not nv and s.strip()
+    else:
+        folded = strip_accents(s)
+        lossy = any(c.isalnum() and not c.isascii() for c in folded)
+    return " ".join(s.casefold().split()) if lossy else nv
+
+
+def normalize_series(values):
+    """normalize() over a pandas Series of strings, vectorized; missing values -> ''."""
+    s = values.str.normalize("NFKD").str.translate(_translation_table()).str.lower()
+    return s.str.replace(_NON_ALNUM, " ", regex=True).str.strip().fillna("")
@@ -15,33 +15,29 @@ Usage (strict exact matching on normalized names):
     --strict \
     --debug
 
+The file is parsed once: the encoding is sniffed and the header detected on
+a 1 MB sample, then only the needed columns are read (pyarrow engine when
+installed). To write only some columns (parsed alone, much faster):
+  --columns "Targets|Status" Year
+
+For exports too big to hold in memory, stream them (peak memory is set by the
+chunk size, not the file; the output is the same):
+  --chunksize 100000
+
 If you hit encoding issues, add for example: --encoding cp1252
 """
 
 import argparse
-import re
+import io
 import sys
-import unicodedata
-from typing import List, Set, Optional, Tuple
+import time
+from typing import List, NamedTuple, Set, Optional, Tuple
 import pandas as pd
 
+from name_matcher import NameMatcher
+from name_normalize import normalize, normalize_series
+
 # -------- helpers for normalization --------
-def strip_accents(s: str) -> str:
-    if s is None:
-        return ""
-    return "".join(
-        c for c in unicodedata.normalize("NFKD", s)
-        if not unicodedata.combining(c)
-    )
-
-def normalize(s: str) -> str:
-    """Lowercase, strip accents, replace & with 'and', remove non-alnum, collapse spaces."""
-    if s is None:
-        return ""
-    s = strip_accents(s)
-    s = s.lower().replace("&", " and ")
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return re.sub(r"\s+", " ", s).strip()
 
 def load_names(path: Optional[str]) -> List[str]:
     if path:
@@ -55,46 +51,41 @@ def load_names(path: Optional[str]) -> List[str]:
     raise SystemExit("ERROR: --names file is required and could not be read.")
 
 def to_norm_set(names: List[str]) -> Set[str]:
-    return {normalize(n) for n in names if normalize(n)}
-
-def make_matcher(targets: Set[str], strict: bool):
-    if strict:
-        return lambda val: normalize(val) in targets
-    # fuzzy-ish containment either way
-    def match(val: str) -> bool:
-        nv = normalize(val)
-        if not nv:
-            return False
-        if nv in targets:
-            return True
-        for t in targets:
-            if t in nv or nv in t:
-                return True
-        return False
-    return match
-
-# -------- CSV header detection --------
-def read_head(path: str, encoding: Optional[str], nrows: int = 80) -> pd.DataFrame:
-    encs = [encoding, "utf-8-sig", "utf-8", "cp1252", "latin1"]
-    last_err = None
-    for enc in [e for e in encs if e]:
-        try:
-            return pd.read_csv(path, header=None, dtype=str, nrows=nrows, encoding=enc)
-        except Exception as e:
-            last_err = e
-            continue
-    raise last_err or RuntimeError("Failed to read CSV head")
+    return {nv for nv in map(normalize, names) if nv}
 
-def read_full(path: str, encoding: Optional[str]) -> pd.DataFrame:
-    encs = [encoding, "utf-8-sig", "utf-8", "cp1252", "latin1"]
-    last_err = None
-    for enc in [e for e in encs if e]:
+def make_matcher(targets: Set[str], strict: bool) -> NameMatcher:
+    """
+    Exact normalized match (strict) or containment either way (fuzzy), answered
+    from an Aho-Corasick automaton and n-gram index instead of a scan of every
+    target; matcher.which(val) names the target that matched.
+    """
+    return NameMatcher(targets, strict, normalize)
+
+# -------- CSV loading --------
+ENCODINGS = ("utf-8-sig", "utf-8", "cp1252", "latin1")
+SAMPLE_BYTES = 1 << 20  # encoding sniffing and header detection look at this much of the file
+HEAD_ROWS = 100
+
+class CSVLayout(NamedTuple):
+    encoding: str
+    data_row: int          # first data row (rows before it are header/preamble)
+    usecols: List[int]     # columns to parse (non-empty header names)
+    columns: List[str]     # their names
+    name_col: Optional[str]
+
+def sniff_encoding(sample: bytes, encoding: Optional[str]) -> str:
+    """First of (hint, utf-8-sig, utf-8, cp1252, latin1) that decodes the byte sample."""
+    for enc in [e for e in (encoding,) + ENCODINGS if e]:
         try:
-            return pd.read_csv(path, header=None, dtype=str, encoding=enc)
-        except Exception as e:
-            last_err = e
-            continue
-    raise last_err or RuntimeError("Failed to read CSV")
+            sample.decode(enc)
+            return enc
+        except UnicodeDecodeError as e:
+            # a multi-byte character cut off by the end of the sample is fine
+            if e.reason == "unexpected end of data" and e.start >= len(sample) - 3:
+                return enc
+        except LookupError:
+            print(f"[warn] unknown encoding {enc!r}", file=sys.stderr)
+    return "latin1"
 
 def find_two_row_header_positions(head: pd.DataFrame) -> Optional[Tuple[int, int, int]]:
     """
@@ -137,52 +128,202 @@ def build_columns_from_two_rows(df: pd.DataFrame, top_r: int, sub_r: int) -> Lis
             new_cols.append(b)
     return new_cols
 
-def load_dataframe_with_detected_two_row_header(path: str, encoding: Optional[str], debug=False) -> Tuple[pd.DataFrame, Optional[str]]:
+def find_name_column(columns: List[str], two_row: bool) -> Optional[str]:
+    if two_row:
+        # Our target combined column:
+        for c in columns:
+            if str(c).strip().lower() == "entity type and location|name":
+                return c
+        # Fallback: any column whose right side is '|Name' and left contains 'entity type and location'
+        for c in columns:
+            parts = [p.strip().lower() for p in str(c).split("|")]
+            if len(parts) == 2 and parts[1] == "name" and "entity type and location" in parts[0]:
+                return c
+    # Prefer exact 'Name'
+    for c in columns:
+        if str(c).strip().lower() == "name":
+            return c
+    # Any column whose name contains '|Name'
+    for c in columns:
+        if str(c).strip().lower().endswith("|name"):
+            return c
+    return None
+
+def detect_layout(path: str, encoding: Optional[str], debug=False) -> CSVLayout:
     """
-    Try to detect the 2-row header and return (df, detected_name_col).
-    detected_name_col will be 'Entity type and location|Name' if found, else None.
+    Sniff the encoding and find the header on one byte sample of the file: the
+    two-row 'Entity type and location' / 'Name' header if present (empty-named
+    columns are dropped), else a single header row.
     """
-    head = read_head(path, encoding, nrows=100)
-    pos = find_two_row_header_positions(head)
-    if not pos:
-        return None, None
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+        truncated = bool(f.read(1))
+    enc = sniff_encoding(sample, encoding)
+    text = sample.decode(enc, errors="ignore")
+    if truncated and "\n" in text:
+        text = text[:text.rindex("\n") + 1]
+    if debug:
+        print(f"[debug] encoding {enc!r} (sniffed from {len(sample):,} bytes)")
 
-    top_r, sub_r, c_idx = pos
+    pos = None
+    try:
+        head = pd.read_csv(io.StringIO(text), header=None, dtype=str, nrows=HEAD_ROWS)
+        pos = find_two_row_header_positions(head)
+    except Exception as e:
+        print(f"[warn] two-row header detection failed: {e}", file=sys.stderr)
+
+    if pos:
+        top_r, sub_r, c_idx = pos
+        if debug:
+            print(f"[debug] two-row header detected at rows {top_r}/{sub_r}, anchor column index {c_idx}")
+        names = build_columns_from_two_rows(head, top_r, sub_r)
+        usecols = [i for i, c in enumerate(names) if str(c).strip() != ""]
+        columns = [names[i] for i in usecols]
+        name_col = find_name_column(columns, two_row=True)
+        if debug:
+            print(f"[debug] constructed {len(columns)} columns")
+        return CSVLayout(enc, sub_r + 1, usecols, columns, name_col)
+
+    # Maybe it's already single-header with 'Name'
     if debug:
-        print(f"[debug] two-row header detected at rows {top_r}/{sub_r}, anchor column index {c_idx}")
-
-    raw = read_full(path, encoding)
-    new_cols = build_columns_from_two_rows(raw, top_r, sub_r)
-
-    df = raw.iloc[sub_r + 1:].copy()
-    df.columns = new_cols
-
-    # Drop fully empty-named columns
-    df = df.loc[:, [c for c in df.columns if str(c).strip() != ""]]
-
-    # Our target combined column:
-    target_col = None
-    for c in df.columns:
-        cl = str(c).strip().lower()
-        if cl == "entity type and location|name":
-            target_col = c
-            break
-    # Fallback: any column whose right side is '|Name' and left contains 'entity type and location'
-    if target_col is None:
-        for c in df.columns:
-            parts = [p.strip().lower() for p in str(c).split("|")]
-            if len(parts) == 2 and parts[1] == "name" and "entity type and location" in parts[0]:
-                target_col = c
+        print("[debug] falling back to single-row header read")
+    columns = list(pd.read_csv(io.StringIO(text), dtype=str, nrows=HEAD_ROWS).columns)
+    return CSVLayout(enc, 1, list(range(len(columns))), columns, find_name_column(columns, two_row=False))
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def select_columns(layout: CSVLayout, wanted: List[str]) -> CSVLayout:
+    """Narrow the layout to the wanted columns (plus the Name column); unknown names raise ValueError."""
+    missing = [c for c in wanted if c not in layout.columns]
+    if missing:
+        raise ValueError(f"unknown column(s) {missing}; found {layout.columns}")
+    keep = set(wanted) | {layout.name_col}
+    pairs = [(u, c) for u, c in zip(layout.usecols, layout.columns) if c in keep]
+    return layout._replace(usecols=[u for u, _ in pairs], columns=[c for _, c in pairs])
+
+def read_table(path: str, layout: CSVLayout, engine: str = "auto") -> Tuple[pd.DataFrame, str]:
+    """
+    Parse the whole file once: only layout.usecols, with the pyarrow engine
+    when installed (C engine otherwise, or if pyarrow rejects the file).
+    Returns (df, engine).
+    """
+    if engine == "auto":
+        engines = ["pyarrow", "c"] if _pyarrow_available() else ["c"]
+    else:
+        engines = [engine]
+    encodings = [layout.encoding] + [e for e in ENCODINGS if e != layout.encoding]
+    last_err = None
+    for enc in encodings:
+        for engine in engines:
+            try:
+                df = pd.read_csv(path, header=None, dtype=str, usecols=layout.usecols,
+                                 encoding=enc, engine=engine)
+            except UnicodeDecodeError as e:
+                # the sample decoded but a later part of the file does not
+                print(f"[warn] {enc} failed past the sniffed sample ({e}); retrying", file=sys.stderr)
+                last_err = e
                 break
+            except Exception as e:
+                last_err = e
+                continue
+            df = df.iloc[layout.data_row:]
+            df.columns = layout.columns
+            return df, engine
+    raise last_err or RuntimeError("Failed to read CSV")
+
+def resolve_layout(path: str, encoding: Optional[str], debug=False,
+                   columns: Optional[List[str]] = None) -> CSVLayout:
+    """detect_layout (narrowed to columns) for a file that must have a Name column; exits with an error otherwise."""
+    try:
+        layout = detect_layout(path, encoding, debug=debug)
+        if columns and layout.name_col:
+            layout = select_columns(layout, columns)
+    except Exception as e:
+        print(f"Failed to read CSV: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not layout.name_col:
+        print(f"ERROR: Could not determine a Name column. Found columns: {layout.columns}", file=sys.stderr)
+        sys.exit(1)
+    if debug:
+        print(f"[debug] detected name column: {layout.name_col!r}")
+    return layout
 
+def load_table_with_name_column(path: str, encoding: Optional[str], debug=False,
+                                columns: Optional[List[str]] = None, engine: str = "auto") -> Tuple[pd.DataFrame, str]:
+    """
+    Load the ZeroTracker-style CSV (two-row header if present, else a single
+    header row) and find its Name column; exits with an error if neither works.
+    With columns, only those (and the Name column) are parsed.
+    """
+    layout = resolve_layout(path, encoding, debug=debug, columns=columns)
+    try:
+        df, engine = read_table(path, layout, engine)
+    except Exception as e:
+        print(f"Failed to read CSV: {e}", file=sys.stderr)
+        sys.exit(1)
     if debug:
-        print(f"[debug] constructed {len(df.columns)} columns")
-        if target_col:
-            print(f"[debug] detected name column: {target_col!r}")
-        else:
-            print(f"[debug] name column not found in constructed headers; columns include e.g.: {df.columns[:12].tolist()}")
+        print(f"[debug] parsed {len(df):,} rows x {len(df.columns)} columns ({layout.encoding}, {engine} engine)")
+    return df, layout.name_col
 
-    return df, target_col
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far (MB), where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+# -------- filtering --------
+def filter_rows(df: pd.DataFrame, name_col: str, match_fn: NameMatcher,
+                match_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    Rows whose name matches. Distinct names are normalized in one vectorized
+    pass, each distinct normalized name is matched once.
+    """
+    values = df[name_col].astype(str)
+    uniq = pd.Series(values.unique())
+    norm = normalize_series(uniq)
+    which = {nv: match_fn.which_normalized(nv) for nv in norm.unique()}
+    matched = values.map(dict(zip(uniq, norm.map(which))))
+    mask = matched.notna()
+    kept = df[mask]
+    if match_col:
+        kept = kept.assign(**{match_col: matched[mask]})
+    return kept
+
+def stream_filter(path: str, layout: CSVLayout, match_fn: NameMatcher, out_csv: str, chunksize: int,
+                  match_col: Optional[str] = None, debug=False) -> Tuple[int, int, int]:
+    """
+    Filter the CSV chunksize rows at a time, appending matched rows to
+    out_csv, so memory is bounded by the chunk size rather than the file.
+    Returns (input rows, kept rows, chunks).
+    """
+    reader = pd.read_csv(path, header=None, dtype=str, usecols=layout.usecols,
+                         encoding=layout.encoding, chunksize=chunksize)
+    columns = layout.columns + ([match_col] if match_col else [])
+    rows_in = rows_kept = chunks = 0
+    skip = layout.data_row
+    with open(out_csv, "w", newline="", encoding="utf-8") as fh:
+        pd.DataFrame(columns=columns).to_csv(fh, index=False)
+        for chunk in reader:
+            chunks += 1
+            if skip:
+                drop = min(skip, len(chunk))
+                chunk, skip = chunk.iloc[drop:], skip - drop
+            chunk.columns = layout.columns
+            kept = filter_rows(chunk, layout.name_col, match_fn, match_col)
+            kept.to_csv(fh, index=False, header=False)
+            rows_in += len(chunk)
+            rows_kept += len(kept)
+            if debug:
+                print(f"[debug] chunk {chunks}: {len(kept):,} of {len(chunk):,} rows kept")
+    return rows_in, rows_kept, chunks
 
 # -------- main --------
 def main():
@@ -192,79 +333,60 @@ def main():
     ap.add_argument("--names", required=True, help="Path to consumerBCO.txt (one company per line)")
     ap.add_argument("--strict", action="store_true", help="Exact (normalized) match only (default fuzzy-ish if omitted)")
     ap.add_argument("--encoding", help="CSV file encoding hint (utf-8, cp1252, etc.)")
+    ap.add_argument("--columns", nargs="+", help="Only parse and write these columns (the Name column is always kept)")
+    ap.add_argument("--engine", choices=["auto", "pyarrow", "c"], default="auto",
+                    help="CSV parser (auto: pyarrow when installed)")
+    ap.add_argument("--chunksize", type=int,
+                    help="Stream the file this many rows at a time (bounded memory for huge exports)")
+    ap.add_argument("--match-col", help="Add a column with the (normalized) target name each kept row matched")
     ap.add_argument("--debug", action="store_true", help="Print detection details")
     args = ap.parse_args()
 
-    # 1) Try the two-row header path
-    df = None
-    name_col = None
-    try:
-        df, name_col = load_dataframe_with_detected_two_row_header(args.in_csv, args.encoding, debug=args.debug)
-    except Exception as e:
-        print(f"[warn] two-row header detection failed: {e}", file=sys.stderr)
-
-    # 2) Fallbacks
-    if df is None:
-        # Try reading normally; maybe it's already single-header with 'Name'
-        if args.debug:
-            print("[debug] falling back to single-row header read")
-        try:
-            df = read_full(args.in_csv, args.encoding)
-            # assume first row is header
-            # re-read as header=0 using same encoding as succeeded above
-            df = None
-            for enc in (args.encoding, "utf-8-sig", "utf-8", "cp1252", "latin1"):
-                if not enc:
-                    continue
-                try:
-                    df = pd.read_csv(args.in_csv, encoding=enc, dtype=str)
-                    break
-                except Exception:
-                    continue
-            if df is None:
-                raise RuntimeError("Could not load CSV with a single header row")
-        except Exception as e:
-            print(f"Failed to read CSV: {e}", file=sys.stderr)
-            sys.exit(1)
-
-    # Find a suitable name column if we didn't detect the combined one
-    if not name_col:
-        # Prefer exact 'Name'
-        for c in df.columns:
-            if str(c).strip().lower() == "name":
-                name_col = c
-                break
-    if not name_col:
-        # Any column whose name contains '|Name'
-        for c in df.columns:
-            if str(c).strip().lower().endswith("|name"):
-                name_col = c
-                break
-    if not name_col:
-        print(f"ERROR: Could not determine a Name column. Found columns: {list(df.columns)}", file=sys.stderr)
-        sys.exit(1)
-
-    if args.debug:
-        print(f"[debug] using Name column: {name_col!r}")
-
     # Load list of companies to keep
     names = load_names(args.names)
     targets = to_norm_set(names)
     match_fn = make_matcher(targets, strict=args.strict)
 
-    # Filter
-    kept = df[df[name_col].astype(str).apply(match_fn)].copy()
+    t0 = time.perf_counter()
+    if args.chunksize:
+        layout = resolve_layout(args.in_csv, args.encoding, debug=args.debug, columns=args.columns)
+        name_col = layout.name_col
+        try:
+            rows_in, rows_kept, chunks = stream_filter(args.in_csv, layout, match_fn, args.out_csv,
+                                                       args.chunksize, args.match_col, debug=args.debug)
+        except UnicodeDecodeError as e:
+            print(f"Failed to read CSV as {layout.encoding} past the sniffed sample ({e}); "
+                  f"pass --encoding", file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(f"Failed to filter CSV: {e}", file=sys.stderr)
+            sys.exit(1)
+        load_desc = f"filtered in {chunks:,} chunks of {args.chunksize:,} rows"
+        load_s = time.perf_counter() - t0
+    else:
+        df, name_col = load_table_with_name_column(args.in_csv, args.encoding, debug=args.debug,
+                                                   columns=args.columns, engine=args.engine)
+        load_s = time.perf_counter() - t0
+        if args.debug:
+            print(f"[debug] using Name column: {name_col!r}")
+        kept = filter_rows(df, name_col, match_fn, args.match_col)
+        if args.debug:
+            print(f"[debug] {len(kept):,} rows matched")
 
-    # Write
-    try:
-        kept.to_csv(args.out_csv, index=False)
-    except Exception as e:
-        print(f"Failed to write output CSV: {e}", file=sys.stderr)
-        sys.exit(1)
+        # Write
+        try:
+            kept.to_csv(args.out_csv, index=False)
+        except Exception as e:
+            print(f"Failed to write output CSV: {e}", file=sys.stderr)
+            sys.exit(1)
+        rows_in, rows_kept = len(df), len(kept)
+        load_desc = "one parse"
+    peak = peak_rss_mb()
 
-    print(f"Input rows: {len(df):,}")
-    print(f"Kept rows:  {len(kept):,}")
+    print(f"Input rows: {rows_in:,}")
+    print(f"Kept rows:  {rows_kept:,}")
     print(f"Name col:   {name_col}")
+    print(f"Load:       {load_s:.2f} s, {load_desc}" + (f", peak RSS {peak:,.1f} MB" if peak is not None else ""))
     print(f"Strict:     {args.strict}")
     print(f"Wrote:      {args.out_csv}")
 
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# port_aggregation.py
+# Single-pass aggregation engine over bco_ports JSONL.
+#
+# PortAggregate streams the source once and keeps compact NumPy columns of
+# interned ids: one row per port observation (company, label, direction,
+# shipments) and per lane (company, exit label, entry label, shipments).
+# Companies are interned by name_normalize.name_key, so records spelled
+# "Acme Inc" and "ACME, Inc." are summed under the first spelling seen.
+# Region matrices (company x port x entry/exit), threshold reports and lane
+# totals are then derived from those columns without re-reading the file.
+#
+# Large files can be split into newline-aligned byte ranges, aggregated in a
+# process pool and merged back in file order (from_jsonl(..., workers=N));
+# the result is identical to the serial pass. Lines are read and decoded by
+# jsonl_reader (block reads, orjson/msgspec when installed). Source dicts are
+# read directly for the few fields aggregation needs (company, port labels,
+# lane ends, shipments), with the same key fallbacks and shipment rules as
+# port_records.CompanyResult.from_dict, without building the records;
+# CompanyResult objects are accepted too.
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from jsonl_reader import JSONLStats, iter_jsonl
+from name_normalize import name_key
+from port_records import CompanyResult, explicit_count, shipment_count
+
+ENTRY, EXIT = 0, 1
+
+
+class _Interner:
+    """
+    Maps strings to dense int ids in first-seen order. With a key function,
+    strings with equal keys share one id and values keeps the first spelling.
+    """
+
+    def __init__(self, key=None):
+        self.ids = {}
+        self.values = []
+        self.key = key
+
+    def __call__(self, value):
+        k = value if self.key is None else self.key(value)
+        i = self.ids.get(k)
+        if i is None:
+            i = self.ids[k] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _label_key(name):
+    # same normalization canonical_ports applies before matching
+    # (record port names are already stripped, see port_records)
+    return name.lower() if name else ""
+
+
+def _raw_label(value):
+    """_label_key of a raw port value, stripped as port_records does."""
+    if value is None:
+        return ""
+    return (value if type(value) is str else str(value)).strip().lower()
+
+
+def _raw_count(item):
+    """Shipments of a raw port/lane dict, as PortEntry/Lane.from_dict normalize them."""
+    qty = item["shipments"] if "shipments" in item else item.get("count")
+    if type(qty) is int:
+        return qty
+    n = explicit_count(qty)
+    return n if n is not None else shipment_count(None, item.get("notes") or None)
+
+
+def _raw_items(d, keys):
+    """Dict items of the first of keys holding a list (as CompanyResult.from_dict picks it)."""
+    for key in keys:
+        items = d.get(key)
+        if isinstance(items, list):
+            return [it for it in items if type(it) is dict]
+    return ()
+
+
+def shard_ranges(path, shards):
+    """Split a file into up to `shards` (start, end) byte ranges that begin at line starts."""
+    size = os.path.getsize(path)
+    if size == 0 or shards <= 1:
+        return [(0, size)]
+    cuts = [0]
+    with open(path, "rb") as fh:
+        for i in range(1, shards):
+            fh.seek(max(size * i // shards, cuts[-1]))
+            fh.readline()  # finish the line we landed in
+            pos = fh.tell()
+            if pos >= size:
+                break
+            if pos > cuts[-1]:
+                cuts.append(pos)
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _aggregate_shard(args):
+    """Process-pool worker: aggregate the lines in one byte range."""
+    path, start, end = args
+    agg = PortAggregate(None)
+    agg.add_jsonl(path, start, end)
+    return agg
+
+
+class PortAggregate:
+    """Columnar per-company port/lane counts built from one pass over JSONL records."""
+
+    def __init__(self, gazetteer):
+        self.gazetteer = gazetteer
+        self.stats = JSONLStats()  # lines / records / blank / malformed seen so far
+        # spellings of one company ("Acme Inc" / "ACME, Inc.") count as one, as in write_region
+        self._companies = _Interner(name_key)
+        self._labels = _Interner()
+        # port observations (only shipments > 0 are kept; the rest never count)
+        self._obs_company = array("i")
+        self._obs_label = array("i")
+        self._obs_direction = array("b")
+        self._obs_qty = array("q")
+        # lanes
+        self._lane_company = array("i")
+        self._lane_exit = array("i")
+        self._lane_entry = array("i")
+        self._lane_qty = array("q")
+        self._frozen = None
+
+    # ---- building ----
+    def add_record(self, obj):
+        """Add one source record (dict or CompanyResult); returns False if it has no company name."""
+        if isinstance(obj, CompanyResult):
+            return self._add_result(obj)
+        if not isinstance(obj, dict):
+            raise ValueError(f"company result must be an object, got {type(obj).__name__}")
+        company = obj.get("company") or obj.get("name") or ""
+        if not company:
+            return False
+        cid = self._companies(company if isinstance(company, str) else str(company))
+        labels = self._labels
+        for key, direction in ((("top_entry_ports", "entry_ports"), ENTRY), (("top_exit_ports", "exit_ports"), EXIT)):
+            for item in _raw_items(obj, key):
+                qty = _raw_count(item)
+                if qty <= 0:
+                    continue
+                self._obs_company.append(cid)
+                self._obs_label.append(labels(_raw_label(item["port"] if "port" in item else item.get("name"))))
+                self._obs_direction.append(direction)
+                self._obs_qty.append(qty)
+        for item in _raw_items(obj, ("top_lanes", "lanes")):
+            qty = _raw_count(item)
+            if qty <= 0:
+                continue
+            self._lane_company.append(cid)
+            self._lane_exit.append(labels(_raw_label(item["exit_port"] if "exit_port" in item else item.get("from"))))
+            self._lane_entry.append(labels(_raw_label(item["entry_port"] if "entry_port" in item else item.get("to"))))
+            self._lane_qty.append(qty)
+        self._frozen = None
+        return True
+
+    def _add_result(self, rec):
+        if not rec.company:
+            return False
+        cid = self._companies(rec.company)
+        for entries, direction in ((rec.entry_ports, ENTRY), (rec.exit_ports, EXIT)):
+            for e in entries:
+                if e.shipments <= 0:
+                    continue
+                self._obs_company.append(cid)
+                self._obs_label.append(self._labels(_label_key(e.port)))
+                self._obs_direction.append(direction)
+                self._obs_qty.append(e.shipments)
+        for lane in rec.lanes:
+            if lane.shipments <= 0:
+                continue
+            self._lane_company.append(cid)
+            self._lane_exit.append(self._labels(_label_key(lane.exit_port)))
+            self._lane_entry.append(self._labels(_label_key(lane.entry_port)))
+            self._lane_qty.append(lane.shipments)
+        self._frozen = None
+        return True
+
+    def add_jsonl(self, path, start=0, end=None):
+        """Add every record of a JSONL file, or of the lines starting in [start, end)."""
+        for obj in iter_jsonl(path, start, end, stats=self.stats):
+            if isinstance(obj, dict):
+                self.add_record(obj)
+
+    @property
+    def lines_read(self):
+        """Non-blank source lines seen, malformed ones included."""
+        return self.stats.lines
+
+    def merge(self, other):
+        """Append another aggregate's rows, remapping its company/label ids into ours."""
+        cmap = np.array([self._companies(c) for c in other._companies.values], dtype=np.int32)
+        lmap = np.array([self._labels(l) for l in other._labels.values], dtype=np.int32)
+        cols = other._columns()
+        if len(cols["obs_company"]):
+            self._obs_company.frombytes(cmap[cols["obs_company"]].tobytes())
+            self._obs_label.frombytes(lmap[cols["obs_label"]].tobytes())
+            self._obs_direction.frombytes(cols["obs_direction"].tobytes())
+            self._obs_qty.frombytes(cols["obs_qty"].tobytes())
+        if len(cols["lane_company"]):
+            self._lane_company.frombytes(cmap[cols["lane_company"]].tobytes())
+            self._lane_exit.frombytes(lmap[cols["lane_exit"]].tobytes())
+            self._lane_entry.frombytes(lmap[cols["lane_entry"]].tobytes())
+            self._lane_qty.frombytes(cols["lane_qty"].tobytes())
+        self.stats.merge(other.stats)
+        self._frozen = None
+        return self
+
+    @classmethod
+    def from_jsonl(cls, path, gazetteer, workers=1):
+        """
+        Stream a JSONL file once into a new aggregate (blank/malformed lines are skipped).
+
+        With workers > 1 the file is split into newline-aligned byte ranges that
+        are aggregated in a process pool; partial results are merged in file
+        order, so ids, ordering and counts match the serial pass.
+        """
+        agg = cls(gazetteer)
+        if workers <= 1:
+            agg.add_jsonl(path)
+            return agg
+
+        ranges = shard_ranges(path, workers * 4)  # a few shards per worker evens out load
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_aggregate_shard, [(str(path), a, b) for a, b in ranges]):
+                agg.merge(part)
+        return agg
+
+    @classmethod
+    def from_columnar(cls, out_dir, gazetteer):
+        """
+        Build from a columnar_export directory, reading only the company name,
+        port observation and lane columns aggregation needs. Companies keep the
+        source order, so reports and lane totals equal from_jsonl on that file.
+        """
+        from columnar_export import read_table
+        agg = cls(gazetteer)
+        names = read_table(out_dir, "companies", ["company"]).column("company").to_pylist()
+        cmap = [agg._companies(c) if c else -1 for c in names]
+        agg.stats.lines = agg.stats.records = len(names)
+
+        obs = read_table(out_dir, "port_observations", ["company_id", "direction", "port", "shipments"])
+        for cid, direction, port, qty in zip(*(obs.column(i).to_pylist() for i in range(4))):
+            if cmap[cid] < 0 or qty <= 0:
+                continue
+            agg._obs_company.append(cmap[cid])
+            agg._obs_label.append(agg._labels(_label_key(port)))
+            agg._obs_direction.append(ENTRY if direction == "entry" else EXIT)
+            agg._obs_qty.append(qty)
+
+        lanes = read_table(out_dir, "lanes", ["company_id", "exit_port", "entry_port", "shipments"])
+        for cid, exit_port, entry_port, qty in zip(*(lanes.column(i).to_pylist() for i in range(4))):
+            if cmap[cid] < 0 or qty <= 0:
+                continue
+            agg._lane_company.append(cmap[cid])
+            agg._lane_exit.append(agg._labels(_label_key(exit_port)))
+            agg._lane_entry.append(agg._labels(_label_key(entry_port)))
+            agg._lane_qty.append(qty)
+        return agg
+
+    # ---- columnar views ----
+    @property
+    def companies(self):
+        """Company names (first spelling seen per name_key); index = company id (first-seen order)."""
+        return self._companies.values
+
+    @property
+    def labels(self):
+        """Normalized port labels; index = label id."""
+        return self._labels.values
+
+    def _columns(self):
+        if self._frozen is None:
+            # copy out of the array buffers so more records can still be appended
+            def col(buf, dtype):
+                return np.frombuffer(buf, dtype=dtype).copy()
+            self._frozen = {
+                "obs_company": col(self._obs_company, np.int32),
+                "obs_label": col(self._obs_label, np.int32),
+                "obs_direction": col(self._obs_direction, np.int8),
+                "obs_qty": col(self._obs_qty, np.int64),
+                "lane_company": col(self._lane_company, np.int32),
+                "lane_exit": col(self._lane_exit, np.int32),
+                "lane_entry": col(self._lane_entry, np.int32),
+                "lane_qty": col(self._lane_qty, np.int64),
+            }
+        return self._frozen
+
+    def nbytes(self):
+        """Memory held by the column arrays."""
+        return sum(a.nbytes for a in self._columns().values())
+
+    # ---- derived results ----
+    def port_matrix(self, region=None):
+        """
+        (ports, counts) for a region: counts[company_id, port_index, direction]
+        with direction ENTRY=0 / EXIT=1. Labels resolving to several ports are
+        split evenly, remainder to the first ports.
+        """
+        ports = self.gazetteer.region_ports(region)
+        pidx = {p: i for i, p in enumerate(ports)}
+        canonical_ports = self.gazetteer.canonicalizer(region)
+        cols = self._columns()
+        counts = np.zeros((len(self._companies), len(ports), 2), dtype=np.int64)
+
+        # resolve each distinct label once
+        single = np.full(len(self._labels), -1, dtype=np.int64)
+        multi = {}
+        for lid, label in enumerate(self._labels.values):
+            hits = canonical_ports(label)
+            if len(hits) == 1:
+                single[lid] = pidx[hits[0]]
+            elif hits:
+                multi[lid] = [pidx[p] for p in hits]
+
+        comp, lab = cols["obs_company"], cols["obs_label"]
+        direc, qty = cols["obs_direction"], cols["obs_qty"]
+        if len(lab):
+            port_of = single[lab]
+            m = port_of >= 0
+            np.add.at(counts, (comp[m], port_of[m], direc[m]), qty[m])
+            for lid, targets in multi.items():
+                m = lab == lid
+                if not m.any():
+                    continue
+                base, rem = np.divmod(qty[m], len(targets))
+                for i, p in enumerate(targets):
+                    np.add.at(counts, (comp[m], p, direc[m]), base + (i < rem))
+        return ports, counts
+
+    def region_counts(self, region):
+        """{company: {port: entry+exit shipments}} for a region, companies in first-seen order."""
+        ports, counts = self.port_matrix(region)
+        totals = counts.sum(axis=2)
+        return {
+            company: dict(zip(ports, (int(v) for v in totals[cid])))
+            for cid, company in enumerate(self._companies.values)
+        }
+
+    def report(self, region, min_single, min_total):
+        """
+        Companies with considerable traffic in a region: at least min_single
+        shipments at one port or min_total across the region. Returns a list of
+        (company, [(port, shipments), ...] sorted by shipments desc, zeros dropped).
+        """
+        ports, counts = self.port_matrix(region)
+        totals = counts.sum(axis=2)
+        keep = (totals.sum(axis=1) >= min_total) | (totals >= min_single).any(axis=1)
+        out = []
+        for cid in np.flatnonzero(keep):
+            row = totals[cid]
+            # stable sort keeps gazetteer order for ties
+            order = sorted(range(len(ports)), key=lambda i: row[i], reverse=True)
+            out.append((self._companies.values[cid], [(ports[i], int(row[i])) for i in order if row[i] > 0]))
+        return out
+
+    def lane_counts(self, exit_region=None, entry_region=None):
+        """
+        {(company, exit_port, entry_port): shipments} for lanes whose exit and
+        entry labels each resolve to a single port of the given regions.
+        """
+        cols = self._columns()
+        resolve = []
+        for region in (exit_region, entry_region):
+            canonical_ports = self.gazetteer.canonicalizer(region)
+            names = []
+            for label in self._labels.values:
+                hits = canonical_ports(label)
+                names.append(hits[0] if len(hits) == 1 else None)
+            resolve.append(names)
+        totals = {}
+        for cid, xl, nl, q in zip(cols["lane_company"].tolist(), cols["lane_exit"].tolist(),
+                                  cols["lane_entry"].tolist(), cols["lane_qty"].tolist()):
+            x, n = resolve[0][xl], resolve[1][nl]
+            if x is None or n is None:
+                continue
+            key = (self._companies.values[cid], x, n)
+            totals[key] = totals.get(key, 0) + q
+        return totals
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# port_gazetteer.py
+# Data-driven port gazetteer: canonical port names, aliases, UN/LOCODEs,
+# region tags and combined-complex splits, loaded from port_gazetteer.json.
+# Used by analyzeData.py to canonicalize free-text port labels per region.
+
+import re
+import json
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_GAZETTEER = Path(__file__).with_name("port_gazetteer.json")
+
+
+def normalize_label(s) -> str:
+    """Lowercase and collapse whitespace; the key used for exact alias lookups."""
+    return " ".join(str(s or "").lower().split())
+
+
+def alias_pattern(alias: str) -> str:
+    """
+    Regex source for an alias: whole words, any run of whitespace between
+    words, optional spaces around '/', '-' and ','.
+    e.g. "la/lb" -> r"\\bla\\s*/\\s*lb\\b"
+    """
+    a = re.sub(r"\s*([/,-])\s*", r"\1", normalize_label(alias))
+    out = []
+    for tok in re.split(r"(\s+|[/,-])", a):
+        if not tok:
+            continue
+        if tok.isspace():
+            out.append(r"\s+")
+        elif tok in "/,-":
+            out.append(rf"\s*{re.escape(tok)}\s*")
+        else:
+            out.append(re.escape(tok))
+    head = r"\b" if a[:1].isalnum() else ""
+    tail = r"\b" if a[-1:].isalnum() else ""
+    return head + "".join(out) + tail
+
+
+def compile_canonicalizer(port_patterns, combined_patterns, cache_size=8192):
+    """
+    Build canonical_ports(name) from {canon: regex} single-port patterns and
+    [(regex, [ports])] combined-label patterns.
+
+    All patterns are folded into one alternation of named groups inside a
+    zero-width lookahead, so one scan tries every start position (overlapping
+    hits are still seen) and a combined label wins wherever it occurs, exactly
+    as checking each regex in turn would. Results are memoized per normalized
+    label, so repeated labels ("Los Angeles") cost a dict lookup.
+    """
+    alts, groups = [], {}
+    combined_groups, single_groups = [], []
+    for i, (pat, ports) in enumerate(combined_patterns):
+        g = f"c{i}"
+        alts.append(f"(?P<{g}>{pat.pattern})")
+        groups[g] = tuple(ports)
+        combined_groups.append(g)
+    for i, (canon, pat) in enumerate(port_patterns.items()):
+        g = f"p{i}"
+        alts.append(f"(?P<{g}>{pat.pattern})")
+        groups[g] = canon
+        single_groups.append(g)
+    if not alts:
+        return lambda name: []
+    scanner = re.compile("(?=" + "|".join(alts) + ")", re.I)
+
+    @lru_cache(maxsize=cache_size)
+    def _lookup(s):
+        seen = set()
+        for m in scanner.finditer(s):
+            # exactly one top-level alternative matched at this position
+            seen.update(k for k, v in m.groupdict().items() if v is not None and k in groups)
+        # 1) Combined labels first
+        for g in combined_groups:
+            if g in seen:
+                return groups[g]
+        # 2) Single-port hits (could be more than one in odd cases), in declared order
+        return tuple(dict.fromkeys(groups[g] for g in single_groups if g in seen))
+
+    def canonical_ports(name):
+        """Return list of canonical ports from a label; handles combined forms."""
+        if not name:
+            return []
+        return list(_lookup(str(name).strip().lower()))
+
+    canonical_ports.cache_info = _lookup.cache_info
+    return canonical_ports
+
+
+class PortGazetteer:
+    """
+    Ports ({name, locode, regions, aliases}) and complexes ({name, split, aliases}).
+
+    resolve() answers exact alias / LOCODE lookups from a dict index;
+    canonicalizer(region) returns a memoized free-text matcher limited to one
+    region (None = every port).
+    """
+
+    def __init__(self, ports, complexes=()):
+        self.ports = {p["name"]: p for p in ports}
+        self.complexes = list(complexes)
+        for c in self.complexes:
+            unknown = [p for p in c["split"] if p not in self.ports]
+            if unknown:
+                raise ValueError(f"complex {c['name']!r} splits into unknown ports: {unknown}")
+
+        # exact alias / canonical name / LOCODE -> tuple of canonical ports
+        self._index = {}
+        for name, p in self.ports.items():
+            for a in [name, *p.get("aliases", [])]:
+                self._index.setdefault(normalize_label(a), (name,))
+            if p.get("locode"):
+                self._index.setdefault(normalize_label(p["locode"]), (name,))
+        for c in self.complexes:
+            for a in [c["name"], *c.get("aliases", [])]:
+                self._index.setdefault(normalize_label(a), tuple(c["split"]))
+
+        self._canonicalizers = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_GAZETTEER):
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        return cls(doc.get("ports", []), doc.get("complexes", []))
+
+    def digest(self):
+        """Content hash of the ports and complexes; changes whenever matching could."""
+        doc = json.dumps([list(self.ports.values()), self.complexes], sort_keys=True)
+        return hashlib.sha1(doc.encode("utf-8")).hexdigest()
+
+    def regions(self):
+        """Region tags in first-seen order."""
+        return list(dict.fromkeys(r for p in self.ports.values() for r in p.get("regions", [])))
+
+    def region_ports(self, region=None):
+        """Canonical port names in a region (all ports if region is None), in file order."""
+        return tuple(name for name, p in self.ports.items()
+                     if region is None or region in p.get("regions", []))
+
+    def resolve(self, label):
+        """Exact alias/LOCODE lookup: list of canonical ports, or [] if unknown."""
+        return list(self._index.get(normalize_label(label), ()))
+
+    def canonicalizer(self, region=None):
+        """Memoized canonical_ports(label) restricted to one region's ports."""
+        if region not in self._canonicalizers:
+            members = self.region_ports(region)
+            port_patterns = {
+                name: re.compile("|".join(alias_pattern(a) for a in self.ports[name].get("aliases") or [name]), re.I)
+                for name in members
+            }
+            combined = []
+            for c in self.complexes:
+                split = [p for p in c["split"] if p in members]
+                if split:
+                    combined.append((re.compile("|".join(alias_pattern(a) for a in c["aliases"]), re.I), split))
+            self._canonicalizers[region] = compile_canonicalizer(port_patterns, combined)
+        return self._canonicalizers[region]
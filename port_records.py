@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# port_records.py
+# Typed, compact records for company port results: PortEntry, Lane and
+# CompanyResult, shared by web_ports_extractor.py, analyzeData.py (through
+# port_aggregation.py), improved_scraper.py and app.py.
+#
+# Records are built once at ingestion with from_dict(), which validates the
+# loose JSON shapes (extractor keys top_entry_ports/top_exit_ports/top_lanes
+# or scraper keys entry_ports/exit_ports/lanes) and normalizes shipments to a
+# plain int: an explicit count, else one stated in the notes ("12 shipments"),
+# else 0. Consumers read .shipments instead of re-deriving it.
+#
+# The classes use __slots__ and intern port / country strings, so a record
+# costs a fraction of the nested dicts it replaces (see bench_records.py).
+
+import re
+import sys
+import math
+from functools import lru_cache
+
+WORD_TO_NUM = {"one":1,"two":2,"three":3,"four":4,"five":5,"six":6,"seven":7,"eight":8,"nine":9,"ten":10}
+
+# "<count> shipments/records" in free-text notes. A count is a plain integer,
+# a thousands-separated one ("1,200") or a k-suffixed one ("1.2k", "15k").
+# Either form is preferred over a word number ("four shipments") anywhere
+# in the note. One compiled scan covers both; notes are cached per string.
+_NOTE_COUNT = re.compile(
+    r"\b(?:(?P<num>\d{1,3}(?:,\d{3})+(?!\d)|\d+(?:\.\d+)?k|\d+)|(?P<word>" + "|".join(WORD_TO_NUM) + r"))"
+    r"\s+(?:shipment|shipments|record|records|import\s+records)\b"
+)
+_NOTE_COUNT_ANYCASE = re.compile(_NOTE_COUNT.pattern, re.IGNORECASE)
+NOTES_CACHE_SIZE = 65536
+
+
+def _note_number(text):
+    if text[-1] in "kK":
+        return int(round(float(text[:-1]) * 1000))
+    return int(text.replace(",", ""))
+
+
+def _find_count(pattern, s):
+    word = None
+    for m in pattern.finditer(s):
+        if m.group("num"):
+            return _note_number(m.group("num")), m
+        if word is None:
+            word = WORD_TO_NUM[m.group("word").lower()], m
+    return word
+
+
+def _scan_note(s):
+    """Count stated in one lowercased note, or None."""
+    found = _find_count(_NOTE_COUNT, s)
+    return found[0] if found else None
+
+
+def stated_shipments(text):
+    """
+    (count, match) for the count parse_shipments_from_notes reads from text,
+    matched in place so text[:match.start()] is what precedes it; or None.
+    """
+    return _find_count(_NOTE_COUNT_ANYCASE, text) if text else None
+
+
+@lru_cache(maxsize=NOTES_CACHE_SIZE)
+def _parse_note(notes):
+    return _scan_note(notes.strip().lower())
+
+
+def parse_shipments_from_notes(notes):
+    """Shipment count stated in free-text notes ("12 shipments", "1,200 records", "four shipments"), or None."""
+    if not notes:
+        return None
+    return _parse_note(notes if isinstance(notes, str) else str(notes))
+
+
+parse_shipments_from_notes.cache_info = _parse_note.cache_info
+parse_shipments_from_notes.cache_clear = _parse_note.cache_clear
+
+
+def explicit_count(value):
+    """Count given directly (int, finite float or digit string, "1,200" allowed), else None."""
+    if type(value) is int:
+        return value
+    if isinstance(value, float) and math.isfinite(value):
+        return int(value)
+    if isinstance(value, str):
+        s = value.strip().replace(",", "")
+        if s.isdigit():
+            return int(s)
+    return None
+
+
+def shipment_count(value, notes=None) -> int:
+    """Explicit count (int, whole float or digit string), else a count stated in notes, else 0."""
+    n = explicit_count(value)
+    if n is not None:
+        return n
+    n = parse_shipments_from_notes(notes)
+    return int(n) if n is not None else 0
+
+
+def _text(value, _intern=sys.intern):
+    """Stripped, interned string, or None when empty."""
+    if value is None:
+        return None
+    s = (value if type(value) is str else str(value)).strip()
+    return _intern(s) if s else None
+
+
+def _opt_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and math.isfinite(value):
+        return int(value)
+    return None
+
+
+def _opt_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+class _Record:
+    """Base for slotted records: to_dict() always emits REQUIRED, other fields when not None."""
+
+    __slots__ = ()
+    REQUIRED = ()
+
+    def to_dict(self):
+        out = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None or name in self.REQUIRED:
+                out[name] = value
+        return out
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class PortEntry(_Record):
+    """One port in a company's top entry/exit list."""
+
+    __slots__ = ("port", "shipments", "country", "notes", "lat", "lon")
+    REQUIRED = ("port", "shipments")
+
+    def __init__(self, port, shipments=0, country=None, notes=None, lat=None, lon=None):
+        self.port = port
+        self.shipments = shipments
+        self.country = country
+        self.notes = notes
+        self.lat = lat
+        self.lon = lon
+
+    @classmethod
+    def from_dict(cls, d):
+        """Validate one loose port dict ({port|name, shipments|count, notes, ...}); None if not a dict."""
+        if type(d) is not dict:
+            return None
+        get = d.get
+        notes = get("notes") or None
+        qty = d["shipments"] if "shipments" in d else get("count")
+        lat, lon = get("lat"), get("lon")
+        return cls(
+            _text(d["port"] if "port" in d else get("name")),
+            qty if type(qty) is int else shipment_count(qty, notes),
+            _text(get("country")),
+            notes,
+            None if lat is None else _opt_float(lat),
+            None if lon is None else _opt_float(lon),
+        )
+
+
+class Lane(_Record):
+    """One exit port -> entry port trade lane."""
+
+    __slots__ = ("exit_port", "exit_country", "exit_region", "entry_port", "entry_region",
+                 "shipments", "teu", "confidence", "notes")
+    REQUIRED = ("exit_port", "entry_port", "shipments")
+
+    def __init__(self, exit_port, entry_port, shipments=0, exit_country=None, exit_region=None,
+                 entry_region=None, teu=None, confidence=None, notes=None):
+        self.exit_port = exit_port
+        self.exit_country = exit_country
+        self.exit_region = exit_region
+        self.entry_port = entry_port
+        self.entry_region = entry_region
+        self.shipments = shipments
+        self.teu = teu
+        self.confidence = confidence
+        self.notes = notes
+
+    @classmethod
+    def from_dict(cls, d):
+        """Validate one loose lane dict ({exit_port|from, entry_port|to, shipments|count, ...}); None if not a dict."""
+        if type(d) is not dict:
+            return None
+        get = d.get
+        notes = get("notes") or None
+        qty = d["shipments"] if "shipments" in d else get("count")
+        teu, conf = get("teu"), get("confidence")
+        return cls(
+            _text(d["exit_port"] if "exit_port" in d else get("from")),
+            _text(d["entry_port"] if "entry_port" in d else get("to")),
+            qty if type(qty) is int else shipment_count(qty, notes),
+            _text(get("exit_country")),
+            _text(get("exit_region")),
+            _text(get("entry_region")),
+            None if teu is None else _opt_int(teu),
+            None if conf is None else _opt_float(conf),
+            notes,
+        )
+
+
+def _entries(d, keys, parse):
+    for key in keys:
+        items = d.get(key)
+        if isinstance(items, list):
+            return [e for e in map(parse, items) if e is not None]
+    return []
+
+
+class CompanyResult(_Record):
+    """A company's port result: top entry/exit ports, top lanes and provenance."""
+
+    __slots__ = ("company", "status", "sources", "entry_ports", "exit_ports", "lanes", "confidence", "error")
+    REQUIRED = __slots__
+
+    def __init__(self, company, entry_ports=(), exit_ports=(), lanes=(), status=None,
+                 sources=(), confidence=0.0, error=None):
+        self.company = company
+        self.status = status
+        self.sources = sources if type(sources) is list else list(sources)
+        self.entry_ports = entry_ports if type(entry_ports) is list else list(entry_ports)
+        self.exit_ports = exit_ports if type(exit_ports) is list else list(exit_ports)
+        self.lanes = lanes if type(lanes) is list else list(lanes)
+        self.confidence = confidence
+        self.error = error
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Validate one company result dict. Accepts extractor keys (top_entry_ports,
+        top_exit_ports, top_lanes) or scraper keys (entry_ports, exit_ports,
+        lanes); non-dict list items are dropped. Raises ValueError for a non-dict.
+        """
+        if not isinstance(d, dict):
+            raise ValueError(f"company result must be an object, got {type(d).__name__}")
+        company = d.get("company") or d.get("name") or ""
+        sources = d.get("sources")
+        return cls(
+            company=company if isinstance(company, str) else str(company),
+            entry_ports=_entries(d, ("top_entry_ports", "entry_ports"), PortEntry.from_dict),
+            exit_ports=_entries(d, ("top_exit_ports", "exit_ports"), PortEntry.from_dict),
+            lanes=_entries(d, ("top_lanes", "lanes"), Lane.from_dict),
+            status=d.get("status"),
+            sources=[str(s) for s in sources] if isinstance(sources, list) else (),
+            confidence=_opt_float(d.get("confidence")) or 0.0,
+            error=d.get("error"),
+        )
+
+    def to_dict(self):
+        """Extractor JSONL shape (top_entry_ports / top_exit_ports / top_lanes)."""
+        return {
+            "company": self.company,
+            "status": self.status,
+            "sources": list(self.sources),
+            "top_entry_ports": [p.to_dict() for p in self.entry_ports],
+            "top_exit_ports": [p.to_dict() for p in self.exit_ports],
+            "top_lanes": [l.to_dict() for l in self.lanes],
+            "confidence": self.confidence,
+            "error": self.error,
+        }
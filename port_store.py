@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Embedded SQLite store of extracted company port results, for ad-hoc
+cross-company questions ("which companies ship >100 through Long Beach from
+Yantian?") without another script over the JSONL.
+
+Tables:
+    companies     one row per company (status, confidence, sources, fingerprint)
+    observations  company x direction x canonical port, shipments
+    lanes         company x exit port x entry port, shipments
+
+Port labels are canonicalized with the gazetteer on load. A label naming a
+combined complex is split across its ports the way analyzeData does; lane
+ends are kept only when they resolve to a single port. Indexes cover
+company, (port, direction) and (exit_port, entry_port).
+
+upsert_jsonl() is incremental: companies whose record (and gazetteer) is
+unchanged are skipped by fingerprint, changed ones have their rows replaced.
+Companies are keyed by name_normalize.name_key (companies.key), so a
+company spread over several lines, spellings or loads is one row: records
+of a company are merged per upsert, and a later load replaces its rows. The
+name shown is the first spelling seen, and totals match analyzeData's.
+
+    python3 port_store.py load bco_ports_80.jsonl
+    python3 port_store.py port "Long Beach" --direction entry --min 100
+    python3 port_store.py lane --from Yantian --to "Long Beach" --min 100
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+from cache_store import ThreadConnections
+from jsonl_reader import JSONLStats, iter_jsonl
+from name_normalize import name_key
+from port_gazetteer import PortGazetteer
+from port_records import CompanyResult
+
+DEFAULT_STORE = ".cache/port_store.sqlite3"
+SCHEMA_VERSION = 2  # 2: companies keyed by name_key (companies.key), not by name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    id          INTEGER PRIMARY KEY,
+    key         TEXT NOT NULL UNIQUE,   -- name_normalize.name_key(name)
+    name        TEXT NOT NULL,          -- first spelling seen
+    status      TEXT,
+    confidence  REAL,
+    error       TEXT,
+    sources     TEXT,
+    fingerprint TEXT NOT NULL,
+    updated     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    company_id  INTEGER NOT NULL,
+    direction   TEXT NOT NULL,          -- 'entry' | 'exit'
+    port        TEXT,                   -- canonical gazetteer name, NULL if unresolved
+    label       TEXT,                   -- port label as extracted
+    shipments   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_port ON observations (port, direction, shipments);
+CREATE INDEX IF NOT EXISTS observations_company ON observations (company_id);
+CREATE TABLE IF NOT EXISTS lanes (
+    company_id  INTEGER NOT NULL,
+    exit_port   TEXT,
+    entry_port  TEXT,
+    exit_label  TEXT,
+    entry_label TEXT,
+    shipments   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lanes_pair ON lanes (exit_port, entry_port, shipments);
+CREATE INDEX IF NOT EXISTS lanes_entry ON lanes (entry_port);
+CREATE INDEX IF NOT EXISTS lanes_company ON lanes (company_id);
+"""
+
+
+def _split(qty, ports):
+    """Split qty across ports evenly, remainder to the first ones (as PortAggregate.port_matrix)."""
+    base, rem = divmod(qty, len(ports))
+    return [(p, base + (i < rem)) for i, p in enumerate(ports)]
+
+
+def _merge(recs):
+    """
+    One CompanyResult from several records of a company: every port and lane
+    row, the first spelling of the name, status / confidence / error of the
+    last record and each source once.
+    """
+    last = recs[-1]
+    return CompanyResult(
+        recs[0].company,
+        entry_ports=[e for r in recs for e in r.entry_ports],
+        exit_ports=[e for r in recs for e in r.exit_ports],
+        lanes=[lane for r in recs for lane in r.lanes],
+        status=last.status,
+        sources=list(dict.fromkeys(src for r in recs for src in r.sources)),
+        confidence=last.confidence,
+        error=last.error,
+    )
+
+
+class PortStore:
+    """
+    SQLite-backed company/port/lane store with a small query API.
+
+    Connections are per thread and process (WAL mode, cache_store.ThreadConnections)
+    as in cache_store.SQLiteCache, so one PortStore can be shared by the Flask
+    app's worker threads; close() closes those of every thread.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, gazetteer=None):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.gazetteer = gazetteer or PortGazetteer.load()
+        self._canonical = self.gazetteer.canonicalizer(None)
+        self._gazetteer_digest = self.gazetteer.digest()
+        self._conns = ThreadConnections(self._connect)
+        self._migrate(self._conn())
+
+    def _migrate(self, conn):
+        """
+        Create the tables, or rebuild them when the store predates SCHEMA_VERSION;
+        the store is derived from the JSONL, so the next load refills it.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            old = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'companies'").fetchone()
+            if old is not None:
+                print(f"[store] {self.path}: schema version {version} -> {SCHEMA_VERSION},"
+                      " dropping old rows; reload the source JSONL", file=sys.stderr)
+                conn.executescript("DROP TABLE IF EXISTS companies; DROP TABLE IF EXISTS observations;"
+                                   " DROP TABLE IF EXISTS lanes;")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self):
+        return self._conns.get()
+
+    def close(self):
+        self._conns.close_all()
+
+    # ---- loading ----
+    def _fingerprint(self, rec):
+        doc = json.dumps(rec.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1((self._gazetteer_digest + doc).encode("utf-8")).hexdigest()
+
+    def upsert(self, records):
+        """
+        Insert or replace company results (CompanyResult or dicts) in one
+        transaction; records of one company (same name_key) are merged first,
+        and replace what an earlier upsert stored for it under any spelling.
+        Returns {"inserted", "updated", "unchanged", "skipped"} counts, per
+        company except "skipped" (records that are not objects or name no company).
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+        groups = {}
+        for rec in records:
+            if not isinstance(rec, CompanyResult):
+                if not isinstance(rec, dict):
+                    counts["skipped"] += 1
+                    continue
+                rec = CompanyResult.from_dict(rec)
+            if not rec.company:
+                counts["skipped"] += 1
+                continue
+            groups.setdefault(name_key(rec.company), []).append(rec)
+
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, recs in groups.items():
+                rec = recs[0] if len(recs) == 1 else _merge(recs)
+                fp = self._fingerprint(rec)
+                row = conn.execute("SELECT id, fingerprint FROM companies WHERE key = ?",
+                                   (key,)).fetchone()
+                if row is not None and row[1] == fp:
+                    counts["unchanged"] += 1
+                    continue
+                values = (rec.status, rec.confidence, rec.error, json.dumps(rec.sources), fp, now)
+                if row is None:
+                    cid = conn.execute(
+                        "INSERT INTO companies (key, name, status, confidence, error, sources, fingerprint, updated)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (key, rec.company, *values)).lastrowid
+                    counts["inserted"] += 1
+                else:
+                    cid = row[0]
+                    conn.execute(
+                        "UPDATE companies SET status = ?, confidence = ?, error = ?, sources = ?,"
+                        " fingerprint = ?, updated = ? WHERE id = ?", (*values, cid))
+                    conn.execute("DELETE FROM observations WHERE company_id = ?", (cid,))
+                    conn.execute("DELETE FROM lanes WHERE company_id = ?", (cid,))
+                    counts["updated"] += 1
+                conn.executemany(
+                    "INSERT INTO observations (company_id, direction, port, label, shipments) VALUES (?, ?, ?, ?, ?)",
+                    self._observation_rows(cid, rec))
+                conn.executemany(
+                    "INSERT INTO lanes (company_id, exit_port, entry_port, exit_label, entry_label, shipments)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", self._lane_rows(cid, rec))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return counts
+
+    def _observation_rows(self, cid, rec):
+        for direction, entries in (("entry", rec.entry_ports), ("exit", rec.exit_ports)):
+            for e in entries:
+                hits = self._canonical(e.port)
+                if not hits:
+                    yield cid, direction, None, e.port, e.shipments
+                    continue
+                for port, qty in _split(e.shipments, hits):
+                    yield cid, direction, port, e.port, qty
+
+    def _lane_rows(self, cid, rec):
+        for lane in rec.lanes:
+            x, n = self._canonical(lane.exit_port), self._canonical(lane.entry_port)
+            yield (cid, x[0] if len(x) == 1 else None, n[0] if len(n) == 1 else None,
+                   lane.exit_port, lane.entry_port, lane.shipments)
+
+    def upsert_jsonl(self, path, stats=None):
+        """Incrementally load extractor JSONL (see upsert); malformed lines are counted in stats."""
+        return self.upsert(iter_jsonl(path, stats=stats))
+
+    # ---- queries ----
+    def resolve_port(self, name):
+        """Canonical gazetteer name for a user-supplied port ('long beach', 'USLGB'), else the name as given."""
+        hits = self.gazetteer.resolve(name) or self._canonical(name)
+        return hits[0] if len(hits) == 1 else str(name).strip()
+
+    def companies_through(self, port, direction=None, min_shipments=1, limit=None):
+        """
+        [(company, shipments)] for companies with at least min_shipments through
+        a port (entry, exit or both when direction is None), largest first.
+        """
+        sql = ["SELECT c.name, SUM(o.shipments) AS total FROM observations o",
+               "JOIN companies c ON c.id = o.company_id WHERE o.port = ?"]
+        params = [self.resolve_port(port)]
+        if direction:
+            sql.append("AND o.direction = ?")
+            params.append(direction)
+        sql.append("GROUP BY o.company_id HAVING total >= ? ORDER BY total DESC, c.name")
+        params.append(min_shipments)
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+        return [tuple(r) for r in self._conn().execute(" ".join(sql), params)]
+
+    def lane_companies(self, exit_port=None, entry_port=None, min_shipments=1, limit=None):
+        """
+        [(company, exit_port, entry_port, shipments)] for lanes matching the given
+        ends (either may be None = any port), at least min_shipments, largest first.
+        """
+        sql = ["SELECT c.name, l.exit_port, l.entry_port, SUM(l.shipments) AS total FROM lanes l",
+               "JOIN companies c ON c.id = l.company_id WHERE 1 = 1"]
+        params = []
+        for column, port in (("exit_port", exit_port), ("entry_port", entry_port)):
+            if port:
+                sql.append(f"AND l.{column} = ?")
+                params.append(self.resolve_port(port))
+            else:
+                sql.append(f"AND l.{column} IS NOT NULL")
+        sql.append("GROUP BY l.company_id, l.exit_port, l.entry_port HAVING total >= ?"
+                   " ORDER BY total DESC, c.name")
+        params.append(min_shipments)
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+        return [tuple(r) for r in self._conn().execute(" ".join(sql), params)]
+
+    def counts(self):
+        """Row counts per table."""
+        conn = self._conn()
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                for t in ("companies", "observations", "lanes")}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load and query the embedded port store.")
+    ap.add_argument("--store", default=os.getenv("STORE_PATH", DEFAULT_STORE))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("load", help="upsert extractor JSONL into the store")
+    p.add_argument("src", nargs="+")
+    p = sub.add_parser("port", help="companies through a port")
+    p.add_argument("port")
+    p.add_argument("--direction", choices=["entry", "exit"])
+    p.add_argument("--min", type=int, default=1)
+    p.add_argument("--limit", type=int)
+    p = sub.add_parser("lane", help="companies on an exit -> entry lane")
+    p.add_argument("--from", dest="exit_port")
+    p.add_argument("--to", dest="entry_port")
+    p.add_argument("--min", type=int, default=1)
+    p.add_argument("--limit", type=int)
+    args = ap.parse_args()
+
+    store = PortStore(args.store)
+    t0 = time.perf_counter()
+    if args.cmd == "load":
+        for src in args.src:
+            stats = JSONLStats()
+            counts = store.upsert_jsonl(src, stats)
+            print(f"[store] {src}: {stats.summary()}; "
+                  + ", ".join(f"{k} {v}" for k, v in counts.items()), file=sys.stderr)
+        print(f"[store] {args.store}: " + ", ".join(f"{v} {k}" for k, v in store.counts().items()),
+              file=sys.stderr)
+    elif args.cmd == "port":
+        for company, total in store.companies_through(args.port, args.direction, args.min, args.limit):
+            print(json.dumps({"company": company, "shipments": total}, ensure_ascii=False))
+    else:
+        for company, x, n, total in store.lane_companies(args.exit_port, args.entry_port, args.min, args.limit):
+            print(json.dumps({"company": company, "exit_port": x, "entry_port": n, "shipments": total},
+                             ensure_ascii=False))
+    print(f"[store] {args.cmd} took {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
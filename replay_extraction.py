@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Replay recorded payloads through the port extractors offline, no browser:
+
+    JSON payloads   EnhancedImportYetiScraper.extract_data_from_apis
+                    (-> _extract_by_key -> _normalize_ports / _normalize_lanes)
+                    and analyze_network.summarize_json_payload
+    HTML snapshots  EnhancedImportYetiScraper.enhanced_html_extraction
+
+Sources are capture archives (capture_archive.py directories; each distinct
+body is replayed once), directories (*.json, *.html, *.htm, recursively) or
+single files. Payloads are spread over a process pool; the report gives hit
+rates (payloads with any ports or lanes extracted), per-payload decode and
+extraction times, and which json_keys matched.
+
+    python3 replay_extraction.py captures/archive --json-key ports
+    python3 replay_extraction.py saved_pages/ payloads/ --workers 4 --out replay.jsonl
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from analyze_network import summarize_json_payload
+from improved_scraper import EnhancedImportYetiScraper
+
+HTML_SUFFIXES = (".html", ".htm")
+
+
+class _ReplayScraper(EnhancedImportYetiScraper):
+    """The scraper's extractors, recording which json_keys matched."""
+
+    def __init__(self):
+        super().__init__()
+        self.hit_keys = []
+
+    def _extract_by_key(self, data, key, extracted_data, index=None):
+        found = super()._extract_by_key(data, key, extracted_data, index)
+        if found:
+            self.hit_keys.append(key)
+        return found
+
+
+_scraper = None
+_archives = {}
+
+
+def _get_scraper():
+    global _scraper
+    if _scraper is None:
+        _scraper = _ReplayScraper()
+    return _scraper
+
+
+def corpus(sources, json_key=None):
+    """(kind, source, ref) items: kind 'json' | 'html'; ref a file path or (archive dir, body hash)."""
+    for src in sources:
+        path = Path(src)
+        if (path / "index.sqlite3").exists():
+            from capture_archive import CaptureArchive
+            archive = CaptureArchive(path)
+            seen = set()
+            for req in archive.query(json_key=json_key, json_only=True):
+                if req.body_hash not in seen:
+                    seen.add(req.body_hash)
+                    yield "json", req.url, (str(path), req.body_hash)
+            if json_key is None:
+                for req in archive.query(content_type="text/html"):
+                    if req.body_hash and req.body_hash not in seen:
+                        seen.add(req.body_hash)
+                        yield "html", req.url, (str(path), req.body_hash)
+        elif path.is_dir():
+            for p in sorted(path.rglob("*")):
+                if p.suffix.lower() == ".json":
+                    yield "json", str(p), str(p)
+                elif p.suffix.lower() in HTML_SUFFIXES:
+                    yield "html", str(p), str(p)
+        elif path.exists():
+            yield ("html" if path.suffix.lower() in HTML_SUFFIXES else "json"), str(path), str(path)
+        else:
+            print(f"[warn] {src}: not found", file=sys.stderr)
+
+
+def _read(ref):
+    if isinstance(ref, str):
+        with open(ref, "rb") as f:
+            return f.read()
+    from capture_archive import CaptureArchive
+    if ref[0] not in _archives:
+        _archives[ref[0]] = CaptureArchive(ref[0])
+    return _archives[ref[0]].body(ref[1])
+
+
+def replay_one(item):
+    """Replay one corpus item; returns its result record (timings in ms)."""
+    kind, source, ref = item
+    rec = {"kind": kind, "source": source, "bytes": 0, "decode_ms": 0.0, "extract_ms": 0.0,
+           "hit": False, "keys": [], "exit_ports": 0, "entry_ports": 0, "lanes": 0,
+           "data_keys": [], "error": None}
+    scraper = _get_scraper()
+    scraper.hit_keys = []
+    try:
+        raw = _read(ref)
+        rec["bytes"] = len(raw)
+        with contextlib.redirect_stdout(io.StringIO()):  # the extractors print per hit
+            if kind == "json":
+                t0 = time.perf_counter()
+                obj = json.loads(raw)
+                t1 = time.perf_counter()
+                extracted = scraper.extract_data_from_apis([{"data": obj, "url": source}])
+                t2 = time.perf_counter()
+                rec["data_keys"] = summarize_json_payload(obj)["data_keys"]
+            else:
+                t0 = t1 = time.perf_counter()
+                extracted = scraper.enhanced_html_extraction(raw.decode("utf-8", errors="replace"))
+                t2 = time.perf_counter()
+    except Exception as e:  # a bad payload is reported, not fatal
+        rec["error"] = f"{type(e).__name__}: {e}"
+        return rec
+    rec["decode_ms"] = (t1 - t0) * 1000
+    rec["extract_ms"] = (t2 - t1) * 1000
+    rec["keys"] = scraper.hit_keys
+    for field in ("exit_ports", "entry_ports", "lanes"):
+        rec[field] = len(extracted.get(field) or [])
+    rec["hit"] = any(rec[field] for field in ("exit_ports", "entry_ports", "lanes"))
+    return rec
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(results, elapsed, workers):
+    kinds = Counter(r["kind"] for r in results)
+    print(f"Replayed:   {len(results):,} payloads ({', '.join(f'{v:,} {k}' for k, v in sorted(kinds.items()))}) "
+          f"with {workers} worker(s) in {elapsed:.2f} s")
+    for kind in sorted(kinds):
+        ok = [r for r in results if r["kind"] == kind and not r["error"]]
+        hits = sum(r["hit"] for r in ok)
+        ext = [r["extract_ms"] for r in ok]
+        print(f"  {kind:<5} hit rate {hits / len(ok) if ok else 0:6.1%} ({hits:,}/{len(ok):,}); "
+              f"extract p50 {_pct(ext, 0.5):.3f} ms  p95 {_pct(ext, 0.95):.3f} ms  max {max(ext, default=0):.3f} ms; "
+              f"{sum(r['bytes'] for r in ok) / 1e6:.1f} MB")
+        if kind == "json":
+            dec = [r["decode_ms"] for r in ok]
+            detected = [r for r in ok if r["data_keys"]]
+            print(f"        decode p50 {_pct(dec, 0.5):.3f} ms  p95 {_pct(dec, 0.95):.3f} ms; "
+                  f"data-related keys (analyze_network) in {len(detected):,}, "
+                  f"{sum(r['hit'] for r in detected):,} of them extracted")
+    keys = Counter(k for r in results for k in r["keys"])
+    if keys:
+        print("  keys:    " + ", ".join(f"{k} {v:,}" for k, v in keys.most_common()))
+    fields = {f: sum(r[f] for r in results) for f in ("exit_ports", "entry_ports", "lanes")}
+    print("  rows:    " + ", ".join(f"{v:,} {k}" for k, v in fields.items()))
+    errors = [r for r in results if r["error"]]
+    if errors:
+        print(f"[warn] {len(errors):,} payload(s) failed, e.g. {errors[0]['source']}: {errors[0]['error']}",
+              file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded JSON payloads and HTML snapshots through the extractors.")
+    ap.add_argument("src", nargs="+", help="capture archive directories, payload/snapshot directories or files")
+    ap.add_argument("--json-key", help="archives: only JSON bodies containing this key (skips HTML)")
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    ap.add_argument("--out", help="also write one JSON line per payload here")
+    args = ap.parse_args()
+
+    items = list(corpus(args.src, args.json_key))
+    if not items:
+        print("ERROR: no payloads found", file=sys.stderr)
+        sys.exit(1)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        results = [replay_one(item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(replay_one, items, chunksize=max(1, len(items) // (workers * 8))))
+    elapsed = time.perf_counter() - t0
+
+    report(results, elapsed, workers)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for rec in results:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        print(f"Wrote:      {len(results):,} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
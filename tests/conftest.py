@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the modules are flat files at the repository root
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
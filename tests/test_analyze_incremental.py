@@ -0,0 +1,53 @@
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+SRC = ROOT / "bco_ports_80.jsonl"
+
+
+def analyze(cwd, *args):
+    """Run analyzeData.py in cwd; returns (output file text, WARNING lines on stderr)."""
+    proc = subprocess.run([sys.executable, str(ROOT / "analyzeData.py"), "--src", "src.jsonl", *args],
+                          cwd=cwd, capture_output=True, text=True, check=True)
+    warnings = [l for l in proc.stderr.splitlines() if l.startswith(("WARNING", "  line", "  byte"))]
+    return (cwd / "west_coast_companies.jsonl").read_text(encoding="utf-8"), warnings
+
+
+def append_truncated(path):
+    first = SRC.read_bytes().split(b"\n", 1)[0]
+    with open(path, "ab") as f:
+        f.write(first[:150] + b"\n")  # cut inside the record: still leads with its company
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    out = []
+    for name in ("incremental", "full"):
+        d = tmp_path / name
+        d.mkdir()
+        shutil.copy(SRC, d / "src.jsonl")
+        out.append(d)
+    return out
+
+
+def test_first_incremental_run_skips_truncated_line(dirs):
+    inc, full = dirs
+    for d in dirs:
+        append_truncated(d / "src.jsonl")
+    expected = analyze(full)
+    assert expected[1] and "skipped 1 malformed line(s)" in expected[1][0]
+    assert analyze(inc, "--incremental") == expected
+
+
+def test_truncated_line_of_changed_company(dirs):
+    inc, full = dirs
+    analyze(inc, "--incremental")
+    for d in dirs:
+        append_truncated(d / "src.jsonl")
+    expected = analyze(full)
+    assert expected[1] and "skipped 1 malformed line(s)" in expected[1][0]
+    assert analyze(inc, "--incremental") == expected
@@ -0,0 +1,55 @@
+import gc
+import os
+import threading
+
+import pytest
+
+from cache_store import SQLiteCache
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_short_lived_threads_do_not_leak_connections(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite3")
+    cache["k"] = ({"ports": []}, 1.0)
+    have_proc = os.path.isdir("/proc/self/fd")
+    fds = open_fds() if have_proc else None
+
+    def worker():
+        assert cache.get("k") is not None
+
+    for _ in range(200):
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+    gc.collect()
+
+    assert len(cache._conns) <= 2  # the main thread's, plus at most one not yet freed
+    if have_proc:
+        assert open_fds() <= fds + 4
+    cache.close()
+    assert len(cache._conns) == 0
+
+
+def test_close_closes_running_threads_connections(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite3")
+    ready, done = threading.Barrier(6), threading.Event()
+
+    def worker():
+        cache.get("k")
+        ready.wait()
+        done.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    assert len(cache._conns) == 6
+    cache.close()
+    assert len(cache._conns) == 0
+    done.set()
+    for t in threads:
+        t.join()
+    assert cache.get("k") is None  # reopens after close
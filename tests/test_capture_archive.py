@@ -0,0 +1,29 @@
+import sqlite3
+import threading
+
+from capture_archive import CaptureArchive
+
+
+def test_close_closes_every_threads_connection(tmp_path):
+    archive = CaptureArchive(tmp_path / "archive")
+    ready, done, closed = threading.Barrier(4), threading.Event(), []
+
+    def worker():
+        conn = archive._conn()
+        ready.wait()
+        done.wait()
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:  # closed by archive.close() in the main thread
+            closed.append(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    archive.close()
+    done.set()
+    for t in threads:
+        t.join()
+    assert len(closed) == 3
+    assert list(archive.query()) == []  # reopens after close
@@ -0,0 +1,16 @@
+from improved_scraper import EnhancedImportYetiScraper
+
+
+def scraper():
+    return EnhancedImportYetiScraper.__new__(EnhancedImportYetiScraper)  # no browser needed
+
+
+def test_normalized_ports_keep_the_scraper_shape():
+    ports = scraper()._normalize_ports([{"shipments": "3"}, {"name": "Oakland", "count": 2, "lat": 37.8}, 5])
+    assert ports == [{"port": "Unknown", "shipments": 3, "lat": None, "lon": None},
+                     {"port": "Oakland", "shipments": 2, "lat": 37.8, "lon": None}]
+
+
+def test_normalized_lanes_keep_the_scraper_shape():
+    lanes = scraper()._normalize_lanes([1, {"from": "Yantian", "count": 3, "notes": "x"}])
+    assert lanes == [{"exit_port": "Yantian", "entry_port": "Unknown", "shipments": 3}]
@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+
+from port_store import PortStore
+
+
+def record(company, shipments):
+    return {"company": company, "status": "ok",
+            "top_entry_ports": [{"port": "Long Beach", "shipments": shipments}],
+            "top_lanes": [{"exit_port": "Yantian", "entry_port": "Long Beach", "shipments": shipments}]}
+
+
+def test_spellings_of_one_company_share_a_row(tmp_path):
+    store = PortStore(tmp_path / "store.sqlite3")
+    assert store.upsert([record("Acme Inc", 50)])["inserted"] == 1
+    assert store.upsert([record("ACME, Inc.", 50)])["updated"] == 1
+
+    assert store.companies_through("Long Beach") == [("Acme Inc", 50)]
+    assert store.lane_companies("Yantian", "Long Beach") == [("Acme Inc", "Yantian", "Long Beach", 50)]
+    assert store.counts() == {"companies": 1, "observations": 1, "lanes": 1}
+
+
+def test_spellings_in_one_upsert_are_merged(tmp_path):
+    store = PortStore(tmp_path / "store.sqlite3")
+    assert store.upsert([record("Acme Inc", 50), record("ACME, Inc.", 50)])["inserted"] == 1
+    assert store.companies_through("Long Beach") == [("Acme Inc", 100)]
+
+
+def test_store_without_key_column_is_rebuilt(tmp_path):
+    path = tmp_path / "store.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE companies (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,"
+                 " status TEXT, confidence REAL, error TEXT, sources TEXT,"
+                 " fingerprint TEXT NOT NULL, updated REAL NOT NULL)")
+    conn.execute("INSERT INTO companies (name, fingerprint, updated) VALUES ('Acme Inc', 'x', 0)")
+    conn.commit()
+    conn.close()
+
+    store = PortStore(path)
+    assert store.counts()["companies"] == 0
+    store.upsert([record("ACME, Inc.", 50)])
+    assert store.companies_through("Long Beach") == [("ACME, Inc.", 50)]
+
+
+def test_close_closes_every_threads_connection(tmp_path):
+    store = PortStore(tmp_path / "store.sqlite3")
+    ready, done, closed = threading.Barrier(4), threading.Event(), []
+
+    def worker():
+        conn = store._conn()
+        ready.wait()
+        done.wait()
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:  # closed by store.close() in the main thread
+            closed.append(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    store.close()
+    done.set()
+    for t in threads:
+        t.join()
+    assert len(closed) == 3
+    assert store.counts()["companies"] == 0  # reopens after close
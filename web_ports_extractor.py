@@ -5,6 +5,7 @@ Web-only workflow: Tavily search + OpenAI extraction (no ImportYeti API calls).
 
 Input: a text file of company names (one per line)
 Output: JSONL with structured results + a flat CSV view
+        (+ optional Parquet/Arrow tables with --out-columnar, see columnar_export.py)
 
 Example:
 
@@ -25,6 +26,10 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 from tavily import TavilyClient
 from openai import OpenAI
 
+from name_normalize import name_key
+from port_records import CompanyResult
+from columnar_export import write_tables
+
 # ----------------- utils -----------------
 def clean(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "")).strip()
@@ -279,29 +284,28 @@ TEXT CHUNK {idx}/{len(chunks)}:
 
         try:
             js = model_extract_json(client, model, system, prompt)
+            # validate once: drops malformed items, normalizes shipments (port_records)
+            rec = CompanyResult.from_dict(js)
         except Exception as e:
             out["error"] = f"openai_parse_fail_chunk_{idx}: {e}"
             continue
 
         # Merge helpers
         def uniq_merge(dst: List[Dict[str, Any]], src: List[Dict[str, Any]], key_fields: List[str], cap: int):
-            seen = {tuple((d.get(k) or "").lower() for k in key_fields) for d in dst}
+            seen = {tuple(name_key(d.get(k) or "") for k in key_fields) for d in dst}
             for s in (src or []):
-                tup = tuple((s.get(k) or "").lower() for k in key_fields)
+                tup = tuple(name_key(s.get(k) or "") for k in key_fields)
                 if tup and tup not in seen and s.get(key_fields[0]):
                     dst.append(s)
                     seen.add(tup)
                 if len(dst) >= cap:
                     break
 
-        uniq_merge(agg["top_entry_ports"], js.get("top_entry_ports", []), ["port"], top_n)
-        uniq_merge(agg["top_exit_ports"],  js.get("top_exit_ports", []),  ["port"], top_n)
-        uniq_merge(agg["top_lanes"],       js.get("top_lanes", []),       ["exit_port","entry_port"], top_n)
+        uniq_merge(agg["top_entry_ports"], [p.to_dict() for p in rec.entry_ports], ["port"], top_n)
+        uniq_merge(agg["top_exit_ports"],  [p.to_dict() for p in rec.exit_ports],  ["port"], top_n)
+        uniq_merge(agg["top_lanes"],       [l.to_dict() for l in rec.lanes],       ["exit_port","entry_port"], top_n)
 
-        try:
-            agg["confidence"] = max(float(agg["confidence"]), float(js.get("confidence") or 0))
-        except Exception:
-            pass
+        agg["confidence"] = max(float(agg["confidence"]), rec.confidence)
 
         time.sleep(0.15)
 
@@ -336,6 +340,9 @@ def main():
     ap.add_argument("--input", required=True, help="text file with company names (one per line)")
     ap.add_argument("--out-json", default="bco_ports.jsonl")
     ap.add_argument("--out-csv",  default="bco_ports.csv")
+    ap.add_argument("--out-columnar", default=None,
+                    help="also write normalized companies/port_observations/lanes tables to this directory (needs pyarrow)")
+    ap.add_argument("--columnar-format", choices=["parquet", "feather"], default="parquet")
     ap.add_argument("--top", type=int, default=5)
     ap.add_argument("--max", type=int, default=10**9)
     ap.add_argument("--sleep", type=float, default=0.4, help="delay between companies (seconds)")
@@ -357,6 +364,11 @@ def main():
     # load companies
     with open(args.input, "r", encoding="utf-8") as f:
         companies = [clean(x) for x in f.read().splitlines() if clean(x)]
+    # one run per company, however its name is spelled in the list
+    unique = {}
+    for c in companies:
+        unique.setdefault(name_key(c), c)
+    companies = list(unique.values())
     if args.max < len(companies):
         companies = companies[: args.max]
 
@@ -410,5 +422,13 @@ def main():
     pd.DataFrame(flat).to_csv(args.out_csv, index=False)
     print(f"Wrote {args.out_csv}")
 
+    # optional normalized columnar export (the JSONL rows, one table per list, dictionary-encoded)
+    if args.out_columnar:
+        try:
+            paths = write_tables(rows, args.out_columnar, args.columnar_format)
+            print(f"Wrote {', '.join(str(p) for p in paths.values())}")
+        except RuntimeError as e:
+            print(f"WARNING: skipped columnar export: {e}", file=sys.stderr)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Production WSGI entry point for the Flask backend.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Defaults to the SQLite cache so every worker process shares scraped data;
+set CACHE_BACKEND=memory to keep a private cache per worker.
+"""
+
+import os
+
+os.environ.setdefault("CACHE_BACKEND", "sqlite")
+os.environ.setdefault("FLASK_DEBUG", "0")
+
+from app import app, startup
+
+startup()
+
+application = app